@@ -33,34 +33,269 @@
 # app/db/database.py
 # app/db/database.py
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
 import os
+import threading
+from typing import Optional
 from dotenv import load_dotenv
+from .routing import primary_stickiness, client_key_for
+from .notifications import install_change_notifications
 
 load_dotenv()
 
 Base = declarative_base()
 
+_engine = None
+_session_local = None
+_engine_lock = threading.Lock()
+
+_async_engine = None
+_async_session_local = None
+
+_read_engine = None
+_read_session_local = None
+_async_read_engine = None
+_async_read_session_local = None
+
 def get_database_url():
     POSTGRES_USER = os.getenv("POSTGRES_USER", "postgres")
     POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "postgres")
     POSTGRES_HOST = os.getenv("POSTGRES_HOST", "localhost")
     POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
     POSTGRES_DB = os.getenv("POSTGRES_DB", "inventory_db")
-    return f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    return f"postgresql+psycopg2://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+
+def get_read_database_url():
+    """DSN of the read replica, or None when POSTGRES_READ_HOST is not set"""
+    POSTGRES_READ_HOST = os.getenv("POSTGRES_READ_HOST")
+    if not POSTGRES_READ_HOST:
+        return None
+    POSTGRES_USER = os.getenv("POSTGRES_READ_USER", os.getenv("POSTGRES_USER", "postgres"))
+    POSTGRES_PASSWORD = os.getenv("POSTGRES_READ_PASSWORD", os.getenv("POSTGRES_PASSWORD", "postgres"))
+    POSTGRES_PORT = os.getenv("POSTGRES_READ_PORT", os.getenv("POSTGRES_PORT", "5432"))
+    POSTGRES_DB = os.getenv("POSTGRES_READ_DB", os.getenv("POSTGRES_DB", "inventory_db"))
+    return f"postgresql+psycopg2://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_READ_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+
+def _as_asyncpg_url(database_url: str):
+    return database_url.replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1)
+
+def create_schema(engine):
+    """Create missing tables, then any indexes added to models after their table existed,
+    then the change-notification triggers"""
+    Base.metadata.create_all(bind=engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    install_change_notifications(engine)
+
+def get_listen_dsn():
+    """Plain libpq DSN of the primary for LISTEN connections; notifications are not replicated"""
+    return get_database_url().replace("postgresql+psycopg2://", "postgresql://", 1)
+
+def get_async_database_url():
+    return _as_asyncpg_url(get_database_url())
+
+def get_pool_settings():
+    """Connection pool settings shared by every engine this process builds"""
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+    }
+
+def get_statement_timeout_ms():
+    return int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+def create_pooled_engine(database_url: str):
+    """Build an engine with the configured pool and per-connection statement timeout"""
+    connect_args = {}
+    statement_timeout_ms = get_statement_timeout_ms()
+    if statement_timeout_ms > 0:
+        connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+    return create_engine(database_url, connect_args=connect_args, **get_pool_settings())
+
+def create_async_pooled_engine(database_url: str):
+    """Async counterpart of create_pooled_engine using asyncpg"""
+    connect_args = {}
+    statement_timeout_ms = get_statement_timeout_ms()
+    if statement_timeout_ms > 0:
+        connect_args["server_settings"] = {"statement_timeout": str(statement_timeout_ms)}
+    return create_async_engine(database_url, connect_args=connect_args, **get_pool_settings())
 
 def get_engine():
-    return create_engine(get_database_url())
+    """Return the process-wide engine, building it on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_pooled_engine(get_database_url())
+    return _engine
 
 def get_session_local():
-    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    """Return the process-wide session factory bound to the pooled engine"""
+    global _session_local
+    if _session_local is None:
+        engine = get_engine()
+        with _engine_lock:
+            if _session_local is None:
+                _session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return _session_local
+
+def get_read_engine():
+    """Return the replica engine with its own pool, or the primary engine without a replica"""
+    global _read_engine
+    read_url = get_read_database_url()
+    if read_url is None:
+        return get_engine()
+    if _read_engine is None:
+        with _engine_lock:
+            if _read_engine is None:
+                _read_engine = create_pooled_engine(read_url)
+    return _read_engine
 
-def get_db():
+def get_read_session_local():
+    global _read_session_local
+    if get_read_database_url() is None:
+        return get_session_local()
+    if _read_session_local is None:
+        engine = get_read_engine()
+        with _engine_lock:
+            if _read_session_local is None:
+                _read_session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return _read_session_local
+
+def dispose_engine():
+    """Close pooled connections and forget the engines so the next use rebuilds them"""
+    global _engine, _session_local, _read_engine, _read_session_local
+    with _engine_lock:
+        for engine in (_engine, _read_engine):
+            if engine is not None:
+                engine.dispose()
+        _engine = None
+        _session_local = None
+        _read_engine = None
+        _read_session_local = None
+
+@event.listens_for(Session, "after_commit")
+def _stick_writer_to_primary(session):
+    """Keep a client that just committed a write on the primary for its next reads"""
+    client_key = session.info.get("client_key")
+    if client_key:
+        primary_stickiness.mark_write(client_key)
+
+def get_db(request: Request = None):
     SessionLocal = get_session_local()
     db = SessionLocal()
+    db.info["client_key"] = client_key_for(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db(request: Request = None):
+    """Session for read-only queries: the replica, unless this client wrote recently"""
+    if primary_stickiness.is_sticky(client_key_for(request)):
+        SessionLocal = get_session_local()
+    else:
+        SessionLocal = get_read_session_local()
+    db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+def get_async_engine():
+    """Return the process-wide async engine, building it on first use"""
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                _async_engine = create_async_pooled_engine(get_async_database_url())
+    return _async_engine
+
+def get_async_session_local():
+    """Return the process-wide AsyncSession factory bound to the async engine"""
+    global _async_session_local
+    if _async_session_local is None:
+        engine = get_async_engine()
+        with _engine_lock:
+            if _async_session_local is None:
+                _async_session_local = async_sessionmaker(
+                    bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+                )
+    return _async_session_local
+
+def get_async_read_engine():
+    global _async_read_engine
+    read_url = get_read_database_url()
+    if read_url is None:
+        return get_async_engine()
+    if _async_read_engine is None:
+        with _engine_lock:
+            if _async_read_engine is None:
+                _async_read_engine = create_async_pooled_engine(_as_asyncpg_url(read_url))
+    return _async_read_engine
+
+def get_async_read_session_local():
+    global _async_read_session_local
+    if get_read_database_url() is None:
+        return get_async_session_local()
+    if _async_read_session_local is None:
+        engine = get_async_read_engine()
+        with _engine_lock:
+            if _async_read_session_local is None:
+                _async_read_session_local = async_sessionmaker(
+                    bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+                )
+    return _async_read_session_local
+
+async def dispose_async_engine():
+    """Close pooled async connections and forget the async engines"""
+    global _async_engine, _async_session_local, _async_read_engine, _async_read_session_local
+    engines = (_async_engine, _async_read_engine)
+    with _engine_lock:
+        _async_engine = None
+        _async_session_local = None
+        _async_read_engine = None
+        _async_read_session_local = None
+    for engine in engines:
+        if engine is not None:
+            await engine.dispose()
+
+async def get_async_db(request: Request = None):
+    AsyncSessionLocal = get_async_session_local()
+    async with AsyncSessionLocal() as db:
+        db.info["client_key"] = client_key_for(request)
+        yield db
+
+def open_async_read_session(request: Request = None) -> AsyncSession:
+    """New async read session: the replica, unless this client wrote recently.
+
+    For callers that outlive the request dependencies, such as streaming
+    response bodies; use it as ``async with open_async_read_session(request) as db``.
+    """
+    if primary_stickiness.is_sticky(client_key_for(request)):
+        return get_async_session_local()()
+    return get_async_read_session_local()()
+
+def async_read_target(session: Optional[AsyncSession]) -> str:
+    """Routing target of a read session: replica when it is bound to the replica engine, else primary"""
+    if session is not None and get_read_database_url() is not None and session.bind is get_async_read_engine():
+        return "replica"
+    return "primary"
+
+def open_async_session(target: str = "primary") -> AsyncSession:
+    """New async session on target; use it as ``async with open_async_session(target) as db``"""
+    if target == "replica":
+        return get_async_read_session_local()()
+    return get_async_session_local()()
+
+async def get_async_read_db(request: Request = None):
+    """Async session for read-only queries: the replica, unless this client wrote recently"""
+    async with open_async_read_session(request) as db:
+        yield db
@@ -0,0 +1,88 @@
+# app/db/notifications.py
+# Change tracking: statement-level triggers on inventory_items bump the per-shop
+# version of every shop a write touched and NOTIFY the changed ids on commit
+import json
+import uuid
+from typing import Set, Tuple
+
+CHANGE_CHANNEL = "inventory_changes"
+
+# NOTIFY payloads must stay under 8000 bytes. A statement touching too many
+# items is announced by shop ids instead, split across notifications of at most
+# 150 ids, so a large write such as an import chunk never empties every cache.
+_NOTIFY_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION inventory_items_notify_changes() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    payload text;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM changed_rows) THEN
+        RETURN NULL;
+    END IF;
+    -- Sorted so concurrent multi-shop statements lock version rows in the same order
+    INSERT INTO inventory_shop_versions (shop_id, version)
+        SELECT DISTINCT shop_id, 1 FROM changed_rows ORDER BY shop_id
+        ON CONFLICT (shop_id) DO UPDATE SET version = inventory_shop_versions.version + 1;
+    SELECT json_build_object('items', json_agg(json_build_array(id, shop_id)))::text
+        INTO payload FROM changed_rows;
+    IF octet_length(payload) <= 7900 THEN
+        PERFORM pg_notify('{CHANGE_CHANNEL}', payload);
+        RETURN NULL;
+    END IF;
+    FOR payload IN
+        SELECT json_build_object('shops', json_agg(shop_id))::text
+        FROM (
+            SELECT shop_id, (row_number() OVER (ORDER BY shop_id) - 1) / 150 AS batch
+            FROM (SELECT DISTINCT shop_id FROM changed_rows) AS shops
+        ) AS numbered
+        GROUP BY batch
+    LOOP
+        PERFORM pg_notify('{CHANGE_CHANNEL}', payload);
+    END LOOP;
+    RETURN NULL;
+END;
+$$
+"""
+
+# Transition tables allow one event per trigger, hence one trigger per event.
+# Created only when missing: CREATE and DROP TRIGGER take an ACCESS EXCLUSIVE lock on
+# inventory_items, which would queue every request behind long reads during a rolling deploy.
+# The function above holds the logic and is replaced in place without that lock.
+_NOTIFY_TRIGGERS = {
+    f"inventory_items_notify_{event.lower()}": f"""
+    CREATE TRIGGER inventory_items_notify_{event.lower()}
+    AFTER {event} ON inventory_items
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION inventory_items_notify_changes()
+    """
+    for event in ("INSERT", "UPDATE")
+}
+
+_EXISTING_TRIGGERS = """
+SELECT tgname FROM pg_trigger
+WHERE tgrelid = 'inventory_items'::regclass AND NOT tgisinternal
+"""
+
+
+def install_change_notifications(engine):
+    """Replace the change-tracking function and create missing triggers; safe to run on every startup (PostgreSQL 11+)"""
+    with engine.begin() as connection:
+        connection.exec_driver_sql(_NOTIFY_FUNCTION)
+        existing = set(connection.exec_driver_sql(_EXISTING_TRIGGERS).scalars())
+        for name, create in _NOTIFY_TRIGGERS.items():
+            if name not in existing:
+                connection.exec_driver_sql(create)
+
+
+def parse_change_payload(payload: str) -> Tuple[Set[Tuple[uuid.UUID, uuid.UUID]], Set[uuid.UUID], bool]:
+    """Split a notification into (item_id, shop_id) pairs, bare shop ids, and an "everything changed" flag.
+
+    An unreadable payload counts as everything changed.
+    """
+    try:
+        body = json.loads(payload)
+        items = {(uuid.UUID(item_id), uuid.UUID(shop_id)) for item_id, shop_id in body.get("items") or ()}
+        shops = {uuid.UUID(shop_id) for shop_id in body.get("shops") or ()}
+        return items, shops, bool(body.get("all"))
+    except (ValueError, TypeError, AttributeError):
+        return set(), set(), True
@@ -0,0 +1,66 @@
+# app/db/routing.py
+# Read-your-writes support for replica routing
+import os
+import threading
+import time
+from typing import Optional
+from fastapi import Request
+
+
+class PrimaryStickiness:
+    """Remembers clients that wrote recently so their reads stay on the primary.
+
+    A replica can lag behind the primary; a client that just created or changed
+    an item would otherwise read a stale copy. Entries expire after
+    ``sticky_seconds`` and the map is capped at ``max_clients`` entries.
+    """
+
+    def __init__(self, sticky_seconds: float = 5.0, max_clients: int = 10000):
+        self.sticky_seconds = sticky_seconds
+        self.max_clients = max_clients
+        self._until = {}
+        self._lock = threading.Lock()
+
+    def mark_write(self, client_key: str):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._until) >= self.max_clients:
+                self._prune(now)
+            self._until[client_key] = now + self.sticky_seconds
+
+    def is_sticky(self, client_key: Optional[str]) -> bool:
+        if not client_key:
+            return False
+        with self._lock:
+            until = self._until.get(client_key)
+            if until is None:
+                return False
+            if until <= time.monotonic():
+                del self._until[client_key]
+                return False
+            return True
+
+    def _prune(self, now: float):
+        expired = [key for key, until in self._until.items() if until <= now]
+        for key in expired:
+            del self._until[key]
+        # Still full: drop the entries closest to expiry
+        overflow = len(self._until) - self.max_clients + 1
+        if overflow > 0:
+            for key in sorted(self._until, key=self._until.get)[:overflow]:
+                del self._until[key]
+
+
+def client_key_for(request: Optional[Request]) -> Optional[str]:
+    """Identify the caller: explicit X-Client-Id header, else the peer address"""
+    if request is None:
+        return None
+    client_id = request.headers.get("x-client-id")
+    if client_id:
+        return client_id
+    return request.client.host if request.client else None
+
+
+primary_stickiness = PrimaryStickiness(
+    sticky_seconds=float(os.getenv("DB_READ_STICKY_SECONDS", "5"))
+)
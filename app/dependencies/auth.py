@@ -1,32 +1,228 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
 from fastapi import Depends, HTTPException, Header
 from jose import jwt, jwk, JWTError
+from prometheus_client import Counter
 import requests
 
 JWKS_URL = "https://pixelbloomflower.b2clogin.com/pixelbloomflower.onmicrosoft.com/b2c_1_signupsignin/discovery/v2.0/keys"
 AUDIENCE = "dfe5acb7-236a-40b0-8d8e-165fcbe2623e"
 ISSUER = "https://pixelbloomflower.b2clogin.com/f61d643d-6382-41b1-a520-4541fd18d04e/v2.0/"
 
-# Fetch signing keys (in production, cache this!)
-jwks = requests.get(JWKS_URL).json()
+# Keys older than this are refreshed in the background while still being served
+JWKS_TTL_SECONDS = float(os.getenv("JWKS_TTL_SECONDS", "3600"))
+# An unknown kid triggers at most one refetch per interval
+JWKS_MIN_REFETCH_SECONDS = float(os.getenv("JWKS_MIN_REFETCH_SECONDS", "30"))
+JWKS_FETCH_TIMEOUT_SECONDS = float(os.getenv("JWKS_FETCH_TIMEOUT_SECONDS", "5"))
+
+# Verified tokens are remembered until exp, or at most this long; 0 disables the cache
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+
+JWKS_FETCHES = Counter(
+    'auth_jwks_fetches_total',
+    'JWKS fetches by trigger and result',
+    ['reason', 'result']
+)
+
+TOKEN_CACHE_LOOKUPS = Counter(
+    'auth_token_cache_lookups_total',
+    'Verified-token cache lookups',
+    ['result']
+)
+
+
+class SigningKeyNotFound(Exception):
+    pass
+
+
+class SigningKeysUnavailable(Exception):
+    """No key set has been fetched yet and the identity provider cannot be reached"""
+
+
+def fetch_jwks() -> dict:
+    """Download the key set from JWKS_URL"""
+    response = requests.get(JWKS_URL, timeout=JWKS_FETCH_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return response.json()
+
+
+class JWKSManager:
+    """Signing keys indexed by kid, constructed once per fetch.
+
+    Nothing is fetched until the first lookup. Once the key set is older than
+    ttl_seconds it is refreshed on a background thread while the current keys
+    keep being served; a failed refresh keeps the old keys. A kid that is not
+    in the set (a rotation) causes a synchronous refetch, rate limited to one
+    per min_refetch_seconds so forged kids cannot hammer the identity provider.
+    The same limit applies while the first fetch keeps failing: lookups in
+    between fail fast with SigningKeysUnavailable instead of each waiting on
+    the provider.
+    """
+
+    def __init__(self, fetcher: Callable[[], dict] = fetch_jwks, ttl_seconds: float = JWKS_TTL_SECONDS,
+                 min_refetch_seconds: float = JWKS_MIN_REFETCH_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.fetcher = fetcher
+        self.ttl_seconds = ttl_seconds
+        self.min_refetch_seconds = min_refetch_seconds
+        self._clock = clock
+        self._keys: Dict[str, object] = {}
+        self._fetched_at: Optional[float] = None
+        self._attempted_at: Optional[float] = None
+        self._refreshing = False
+        self._state_lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+
+    def get_key(self, kid: str):
+        """Pre-constructed key for kid; raises SigningKeyNotFound or SigningKeysUnavailable"""
+        if self._fetched_at is None:
+            if not (self._may_refetch() and self.refresh("initial")):
+                raise SigningKeysUnavailable("Signing keys could not be fetched")
+        elif self._clock() - self._fetched_at >= self.ttl_seconds:
+            self._refresh_in_background()
+
+        key = self._keys.get(kid)
+        if key is None and self._may_refetch():
+            self.refresh("unknown_kid")
+            key = self._keys.get(kid)
+        if key is None:
+            raise SigningKeyNotFound(f"Signing key {kid!r} not found")
+        return key
+
+    def refresh(self, reason: str = "manual") -> bool:
+        """Fetch and swap in the key set; True on success. Concurrent callers wait for one fetch."""
+        attempted_at = self._attempted_at
+        with self._fetch_lock:
+            if self._attempted_at != attempted_at:
+                # Another thread fetched while this one waited
+                return self._fetched_at is not None
+            self._attempted_at = self._clock()
+            try:
+                keys = self._construct(self.fetcher())
+            except Exception as e:
+                JWKS_FETCHES.labels(reason=reason, result="error").inc()
+                print(f"JWKS fetch failed ({reason}): {e}")
+                return False
+            self._keys = keys
+            self._fetched_at = self._clock()
+            JWKS_FETCHES.labels(reason=reason, result="ok").inc()
+            return True
+
+    def _may_refetch(self) -> bool:
+        return self._attempted_at is None or self._clock() - self._attempted_at >= self.min_refetch_seconds
+
+    def _refresh_in_background(self):
+        with self._state_lock:
+            if self._refreshing or not self._may_refetch():
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh("ttl")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="jwks-refresh", daemon=True).start()
+
+    @staticmethod
+    def _construct(jwks: dict) -> Dict[str, object]:
+        keys = {}
+        for key_data in jwks.get("keys", []):
+            if key_data.get("use", "sig") != "sig" or "kid" not in key_data:
+                continue
+            try:
+                keys[key_data["kid"]] = jwk.construct(key_data, algorithm=key_data.get("alg", "RS256"))
+            except JWTError as e:
+                print(f"Skipping unusable JWKS key {key_data.get('kid')}: {e}")
+        return keys
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of tokens that passed full verification, keyed by SHA-256 of the token.
+
+    Only tokens accepted with this module's AUDIENCE and ISSUER are stored, and
+    failures never are, so forged tokens cannot fill it. An entry expires at the
+    token's exp or after ttl_seconds, whichever comes first; the TTL bounds how
+    long a token keeps working after its signing key is rotated out.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES, ttl_seconds: float = TOKEN_CACHE_TTL_SECONDS,
+                 clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, token: str) -> Optional[dict]:
+        """Copy of the cached payload, or None"""
+        if not self.enabled:
+            return None
+        digest = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                expires_at, payload = entry
+                if self._clock() < expires_at:
+                    self._entries.move_to_end(digest)
+                    TOKEN_CACHE_LOOKUPS.labels(result="hit").inc()
+                    return dict(payload)
+                del self._entries[digest]
+        TOKEN_CACHE_LOOKUPS.labels(result="miss").inc()
+        return None
+
+    def put(self, token: str, payload: dict):
+        if not self.enabled:
+            return
+        expires_at = self._clock() + self.ttl_seconds
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        if expires_at <= self._clock():
+            return
+        digest = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            self._entries[digest] = (expires_at, dict(payload))
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+jwks_manager = JWKSManager()
+verified_tokens = VerifiedTokenCache()
+
 
 def get_kid(token: str):
     unverified_header = jwt.get_unverified_header(token)
     return unverified_header["kid"]
 
-def get_signing_key(kid):
-    for key in jwks["keys"]:
-        if key["kid"] == kid:
-            return key
-    raise Exception("Signing key not found")
-
 def verify_jwt_token(token: str = Header(..., alias="Authorization")):
     if token.startswith("Bearer "):
         token = token[len("Bearer "):]
 
+    payload = verified_tokens.get(token)
+    if payload is not None:
+        return payload
+
     try:
-        kid = get_kid(token)
-        key_data = get_signing_key(kid)
-        key = jwk.construct(key_data, algorithm="RS256")
+        key = jwks_manager.get_key(get_kid(token))
 
         payload = jwt.decode(
             token,
@@ -35,9 +231,12 @@ def verify_jwt_token(token: str = Header(..., alias="Authorization")):
             issuer=ISSUER,
             algorithms=["RS256"]
         )
+        verified_tokens.put(token, payload)
         return payload
     except JWTError as e:
         raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
+    except SigningKeysUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Token verification failed: {str(e)}")
 
@@ -46,7 +245,7 @@ def require_role(role: str):
         # Temporarily allow all authenticated users for ShopOwner
         if role == "ShopOwner":
             return payload
-        
+
         roles = payload.get("roles", [])
         if role not in roles:
             raise HTTPException(status_code=403, detail="Forbidden: Insufficient role")
@@ -0,0 +1,6 @@
+from ..messaging.async_publisher import AsyncRabbitMQPublisher, async_event_publisher
+
+
+async def get_publisher() -> AsyncRabbitMQPublisher:
+    """The application-scoped async publisher; one connection serves every request"""
+    return async_event_publisher
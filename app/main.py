@@ -1,14 +1,21 @@
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
+from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import time
+import os
 from .routers.inventory_router import router as inventory_router
-from .db.database import Base, get_engine
-
-
-# Create tables in the database
-Base.metadata.create_all(bind=get_engine())
+from .db.database import create_schema, get_engine, dispose_engine, dispose_async_engine
+from .services.item_cache import item_cache
+from .services.change_listener import ChangeListener
+from .messaging.async_publisher import async_event_publisher
+from .messaging.publisher import event_publisher
+from .messaging.outbox import EVENT_OUTBOX_ENABLED, outbox_relay
+from .messaging.shop_status import shop_status_client
+from .services.inventory_service import InventoryService
+from .messaging.consumer import INVENTORY_CONSUMER_ENABLED, start_inventory_consumer
 
 # Prometheus metrics
 REQUEST_COUNT = Counter(
@@ -39,10 +46,46 @@ DATABASE_CONNECTIONS = Gauge(
     'Number of active database connections'
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create tables on startup and release pooled connections on shutdown"""
+    create_schema(get_engine())
+    # Request handlers publish through the async publisher; its sender task
+    # connects in the background and reconnects on its own
+    await async_event_publisher.start()
+    if EVENT_OUTBOX_ENABLED:
+        await outbox_relay.start()
+    # Shop-status replies are consumed on a connection of its own and handled by the service
+    await shop_status_client.start(
+        on_reply=InventoryService(None, shop_status=shop_status_client).handle_shop_status_response
+    )
+    # The inventory check RPC is served from a thread with its own blocking connection
+    inventory_consumer = start_inventory_consumer() if INVENTORY_CONSUMER_ENABLED else None
+    # Other replicas' writes reach the local cache through LISTEN/NOTIFY
+    change_listener = None
+    if item_cache.enabled and os.getenv("ITEM_CACHE_LISTEN", "true").lower() == "true":
+        change_listener = ChangeListener(item_cache)
+        await change_listener.start()
+    yield
+    if change_listener:
+        await change_listener.stop()
+    if inventory_consumer:
+        inventory_consumer.stop_consuming()
+    await shop_status_client.stop()
+    await outbox_relay.stop()
+    await async_event_publisher.close()
+    # Imports without the outbox publish from their worker threads through the sync publisher
+    await asyncio.to_thread(event_publisher.close)
+    await dispose_async_engine()
+    dispose_engine()
+
+
 app = FastAPI(
     title="Inventory Service",
     description="Manages inventory for shops in PixelBloom with Prometheus monitoring",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -85,6 +128,7 @@ async def prometheus_middleware(request: Request, call_next):
 @app.get("/metrics")
 async def get_metrics():
     """Prometheus metrics endpoint"""
+    DATABASE_CONNECTIONS.set(get_engine().pool.checkedout())
     return Response(
         generate_latest(),
         media_type=CONTENT_TYPE_LATEST
@@ -0,0 +1,360 @@
+# inventory-service/app/messaging/async_publisher.py
+# Event-loop native publisher for the request path: nothing here blocks the loop
+import asyncio
+import os
+import uuid
+from typing import Callable, Optional, Set
+import pika
+from pika.adapters.asyncio_connection import AsyncioConnection
+from prometheus_client import Counter, Gauge
+from .codecs import EVENT_CONTENT_TYPE, codec_for
+from .coalescer import COALESCED_ROUTING_KEY, EVENT_COALESCE_WINDOW_SECONDS, UpdateCoalescer
+from .confirms import PUBLISH_MAX_IN_FLIGHT, ConfirmTracker, PublishError, PublishNacked
+from .publisher import EXCHANGES, RABBITMQ_RECONNECT_SECONDS, connection_parameters
+
+# Messages waiting to be handed to the broker; publishers wait while it is full
+PUBLISH_BUFFER_SIZE = int(os.getenv("PUBLISH_BUFFER_SIZE", "1000"))
+# How long a publisher waits for buffer space before the message is dropped
+PUBLISH_BUFFER_TIMEOUT_SECONDS = float(os.getenv("PUBLISH_BUFFER_TIMEOUT_SECONDS", "2"))
+# Opening the connection, channel and declarations must finish within this, or the attempt is abandoned
+RABBITMQ_CONNECT_TIMEOUT_SECONDS = float(os.getenv("RABBITMQ_CONNECT_TIMEOUT_SECONDS", "10"))
+
+PUBLISH_BUFFERED = Gauge(
+    'inventory_publish_buffered_messages',
+    'Messages buffered by the async publisher awaiting send'
+)
+
+PUBLISH_RESULTS = Counter(
+    'inventory_publish_results_total',
+    'Async publisher outcomes: confirmed, nacked, failed (connection lost) or dropped (buffer full)',
+    ['result']
+)
+
+
+class PublishBufferFull(PublishError):
+    pass
+
+
+async def pika_call(start: Callable[[Callable], None], pending: Optional[Set[asyncio.Future]] = None):
+    """Await a pika AsyncioConnection operation that reports completion through a callback.
+
+    pika only calls back on success, so a call whose channel or connection
+    closes would wait forever: pass the set that the close callbacks hand to
+    fail_pending().
+    """
+    done = asyncio.get_running_loop().create_future()
+    if pending is not None:
+        pending.add(done)
+        done.add_done_callback(pending.discard)
+    start(lambda result: done.done() or done.set_result(result))
+    return await done
+
+
+def fail_pending(pending: Set[asyncio.Future], error: Exception):
+    """Fail the pika_call()s still waiting on a channel or connection that closed"""
+    for call in list(pending):
+        if not call.done():
+            call.set_exception(error)
+
+
+class PikaTransport:
+    """pika AsyncioConnection in confirm mode.
+
+    send() pipelines publishes and returns a future per message; confirms are
+    settled in batches by ConfirmTracker, and send() waits while
+    max_in_flight messages are unconfirmed.
+    """
+
+    def __init__(self, parameters: Callable[[], pika.ConnectionParameters] = connection_parameters,
+                 max_in_flight: int = PUBLISH_MAX_IN_FLIGHT, connect_timeout: float = RABBITMQ_CONNECT_TIMEOUT_SECONDS):
+        self._parameters = parameters
+        self.connect_timeout = connect_timeout
+        self._connection = None
+        self._channel = None
+        self._calls = set()
+        self.confirms = ConfirmTracker(max_in_flight)
+
+    @property
+    def is_open(self) -> bool:
+        return self._channel is not None and self._channel.is_open
+
+    async def connect(self):
+        """Open the connection and a confirm-mode channel; a failed or timed out attempt is torn down"""
+        try:
+            await asyncio.wait_for(self._open(), self.connect_timeout)
+        except BaseException:
+            self._abandon()
+            raise
+
+    async def _open(self):
+        def on_open_error(connection, error):
+            fail_pending(self._calls, pika.exceptions.AMQPConnectionError(error))
+
+        opened = pika_call(lambda done: setattr(self, "_connection", AsyncioConnection(
+            self._parameters(),
+            on_open_callback=done,
+            on_open_error_callback=on_open_error,
+            on_close_callback=self._on_connection_closed,
+            custom_ioloop=asyncio.get_running_loop(),
+        )), self._calls)
+        await opened
+        channel = await pika_call(lambda done: self._connection.channel(on_open_callback=done), self._calls)
+        channel.add_on_close_callback(self._on_channel_closed)
+        for exchange in EXCHANGES:
+            await pika_call(lambda done: channel.exchange_declare(exchange=exchange, exchange_type='topic', callback=done), self._calls)
+        self.confirms.reset(PublishError("channel reopened"))
+        await pika_call(lambda done: channel.confirm_delivery(self._on_confirm, callback=done), self._calls)
+        self._channel = channel
+
+    def _abandon(self):
+        self._channel = None
+        fail_pending(self._calls, PublishError("connect abandoned"))
+        if self._connection is not None and not (self._connection.is_closing or self._connection.is_closed):
+            self._connection.close()
+
+    async def send(self, exchange: str, routing_key: str, body: bytes, properties: pika.BasicProperties) -> asyncio.Future:
+        await self.confirms.wait_for_room()
+        if not self.is_open:
+            raise PublishError("channel closed while waiting for confirms")
+        self._channel.basic_publish(exchange=exchange, routing_key=routing_key, body=body, properties=properties)
+        return self.confirms.track()
+
+    async def close(self):
+        if self._connection is not None and not (self._connection.is_closing or self._connection.is_closed):
+            self._connection.close()
+        self.confirms.reset(PublishError("connection closed"))
+
+    def _on_confirm(self, frame):
+        method = frame.method
+        if isinstance(method, pika.spec.Basic.Ack):
+            self.confirms.ack(method.delivery_tag, method.multiple)
+        else:
+            self.confirms.nack(method.delivery_tag, method.multiple)
+
+    def _on_channel_closed(self, channel, reason):
+        self._channel = None
+        fail_pending(self._calls, PublishError(f"channel closed: {reason}"))
+        self.confirms.reset(PublishError(f"channel closed: {reason}"))
+        if self._connection is not None and self._connection.is_open:
+            self._connection.close()
+
+    def _on_connection_closed(self, connection, reason):
+        self._channel = None
+        fail_pending(self._calls, PublishError(f"connection closed: {reason}"))
+        self.confirms.reset(PublishError(f"connection closed: {reason}"))
+
+
+class InMemoryBroker:
+    """Transport stand-in for tests, local runs and benchmarks.
+
+    Records messages and confirms them like RabbitMQ does: everything sent
+    within confirm_delay of the oldest unconfirmed message is settled by one
+    multiple=True ack, so confirm_delay plays the part of the broker round trip.
+    """
+
+    def __init__(self, confirm_delay: float = 0.0, max_in_flight: int = PUBLISH_MAX_IN_FLIGHT):
+        self.confirm_delay = confirm_delay
+        self.connects = 0
+        self.messages = []
+        self.nack_next = False
+        self.is_open = False
+        self.confirms = ConfirmTracker(max_in_flight)
+        self._nacked = []
+        self._flush_scheduled = False
+
+    async def connect(self):
+        self.connects += 1
+        self.is_open = True
+        self.confirms.reset(PublishError("channel reopened"))
+
+    async def send(self, exchange: str, routing_key: str, body: bytes, properties: pika.BasicProperties) -> asyncio.Future:
+        await self.confirms.wait_for_room()
+        confirm = self.confirms.track()
+        if self.nack_next:
+            self.nack_next = False
+            self._nacked.append(self.confirms.last_tag)
+        else:
+            self.messages.append((exchange, routing_key, body, properties))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_later(self.confirm_delay, self._flush)
+        return confirm
+
+    async def close(self):
+        self.is_open = False
+        self.confirms.reset(PublishError("connection closed"))
+
+    def _flush(self):
+        self._flush_scheduled = False
+        nacked, self._nacked = self._nacked, []
+        for tag in nacked:
+            self.confirms.nack(tag)
+        self.confirms.ack(self.confirms.last_tag, multiple=True)
+
+
+class AsyncRabbitMQPublisher:
+    """Non-blocking publisher with the RabbitMQPublisher interface, for async routes.
+
+    publish_event() puts the message on a bounded buffer and returns a future
+    that resolves when the broker confirms it (or fails on a nack or a dropped
+    connection); callers that do not need the confirm simply ignore it. A
+    single sender task drains the buffer into the transport and reconnects
+    with backoff, so a slow or absent broker fills the buffer and then makes
+    publishers wait up to buffer_timeout before their message is dropped, the
+    same skip-on-unavailable behaviour as the blocking publisher. Sends are
+    pipelined: the sender only waits on confirms when the transport's
+    in-flight window is full. With coalesce_window set, inventory.updated
+    events pass through an UpdateCoalescer first.
+    """
+
+    def __init__(self, transport=None, buffer_size: int = PUBLISH_BUFFER_SIZE,
+                 buffer_timeout: float = PUBLISH_BUFFER_TIMEOUT_SECONDS,
+                 reconnect_seconds: float = RABBITMQ_RECONNECT_SECONDS,
+                 coalesce_window: float = EVENT_COALESCE_WINDOW_SECONDS, content_type: str = EVENT_CONTENT_TYPE):
+        self.transport = transport or PikaTransport()
+        self.codec = codec_for(content_type)
+        self.buffer_size = buffer_size
+        self.buffer_timeout = buffer_timeout
+        self.reconnect_seconds = reconnect_seconds
+        self._loop = None
+        self._buffer = None
+        self._sender = None
+        # Optional stage in front of the buffer that merges bursts of updates to the same item
+        self.coalescer = UpdateCoalescer(self._enqueue, coalesce_window) if coalesce_window > 0 else None
+
+    async def start(self):
+        """Bind to the running loop and start the sender; publishing starts it on demand"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._sender is not None and not self._sender.done():
+            return
+        # Created here so they belong to the running loop
+        self._loop = loop
+        self._buffer = asyncio.Queue(maxsize=self.buffer_size)
+        self._sender = loop.create_task(self._send_forever())
+
+    async def close(self, drain_seconds: float = 5.0):
+        """Give buffered messages up to drain_seconds to go out, then stop and disconnect"""
+        if self._sender is None:
+            return
+        if self._loop is asyncio.get_running_loop():
+            if self.coalescer is not None:
+                await self.coalescer.close()
+            try:
+                await asyncio.wait_for(self._buffer.join(), timeout=drain_seconds)
+            except asyncio.TimeoutError:
+                print(f"Dropping {self._buffer.qsize()} unsent events on shutdown")
+            self._sender.cancel()
+            try:
+                await self._sender
+            except asyncio.CancelledError:
+                pass
+            while not self._buffer.empty():
+                confirm = self._buffer.get_nowait()[-1]
+                confirm.set_exception(PublishError("publisher closed before sending"))
+            await self.transport.close()
+        self._sender = None
+        PUBLISH_BUFFERED.set(0)
+
+    async def publish_event(self, exchange: str, routing_key: str, body: dict) -> asyncio.Future:
+        """Buffer an event; the returned future resolves on broker confirm"""
+        properties = pika.BasicProperties(
+            delivery_mode=2,  # Make message persistent
+            content_type=self.codec.content_type
+        )
+        return await self.publish(exchange, routing_key, self.codec.encode(body), properties)
+
+    async def request_shop_status(self, shop_id: str, callback_queue: str) -> Optional[str]:
+        """Request shop status with correlation ID pattern; None if the request could not be buffered"""
+        correlation_id = str(uuid.uuid4())
+        properties = pika.BasicProperties(
+            reply_to=callback_queue,
+            correlation_id=correlation_id,
+            content_type=self.codec.content_type
+        )
+        body = self.codec.encode({"shop_id": shop_id, "request_type": "status_check"})
+        confirm = await self.publish('shop_events', 'shop.status.request', body, properties)
+        if confirm.done() and confirm.exception() is not None:
+            return None
+        return correlation_id
+
+    async def publish(self, exchange: str, routing_key: str, body: bytes, properties: pika.BasicProperties) -> asyncio.Future:
+        """Buffer an already encoded message; the returned future resolves on broker confirm"""
+        await self.start()
+        if self.coalescer is not None:
+            if routing_key == COALESCED_ROUTING_KEY:
+                return await self.coalescer.add(exchange, body, properties)
+            if self.coalescer.holds(exchange):
+                # Held updates go first so an item's events keep their order
+                await self.coalescer.flush()
+        return await self._enqueue(exchange, routing_key, body, properties)
+
+    async def _enqueue(self, exchange: str, routing_key: str, body: bytes, properties: pika.BasicProperties) -> asyncio.Future:
+        confirm = self._loop.create_future()
+        confirm.add_done_callback(_record_result)
+        try:
+            await asyncio.wait_for(self._buffer.put((exchange, routing_key, body, properties, confirm)), self.buffer_timeout)
+        except asyncio.TimeoutError:
+            print(f"Publish buffer full, dropping event for {exchange}/{routing_key}")
+            confirm.set_exception(PublishBufferFull(f"{self.buffer_size} events already buffered"))
+            return confirm
+        PUBLISH_BUFFERED.set(self._buffer.qsize())
+        return confirm
+
+    async def _send_forever(self):
+        delay = 0.1
+        while True:
+            message = await self._buffer.get()
+            exchange, routing_key, body, properties, confirm = message
+            try:
+                while not self.transport.is_open:
+                    try:
+                        await self.transport.connect()
+                        delay = 0.1
+                    except Exception as e:
+                        print(f"Failed to setup RabbitMQ connection, retrying in {delay:.1f}s: {e!r}")
+                        await asyncio.sleep(delay)
+                        delay = min(delay * 2, self.reconnect_seconds)
+                try:
+                    sent = await self.transport.send(exchange, routing_key, body, properties)
+                except Exception as e:
+                    confirm.set_exception(PublishError(f"send failed: {e!r}"))
+                else:
+                    sent.add_done_callback(lambda done, confirm=confirm: _chain(done, confirm))
+            except asyncio.CancelledError:
+                if not confirm.done():
+                    confirm.set_exception(PublishError("publisher closed before sending"))
+                raise
+            finally:
+                self._buffer.task_done()
+                PUBLISH_BUFFERED.set(self._buffer.qsize())
+
+
+def _chain(source: asyncio.Future, target: asyncio.Future):
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+def _record_result(confirm: asyncio.Future):
+    if confirm.cancelled():
+        return
+    error = confirm.exception()  # also marks the exception retrieved when nobody awaits the confirm
+    if error is None:
+        PUBLISH_RESULTS.labels(result="confirmed").inc()
+    elif isinstance(error, PublishBufferFull):
+        PUBLISH_RESULTS.labels(result="dropped").inc()
+    elif isinstance(error, PublishNacked):
+        PUBLISH_RESULTS.labels(result="nacked").inc()
+        print(f"Broker rejected event: {error}")
+    else:
+        PUBLISH_RESULTS.labels(result="failed").inc()
+        print(f"Event not confirmed: {error}")
+
+
+# Application-scoped instance for the request path; started and closed by the app lifespan
+async_event_publisher = AsyncRabbitMQPublisher()
@@ -0,0 +1,140 @@
+# inventory-service/app/messaging/coalescer.py
+# Coalescing window for item update events: bursts on hot items go out as one event per item state
+import asyncio
+import os
+from typing import Awaitable, Callable, List
+import pika
+from prometheus_client import Counter
+from .codecs import codec_for
+
+COALESCED_ROUTING_KEY = "inventory.updated"
+# Updates are held this long (from the first one in the window) before flushing; 0 turns coalescing off
+EVENT_COALESCE_WINDOW_SECONDS = float(os.getenv("EVENT_COALESCE_WINDOW_MS", "0")) / 1000
+# A window holding this many items flushes early
+EVENT_COALESCE_MAX_ITEMS = int(os.getenv("EVENT_COALESCE_MAX_ITEMS", "500"))
+
+# coalescing ratio = rate(stage="published") / rate(stage="received")
+EVENT_COALESCING = Counter(
+    'inventory_event_coalescing_total',
+    'Item update events entering the coalescing window (received) and events flushed out of it (published)',
+    ['stage']
+)
+
+
+def items_updated_event(events: List[dict]) -> dict:
+    """One event for the latest states of many items; each entry has the single-item event shape"""
+    return {
+        "event_type": "inventory_items_updated",
+        "count": len(events),
+        "items": events
+    }
+
+
+class UpdateCoalescer:
+    """Keeps only the latest inventory.updated state per item within a window.
+
+    The first update opens a window of window_seconds; when it closes (or
+    max_items items are held) the held states are sent as one
+    inventory_items_updated event, or unchanged if only one item was held.
+    Every caller's confirm resolves with the confirm of the flushed event
+    that carries its update. Flushes are sent in order, and the publisher
+    flushes before sending any other event on the exchange, so no event of an
+    item overtakes an earlier one and no update waits longer than the window.
+    """
+
+    def __init__(self, send: Callable[[str, str, bytes, pika.BasicProperties], Awaitable[asyncio.Future]],
+                 window_seconds: float = EVENT_COALESCE_WINDOW_SECONDS, max_items: int = EVENT_COALESCE_MAX_ITEMS):
+        self._send = send
+        self.window_seconds = window_seconds
+        self.max_items = max_items
+        self._pending = {}
+        self._timer = None
+        self._flushing = None
+        # The loop only keeps weak references to tasks, so timer-started flushes are held here until done
+        self._tasks = set()
+
+    def holds(self, exchange: str) -> bool:
+        """Whether updates for exchange are held or still being flushed"""
+        if self._flushing is not None and not self._flushing.done():
+            return True
+        return any(held_exchange == exchange for held_exchange, _ in self._pending)
+
+    async def add(self, exchange: str, body: bytes, properties: pika.BasicProperties) -> asyncio.Future:
+        """Hold an item update; the returned future resolves when the event carrying it is confirmed"""
+        item_id = codec_for(properties.content_type).decode(body).get("item_id")
+        if item_id is None:
+            # Already a batch: keep it behind what is held
+            await self.flush()
+            return await self._send(exchange, COALESCED_ROUTING_KEY, body, properties)
+
+        loop = asyncio.get_running_loop()
+        confirm = loop.create_future()
+        # Callers may ignore their confirm; failures are recorded on the flushed event's
+        confirm.add_done_callback(lambda done: done.cancelled() or done.exception())
+        EVENT_COALESCING.labels(stage="received").inc()
+        key = (exchange, item_id)
+        held = self._pending.pop(key, None)
+        confirms = held[2] if held else []
+        confirms.append(confirm)
+        # Re-inserted so the batch lists items in the order of their latest change
+        self._pending[key] = (body, properties, confirms)
+        if len(self._pending) >= self.max_items:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush_in_background)
+        return confirm
+
+    def _flush_in_background(self):
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self):
+        """Send what is held; returns once it and every earlier flush are on the publisher's buffer"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, {}
+        self._flushing = asyncio.get_running_loop().create_task(self._send_held(self._flushing, pending))
+        await asyncio.shield(self._flushing)
+
+    async def close(self):
+        """Flush what is held and wait for every flush started by a window closing"""
+        await self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _send_held(self, previous, pending):
+        if previous is not None:
+            await asyncio.shield(previous)
+        by_exchange = {}
+        for (exchange, _), held in pending.items():
+            by_exchange.setdefault(exchange, []).append(held)
+        for exchange, held in by_exchange.items():
+            if len(held) == 1:
+                body, properties, confirms = held[0]
+            else:
+                codec = codec_for(held[-1][1].content_type)
+                body = codec.encode(items_updated_event([
+                    codec_for(properties.content_type).decode(body) for body, properties, _ in held
+                ]))
+                properties = pika.BasicProperties(
+                    delivery_mode=2,  # Make message persistent
+                    content_type=codec.content_type
+                )
+                confirms = [confirm for _, _, item_confirms in held for confirm in item_confirms]
+            EVENT_COALESCING.labels(stage="published").inc()
+            sent = await self._send(exchange, COALESCED_ROUTING_KEY, body, properties)
+            sent.add_done_callback(lambda done, confirms=confirms: _fan_out(done, confirms))
+
+
+def _fan_out(source: asyncio.Future, targets: List[asyncio.Future]):
+    for target in targets:
+        if target.done():
+            continue
+        if source.cancelled():
+            target.cancel()
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
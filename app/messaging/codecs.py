@@ -0,0 +1,54 @@
+# inventory-service/app/messaging/codecs.py
+# Message body codecs, chosen by the AMQP content_type property
+import os
+from typing import Any, Optional
+import msgpack
+import orjson
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+
+class JsonCodec:
+    content_type = JSON_CONTENT_TYPE
+
+    def encode(self, body: Any) -> bytes:
+        return orjson.dumps(body)
+
+    def decode(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackCodec:
+    content_type = MSGPACK_CONTENT_TYPE
+
+    def encode(self, body: Any) -> bytes:
+        return msgpack.packb(body, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+CODECS = {
+    JSON_CONTENT_TYPE: JsonCodec(),
+    MSGPACK_CONTENT_TYPE: MsgpackCodec(),
+    "application/x-msgpack": MsgpackCodec(),
+}
+
+
+def codec_for(content_type: Optional[str]):
+    """Codec for a content_type; messages without one predate codecs and are JSON"""
+    if not content_type:
+        return CODECS[JSON_CONTENT_TYPE]
+    codec = CODECS.get(content_type.split(";")[0].strip().lower())
+    if codec is None:
+        raise ValueError(f"Unsupported content type {content_type!r}")
+    return codec
+
+
+def decode_body(body: bytes, content_type: Optional[str]) -> Any:
+    return codec_for(content_type).decode(body)
+
+
+# Publishers encode with this; consumers decode whatever content_type a message declares
+EVENT_CONTENT_TYPE = os.getenv("EVENT_CONTENT_TYPE", JSON_CONTENT_TYPE)
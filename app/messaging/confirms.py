@@ -0,0 +1,115 @@
+# inventory-service/app/messaging/confirms.py
+# Publisher-confirm bookkeeping: outstanding delivery tags, batched acks and the in-flight window
+import asyncio
+import itertools
+import os
+import time
+from prometheus_client import Gauge, Histogram
+
+# Unconfirmed publishes allowed per channel before send() waits for acks
+PUBLISH_MAX_IN_FLIGHT = int(os.getenv("PUBLISH_MAX_IN_FLIGHT", "256"))
+
+PUBLISH_CONFIRM_SECONDS = Histogram(
+    'inventory_publish_confirm_seconds',
+    'Time from publish to broker ack or nack',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+
+PUBLISH_CONFIRM_BATCH = Histogram(
+    'inventory_publish_confirm_batch_size',
+    'Delivery tags settled by one ack or nack frame',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+
+PUBLISH_IN_FLIGHT = Gauge(
+    'inventory_publish_in_flight',
+    'Publishes sent but not yet confirmed'
+)
+
+
+class PublishError(Exception):
+    pass
+
+
+class PublishNacked(PublishError):
+    pass
+
+
+class ConfirmTracker:
+    """Outstanding delivery tags of one confirm-mode channel.
+
+    track() numbers each publish the way the broker does (1, 2, ... per
+    channel) and returns a future for its confirm. The broker acks in tag
+    order and usually settles many tags with one multiple=True frame, so
+    pending tags are kept in insertion order and a multiple ack pops only the
+    settled prefix. At most max_in_flight publishes are outstanding:
+    wait_for_room() blocks the sender until acks free a slot.
+    """
+
+    def __init__(self, max_in_flight: int = PUBLISH_MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self.last_tag = 0
+        self._pending = {}
+        self._room = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def wait_for_room(self):
+        if self._room is None:
+            # Created here so it belongs to the running loop
+            self._room = asyncio.Event()
+            self._update_room()
+        while len(self._pending) >= self.max_in_flight:
+            await self._room.wait()
+
+    def track(self) -> asyncio.Future:
+        """Register the publish just sent on the channel"""
+        self.last_tag += 1
+        confirm = asyncio.get_running_loop().create_future()
+        self._pending[self.last_tag] = (confirm, time.monotonic())
+        self._update_room()
+        return confirm
+
+    def ack(self, delivery_tag: int, multiple: bool = False):
+        self._settle(delivery_tag, multiple, None)
+
+    def nack(self, delivery_tag: int, multiple: bool = False):
+        self._settle(delivery_tag, multiple, PublishNacked)
+
+    def reset(self, error: Exception):
+        """The channel is gone: fail everything outstanding and restart tags for the next channel"""
+        pending, self._pending = self._pending, {}
+        for confirm, _ in pending.values():
+            if not confirm.done():
+                confirm.set_exception(error)
+        self.last_tag = 0
+        self._update_room()
+
+    def _settle(self, delivery_tag: int, multiple: bool, error_type):
+        if multiple:
+            tags = list(itertools.takewhile(lambda tag: tag <= delivery_tag, self._pending))
+        else:
+            tags = [delivery_tag] if delivery_tag in self._pending else []
+        now = time.monotonic()
+        for tag in tags:
+            confirm, sent_at = self._pending.pop(tag)
+            PUBLISH_CONFIRM_SECONDS.observe(now - sent_at)
+            if confirm.done():
+                continue
+            if error_type is None:
+                confirm.set_result(None)
+            else:
+                confirm.set_exception(error_type(f"broker nacked delivery {tag}"))
+        if tags:
+            PUBLISH_CONFIRM_BATCH.observe(len(tags))
+        self._update_room()
+
+    def _update_room(self):
+        PUBLISH_IN_FLIGHT.set(len(self._pending))
+        if self._room is None:
+            return
+        if len(self._pending) < self.max_in_flight:
+            self._room.set()
+        else:
+            self._room.clear()
@@ -0,0 +1,216 @@
+# inventory-service/app/messaging/outbox.py
+# Transactional outbox: events are rows committed with the change they describe,
+# and a background relay publishes them with confirms and marks them sent
+import asyncio
+import os
+import uuid
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import pika
+from prometheus_client import Counter, Histogram
+from ..db.database import get_async_session_local
+from ..repositories.inventory_queries import (
+    claim_outbox_batch, mark_outbox_sent, prune_outbox_sent, release_outbox_claims, renew_outbox_claims,
+)
+from .async_publisher import AsyncRabbitMQPublisher, async_event_publisher
+
+# Request-path writes queue their events in the outbox instead of publishing inline
+EVENT_OUTBOX_ENABLED = os.getenv("EVENT_OUTBOX", "true").lower() == "true"
+# Messages claimed, published and marked sent per relay batch
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+# Idle relays look for work this often; local writes wake the relay at once
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "1"))
+OUTBOX_CONFIRM_TIMEOUT_SECONDS = float(os.getenv("OUTBOX_CONFIRM_TIMEOUT_SECONDS", "30"))
+# Claimed messages are left to their relay this long, renewed while their publishes are in flight;
+# relays on other replicas take them over only once a relay stops renewing
+OUTBOX_CLAIM_LEASE_SECONDS = float(os.getenv("OUTBOX_CLAIM_LEASE_SECONDS", "120"))
+# Sent rows are kept this long for inspection, then deleted
+OUTBOX_RETENTION_SECONDS = float(os.getenv("OUTBOX_RETENTION_SECONDS", "3600"))
+
+OUTBOX_MESSAGES = Counter(
+    'inventory_outbox_messages_total',
+    'Outbox messages handled by the relay: sent (confirmed) or retried (nacked, unconfirmed or failed)',
+    ['result']
+)
+
+OUTBOX_BATCH_SIZES = Histogram(
+    'inventory_outbox_batch_size',
+    'Messages claimed per relay batch',
+    buckets=(1, 5, 10, 50, 100, 250, 500, 1000, 5000)
+)
+
+
+def outbox_message(exchange: str, routing_key: str, body: dict, properties: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Row for AsyncInventoryRepository.add_outbox_messages"""
+    return {"exchange": exchange, "routing_key": routing_key, "payload": body, "properties": properties}
+
+
+def shop_status_request_message(shop_id: str, callback_queue: str) -> Dict[str, Any]:
+    """Outbox form of RabbitMQPublisher.request_shop_status; the correlation id is in properties"""
+    return outbox_message(
+        "shop_events", "shop.status.request",
+        {"shop_id": shop_id, "request_type": "status_check"},
+        {"reply_to": callback_queue, "correlation_id": str(uuid.uuid4())},
+    )
+
+
+def message_properties(row, content_type: str) -> pika.BasicProperties:
+    """AMQP properties for an outbox row; message_id lets consumers drop redelivered duplicates"""
+    extra = row.properties or {}
+    return pika.BasicProperties(
+        delivery_mode=2,  # Make message persistent
+        content_type=content_type,
+        message_id=f"outbox-{row.id}",
+        reply_to=extra.get("reply_to"),
+        correlation_id=extra.get("correlation_id"),
+    )
+
+
+class OutboxRelay:
+    """Publishes committed outbox rows in batches.
+
+    A batch is claimed in a short transaction: up to batch_size unsent rows
+    are locked with FOR UPDATE SKIP LOCKED (so relays on other replicas take
+    other rows) and leased until now + claim_lease. The relay then publishes
+    them with no transaction open and waits up to confirm_timeout for the
+    broker confirms. Confirmed rows are marked sent; nacked or failed rows are
+    released to be retried, so delivery is at least once. Rows still
+    unconfirmed keep their publishes in flight: the relay renews their lease,
+    does not claim them again, and records their outcome in a later batch.
+    While such rows wait on a transport that is down, the relay claims nothing
+    new, so an outage cannot fill the publish buffer. Ordering holds within a
+    relay; with several relays running it holds only per batch.
+    """
+
+    def __init__(self, publisher: AsyncRabbitMQPublisher = async_event_publisher,
+                 session_factory: Optional[Callable[[], Any]] = None,
+                 batch_size: int = OUTBOX_BATCH_SIZE, poll_seconds: float = OUTBOX_POLL_SECONDS,
+                 confirm_timeout: float = OUTBOX_CONFIRM_TIMEOUT_SECONDS,
+                 claim_lease: float = OUTBOX_CLAIM_LEASE_SECONDS,
+                 retention_seconds: float = OUTBOX_RETENTION_SECONDS):
+        self.publisher = publisher
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.confirm_timeout = confirm_timeout
+        self.claim_lease = timedelta(seconds=claim_lease)
+        self.retention_seconds = retention_seconds
+        self._in_flight: Dict[int, asyncio.Future] = {}
+        self._loop = None
+        self._wakeup = None
+        self._task = None
+
+    async def start(self):
+        if self._task is None:
+            # Created here so they belong to the running loop
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        """Tell the relay new rows were committed; safe from any thread"""
+        if self._task is None:
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._wakeup.set()
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def relay_batch(self) -> int:
+        """Publish one batch; returns how many messages were confirmed and marked sent"""
+        sent = await self._settle()
+        stalled = self._in_flight and not self.publisher.transport.is_open
+        async with self._session() as session:
+            async with session.begin():
+                if self._in_flight:
+                    await session.execute(renew_outbox_claims(list(self._in_flight), self.claim_lease))
+                if stalled:
+                    # The broker is down: what is in flight goes out once it is back
+                    return sent
+                rows = (await session.execute(
+                    claim_outbox_batch(self.batch_size, self.claim_lease, list(self._in_flight))
+                )).all()
+        if not rows:
+            return sent
+        rows.sort(key=lambda row: row.id)
+        OUTBOX_BATCH_SIZES.observe(len(rows))
+        codec = self.publisher.codec
+        for row in rows:
+            self._in_flight[row.id] = await self.publisher.publish(
+                row.exchange, row.routing_key, codec.encode(row.payload), message_properties(row, codec.content_type)
+            )
+        await asyncio.wait([self._in_flight[row.id] for row in rows], timeout=self.confirm_timeout)
+        return sent + await self._settle()
+
+    async def _settle(self) -> int:
+        """Mark the in-flight messages whose confirm arrived sent and release the failed ones"""
+        sent, failed = self._take_settled()
+        if sent or failed:
+            async with self._session() as session:
+                async with session.begin():
+                    if sent:
+                        await session.execute(mark_outbox_sent(sent))
+                    if failed:
+                        await session.execute(release_outbox_claims(failed))
+        OUTBOX_MESSAGES.labels(result="sent").inc(len(sent))
+        if failed:
+            OUTBOX_MESSAGES.labels(result="retried").inc(len(failed))
+            print(f"Outbox relay: {len(failed)} messages nacked or failed, will retry")
+        return len(sent)
+
+    def _take_settled(self) -> Tuple[List[int], List[int]]:
+        sent, failed = [], []
+        for message_id, confirm in list(self._in_flight.items()):
+            if confirm.done():
+                del self._in_flight[message_id]
+                if confirm.cancelled() or confirm.exception() is not None:
+                    failed.append(message_id)
+                else:
+                    sent.append(message_id)
+        return sent, failed
+
+    async def prune(self) -> int:
+        """Delete rows sent longer than retention_seconds ago"""
+        async with self._session() as session:
+            async with session.begin():
+                result = await session.execute(prune_outbox_sent(timedelta(seconds=self.retention_seconds)))
+        return result.rowcount
+
+    def _session(self):
+        return (self.session_factory or get_async_session_local())()
+
+    async def _run(self):
+        last_prune = 0.0
+        while True:
+            try:
+                if await self.relay_batch() == self.batch_size:
+                    continue  # Likely more waiting
+                if self._loop.time() - last_prune >= self.retention_seconds / 10:
+                    await self.prune()
+                    last_prune = self._loop.time()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Outbox relay batch failed: {e!r}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+
+# Application-scoped relay, started by the app lifespan
+outbox_relay = OutboxRelay()
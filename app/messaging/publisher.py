@@ -1,140 +1,148 @@
 # inventory-service/app/messaging/publisher.py
-import pika
-import json
+# One long-lived RabbitMQ connection per process, shared by every request
 import os
+import threading
 import time
-from typing import Dict, Any
-from dotenv import load_dotenv
+import uuid
+from typing import Any, Callable, Optional
+import pika
+from prometheus_client import Counter
+from .codecs import EVENT_CONTENT_TYPE, codec_for
+
+# After a failed connect, publishes are skipped for this long instead of each paying a connect attempt
+RABBITMQ_RECONNECT_SECONDS = float(os.getenv("RABBITMQ_RECONNECT_SECONDS", "5"))
+
+PUBLISHER_CONNECTS = Counter(
+    'inventory_publisher_connects_total',
+    'RabbitMQ connections opened by the shared publisher',
+    ['result']
+)
+
+EXCHANGES = ("inventory_events", "shop_events")
+
+
+def connection_parameters() -> pika.ConnectionParameters:
+    return pika.ConnectionParameters(
+        host=os.getenv("RABBITMQ_HOST", "localhost"),
+        port=int(os.getenv("RABBITMQ_PORT", "5672")),
+        credentials=pika.PlainCredentials(
+            os.getenv("RABBITMQ_USER", "guest"),
+            os.getenv("RABBITMQ_PASSWORD", "guest")
+        ),
+        heartbeat=int(os.getenv("RABBITMQ_HEARTBEAT", "60")),
+        blocked_connection_timeout=float(os.getenv("RABBITMQ_BLOCKED_TIMEOUT", "30")),
+    )
+
+
+def open_blocking_connection() -> pika.BlockingConnection:
+    return pika.BlockingConnection(connection_parameters())
+
 
 class RabbitMQPublisher:
-    def __init__(self):
-        # Load environment variables
-        # load_dotenv()
-        
-        # self.rabbitmq_host = os.getenv("RABBITMQ_HOST", "rabbitmq")
-        # self.rabbitmq_port = int(os.getenv("RABBITMQ_PORT", "5672"))
-        # self.rabbitmq_user = os.getenv("RABBITMQ_USER", "guest")
-        # self.rabbitmq_password = os.getenv("RABBITMQ_PASSWORD", "guest")
-        
-        # self.connection = self._create_connection()
-        # self.channel = self.connection.channel()
-        
-        # # Declare exchanges
-        # self.channel.exchange_declare(
-        #     exchange="shop_events",
-        #     exchange_type="topic",
-        #     durable=True
-        # )
-        
-        # self.channel.exchange_declare(
-        #     exchange="inventory_events",
-        #     exchange_type="topic",
-        #     durable=True
-        # )
-        pass
-
-    # def _create_connection(self):
-    #     credentials = pika.PlainCredentials(
-    #         username=self.rabbitmq_user,
-    #         password=self.rabbitmq_password
-    #     )
-        
-    #     parameters = pika.ConnectionParameters(
-    #         host=self.rabbitmq_host,
-    #         port=self.rabbitmq_port,
-    #         credentials=credentials,
-    #         heartbeat=600,
-    #         blocked_connection_timeout=300
-    #     )
-        
-    #     # Add retry logic for more robust connection handling
-    #     max_retries = 5
-    #     for attempt in range(max_retries):
-    #         try:
-    #             return pika.BlockingConnection(parameters)
-    #         except pika.exceptions.AMQPConnectionError as e:
-    #             if attempt < max_retries - 1:
-    #                 print(f"Connection attempt {attempt+1} failed. Retrying in 5 seconds...")
-    #                 time.sleep(5)
-    #             else:
-    #                 raise Exception(f"Failed to connect to RabbitMQ after {max_retries} attempts: {str(e)}")
-
-    # def publish_event(self, exchange: str, routing_key: str, body: Dict[str, Any]):
-    #     try:
-    #         message_body = json.dumps(body, default=str)  # Handle UUID serialization
-            
-    #         self.channel.basic_publish(
-    #             exchange=exchange,
-    #             routing_key=routing_key,
-    #             body=message_body,
-    #             properties=pika.BasicProperties(
-    #                 delivery_mode=2,  # make message persistent
-    #                 content_type="application/json",
-    #                 timestamp=int(time.time())
-    #             )
-    #         )
-    #         print(f"Published event to {exchange}.{routing_key}: {body}")
-            
-    #     except (pika.exceptions.ConnectionClosed, pika.exceptions.ChannelClosed):
-    #         # Reconnect and try again
-    #         self.connection = self._create_connection()
-    #         self.channel = self.connection.channel()
-            
-    #         # Re-declare exchanges to be safe
-    #         self.channel.exchange_declare(
-    #             exchange="shop_events",
-    #             exchange_type="topic",
-    #             durable=True
-    #         )
-            
-    #         self.channel.exchange_declare(
-    #             exchange="inventory_events",
-    #             exchange_type="topic",
-    #             durable=True
-    #         )
-            
-    #         # Try again
-    #         message_body = json.dumps(body, default=str)
-    #         self.channel.basic_publish(
-    #             exchange=exchange,
-    #             routing_key=routing_key,
-    #             body=message_body,
-    #             properties=pika.BasicProperties(
-    #                 delivery_mode=2,
-    #                 content_type="application/json",
-    #                 timestamp=int(time.time())
-    #             )
-    #         )
-    #         print(f"Published event after reconnection to {exchange}.{routing_key}: {body}")
-
-    # def close(self):
-    #     if self.connection and self.connection.is_open:
-    #         self.connection.close()
-
-    # def publish_inventory_response(self, routing_key: str, order_id: str, event_type: str, success: bool, message: str = None, product_details: Dict = None):
-    #     """Helper method specifically for inventory responses"""
-    #     response_body = {
-    #         "order_id": order_id,
-    #         "event_type": event_type,
-    #         "success": success,
-    #         "timestamp": int(time.time()),
-    #         "message": message
-    #     }
-        
-    #     if product_details:
-    #         response_body["product_details"] = product_details
-            
-    #     self.publish_event("inventory_events", routing_key, response_body)
-
-    # def publish_inventory_update(self, product_id: str, quantity_change: int, current_stock: int, reason: str = None):
-    #     """Helper method for inventory stock updates"""
-    #     update_body = {
-    #         "product_id": product_id,
-    #         "quantity_change": quantity_change,
-    #         "current_stock": current_stock,
-    #         "reason": reason or "stock_update",
-    #         "timestamp": int(time.time()),
-    #         "event_type": "inventory_updated"
-    #     }
-        
-    #     self.publish_event("inventory_events", "inventory.stock.updated", update_body)
\ No newline at end of file
+    """Thread-safe publisher that owns one connection and channel for the whole process.
+
+    The connection is opened on first use (or by connect() at startup) and
+    reopened when the broker drops it: a publish that fails on a dead
+    connection is retried once on a fresh one. pika's BlockingConnection is not
+    thread-safe, so every channel operation runs under a lock; FastAPI calls
+    this from its threadpool. While the broker is unreachable publishes are
+    logged and skipped, matching the per-request publisher this replaces.
+    """
+
+    def __init__(self, connect: Callable[[], Any] = open_blocking_connection,
+                 reconnect_seconds: float = RABBITMQ_RECONNECT_SECONDS,
+                 clock: Callable[[], float] = time.monotonic, content_type: str = EVENT_CONTENT_TYPE):
+        self._connect = connect
+        self.codec = codec_for(content_type)
+        self.reconnect_seconds = reconnect_seconds
+        self._clock = clock
+        self.connection = None
+        self.channel = None
+        self._retry_at = 0.0
+        self._lock = threading.RLock()
+
+    def connect(self) -> bool:
+        """Open the connection now rather than on the first publish; True when connected"""
+        with self._lock:
+            return self._ensure_channel() is not None
+
+    def publish_event(self, exchange: str, routing_key: str, body: dict):
+        """Publish event to RabbitMQ"""
+        properties = pika.BasicProperties(
+            delivery_mode=2,  # Make message persistent
+            content_type=self.codec.content_type
+        )
+        if self._publish(exchange, routing_key, self.codec.encode(body), properties):
+            print(f"Published event to {exchange}/{routing_key}: {body}")
+
+    def request_shop_status(self, shop_id: str, callback_queue: str) -> Optional[str]:
+        """Request shop status with correlation ID pattern"""
+        correlation_id = str(uuid.uuid4())
+        request_body = {
+            "shop_id": shop_id,
+            "request_type": "status_check"
+        }
+        properties = pika.BasicProperties(
+            reply_to=callback_queue,
+            correlation_id=correlation_id,
+            content_type=self.codec.content_type
+        )
+        if not self._publish('shop_events', 'shop.status.request', self.codec.encode(request_body), properties):
+            return None
+        print(f"Requested shop status for {shop_id} with correlation_id: {correlation_id}")
+        return correlation_id
+
+    def close(self):
+        """Close RabbitMQ connection"""
+        with self._lock:
+            self._drop_connection()
+
+    def _publish(self, exchange: str, routing_key: str, body: bytes, properties: pika.BasicProperties) -> bool:
+        with self._lock:
+            for attempt in range(2):
+                channel = self._ensure_channel()
+                if channel is None:
+                    print("RabbitMQ channel not available, skipping publish")
+                    return False
+                try:
+                    channel.basic_publish(exchange=exchange, routing_key=routing_key, body=body, properties=properties)
+                    return True
+                except (pika.exceptions.AMQPConnectionError, pika.exceptions.AMQPChannelError) as e:
+                    print(f"RabbitMQ publish failed ({'reconnecting' if attempt == 0 else 'giving up'}): {e!r}")
+                    self._drop_connection()
+                    # The retry should not wait out the backoff meant for an unreachable broker
+                    self._retry_at = 0.0
+            return False
+
+    def _ensure_channel(self):
+        if self.channel is not None and self.channel.is_open and self.connection.is_open:
+            return self.channel
+        self._drop_connection()
+        if self._clock() < self._retry_at:
+            return None
+        try:
+            self.connection = self._connect()
+            self.channel = self.connection.channel()
+            for exchange in EXCHANGES:
+                self.channel.exchange_declare(exchange=exchange, exchange_type='topic')
+        except Exception as e:
+            print(f"Failed to setup RabbitMQ connection: {e}")
+            PUBLISHER_CONNECTS.labels(result="error").inc()
+            self._drop_connection()
+            self._retry_at = self._clock() + self.reconnect_seconds
+            return None
+        PUBLISHER_CONNECTS.labels(result="ok").inc()
+        return self.channel
+
+    def _drop_connection(self):
+        connection, self.connection, self.channel = self.connection, None, None
+        if connection is not None and connection.is_open:
+            try:
+                connection.close()
+            except Exception as e:
+                print(f"Error closing RabbitMQ connection: {e!r}")
+
+
+# Application-scoped instance for sync callers (import jobs, the sync service): connects
+# on first publish and is closed in the app lifespan; request handlers use async_event_publisher
+event_publisher = RabbitMQPublisher()
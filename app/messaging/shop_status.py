@@ -0,0 +1,315 @@
+# inventory-service/app/messaging/shop_status.py
+# Shop-status RPC to the shop service: one reply consumer, a correlation map, deadlines and a TTL cache
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional
+import pika
+from pika.adapters.asyncio_connection import AsyncioConnection
+from prometheus_client import Counter
+from ..services.single_flight import SingleFlight
+from .codecs import decode_body
+from .async_publisher import (
+    RABBITMQ_CONNECT_TIMEOUT_SECONDS, AsyncRabbitMQPublisher, async_event_publisher, fail_pending, pika_call,
+)
+from .confirms import PublishError
+from .publisher import RABBITMQ_RECONNECT_SECONDS, connection_parameters
+
+# Shared reply queue of fire-and-forget status requests; their replies only feed the cache
+SHOP_STATUS_REPLY_QUEUE = "shop_status_responses"
+# How long an awaited status call waits for the shop service before giving up
+SHOP_STATUS_TIMEOUT_SECONDS = float(os.getenv("SHOP_STATUS_TIMEOUT_SECONDS", "2"))
+# A shop's active flag is reused, and not asked for again, for this long
+SHOP_STATUS_CACHE_TTL_SECONDS = float(os.getenv("SHOP_STATUS_CACHE_TTL_SECONDS", "60"))
+SHOP_STATUS_CACHE_MAX_ENTRIES = int(os.getenv("SHOP_STATUS_CACHE_MAX_ENTRIES", "10000"))
+# After a call for a shop times out or cannot be made, lookups answer "unknown" at once for this long
+SHOP_STATUS_UNKNOWN_TTL_SECONDS = float(os.getenv("SHOP_STATUS_UNKNOWN_TTL_SECONDS", "10"))
+
+SHOP_STATUS_LOOKUPS = Counter(
+    'inventory_shop_status_lookups_total',
+    'Shop status lookups: hit (cached), unknown (recent call unanswered) or miss (RPC needed)',
+    ['result']
+)
+
+SHOP_STATUS_CALLS = Counter(
+    'inventory_shop_status_calls_total',
+    'Awaited shop status RPCs: replied, timeout, or unavailable (no reply queue or publish failed)',
+    ['result']
+)
+
+
+class PikaReplyConsumer:
+    """Consumes shop-status replies on a connection of its own.
+
+    Listens on the shared SHOP_STATUS_REPLY_QUEUE and on an exclusive
+    server-named queue. Awaited calls use the exclusive queue as reply_to, so
+    their replies come back to this process whichever replica is running.
+    """
+
+    def __init__(self, parameters: Callable[[], pika.ConnectionParameters] = connection_parameters,
+                 connect_timeout: float = RABBITMQ_CONNECT_TIMEOUT_SECONDS):
+        self._parameters = parameters
+        self.connect_timeout = connect_timeout
+        self._connection = None
+        self._closed = None
+        self._calls = set()
+        self.reply_queue = None
+
+    async def connect(self, on_reply: Callable[[Optional[str], bytes, Optional[str]], None]):
+        """Open the connection and start consuming; a failed or timed out attempt is torn down"""
+        self._closed = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(self._open(on_reply), self.connect_timeout)
+        except BaseException:
+            fail_pending(self._calls, PublishError("connect abandoned"))
+            await self.close()
+            raise
+
+    async def _open(self, on_reply: Callable[[Optional[str], bytes, Optional[str]], None]):
+        def on_open_error(connection, error):
+            fail_pending(self._calls, pika.exceptions.AMQPConnectionError(error))
+
+        def on_closed(connection, reason):
+            self.reply_queue = None
+            fail_pending(self._calls, PublishError(f"connection closed: {reason}"))
+            if not self._closed.done():
+                self._closed.set_result(reason)
+
+        def on_channel_closed(channel, reason):
+            fail_pending(self._calls, PublishError(f"channel closed: {reason}"))
+            if self._connection.is_open:
+                self._connection.close()
+
+        await pika_call(lambda done: setattr(self, "_connection", AsyncioConnection(
+            self._parameters(),
+            on_open_callback=done,
+            on_open_error_callback=on_open_error,
+            on_close_callback=on_closed,
+            custom_ioloop=asyncio.get_running_loop(),
+        )), self._calls)
+        channel = await pika_call(lambda done: self._connection.channel(on_open_callback=done), self._calls)
+        channel.add_on_close_callback(on_channel_closed)
+        await pika_call(lambda done: channel.queue_declare(queue=SHOP_STATUS_REPLY_QUEUE, durable=True, callback=done), self._calls)
+        declared = await pika_call(lambda done: channel.queue_declare(queue='', exclusive=True, callback=done), self._calls)
+
+        def on_message(channel, method, properties, body):
+            on_reply(properties.correlation_id, body, properties.content_type)
+
+        for queue in (SHOP_STATUS_REPLY_QUEUE, declared.method.queue):
+            channel.basic_consume(queue=queue, on_message_callback=on_message, auto_ack=True)
+        self.reply_queue = declared.method.queue
+
+    async def wait_closed(self):
+        await asyncio.shield(self._closed)
+
+    async def close(self):
+        self.reply_queue = None
+        if self._connection is not None and not (self._connection.is_closing or self._connection.is_closed):
+            self._connection.close()
+
+
+class ShopStatusClient:
+    """Asks the shop service whether shops are active.
+
+    is_shop_active() answers from a TTL cache when it can. Otherwise it
+    publishes a shop.status.request with a fresh correlation id and waits,
+    up to timeout, for the reply to resolve the future registered under that
+    id. Concurrent calls for one shop share a single request. Every reply
+    refreshes the cache, including replies to the fire-and-forget requests
+    sent after item creation, and shops_to_check() keeps those to one request
+    per shop per TTL. None means the status is unknown: the broker or shop
+    service did not answer in time. Unknown is remembered for unknown_ttl_seconds,
+    so while the shop service is down or slow each shop costs one wait, not
+    one per lookup. Decoded replies go to the on_reply handler
+    given to start(), which must end up calling resolve().
+    """
+
+    def __init__(self, publisher: AsyncRabbitMQPublisher = async_event_publisher, consumer=None,
+                 timeout: float = SHOP_STATUS_TIMEOUT_SECONDS, ttl_seconds: float = SHOP_STATUS_CACHE_TTL_SECONDS,
+                 max_entries: int = SHOP_STATUS_CACHE_MAX_ENTRIES,
+                 unknown_ttl_seconds: float = SHOP_STATUS_UNKNOWN_TTL_SECONDS,
+                 reconnect_seconds: float = RABBITMQ_RECONNECT_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.publisher = publisher
+        self.consumer = consumer or PikaReplyConsumer()
+        self.timeout = timeout
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.unknown_ttl_seconds = unknown_ttl_seconds
+        self.reconnect_seconds = reconnect_seconds
+        self.clock = clock
+        self.flights = SingleFlight()
+        self._lock = threading.Lock()
+        self._statuses = OrderedDict()
+        self._requested = {}
+        self._unknown = {}
+        self._pending = {}
+        self._handler = self.resolve
+        self._loop = None
+        self._task = None
+
+    async def start(self, on_reply: Optional[Callable[[Optional[str], dict], None]] = None):
+        if self._task is None:
+            self._handler = on_reply or self.resolve
+            # Bound to the running loop: replies arriving on other threads are handed to it
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._consume_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.consumer.close()
+        for reply in self._pending.values():
+            if not reply.done():
+                reply.set_result(None)
+
+    def cached(self, shop_id: str) -> Optional[bool]:
+        with self._lock:
+            entry = self._statuses.get(shop_id)
+            if entry is None:
+                return None
+            is_active, expires_at = entry
+            if expires_at <= self.clock():
+                del self._statuses[shop_id]
+                return None
+            self._statuses.move_to_end(shop_id)
+            return is_active
+
+    def shops_to_check(self, shop_ids: Iterable[str]) -> List[str]:
+        """The shops with no cached status and no request sent within the TTL; marks them requested"""
+        now = self.clock()
+        with self._lock:
+            if len(self._requested) >= self.max_entries:
+                self._requested = {shop_id: until for shop_id, until in self._requested.items() if until > now}
+            unknown = []
+            for shop_id in shop_ids:
+                entry = self._statuses.get(shop_id)
+                if entry is not None and entry[1] > now:
+                    continue
+                if self._requested.get(shop_id, 0) > now:
+                    continue
+                self._requested[shop_id] = now + self.ttl_seconds
+                unknown.append(shop_id)
+            return unknown
+
+    async def is_shop_active(self, shop_id: str) -> Optional[bool]:
+        status = self.cached(shop_id)
+        if status is not None:
+            SHOP_STATUS_LOOKUPS.labels(result="hit").inc()
+            return status
+        if self._unknown.get(shop_id, 0) > self.clock():
+            SHOP_STATUS_LOOKUPS.labels(result="unknown").inc()
+            return None
+        SHOP_STATUS_LOOKUPS.labels(result="miss").inc()
+        status = await self.flights.do(("shop_status", shop_id), lambda: self._call(shop_id))
+        if status is None:
+            self._store_unknown(shop_id)
+        return status
+
+    def resolve(self, correlation_id: Optional[str], response: dict):
+        """Record a shop-status reply and wake the call waiting on it, if any; safe from any thread"""
+        shop_id = response.get("shop_id")
+        if shop_id is not None and "is_active" in response:
+            self._store(str(shop_id), bool(response["is_active"]))
+        loop = self._loop
+        if loop is None or correlation_id is None:
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._wake(correlation_id, response)
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake, correlation_id, response)
+
+    async def _call(self, shop_id: str) -> Optional[bool]:
+        reply_queue = self.consumer.reply_queue
+        if self._loop is not asyncio.get_running_loop() or reply_queue is None:
+            SHOP_STATUS_CALLS.labels(result="unavailable").inc()
+            return None
+        correlation_id = str(uuid.uuid4())
+        reply = self._loop.create_future()
+        self._pending[correlation_id] = reply
+
+        def on_confirm(confirm: asyncio.Future):
+            # A dropped or nacked request will never be answered
+            if not reply.done() and (confirm.cancelled() or confirm.exception() is not None):
+                reply.set_result(None)
+
+        properties = pika.BasicProperties(
+            reply_to=reply_queue,
+            correlation_id=correlation_id,
+            content_type=self.publisher.codec.content_type
+        )
+        body = self.publisher.codec.encode({"shop_id": shop_id, "request_type": "status_check"})
+        try:
+            confirm = await self.publisher.publish('shop_events', 'shop.status.request', body, properties)
+            confirm.add_done_callback(on_confirm)
+            try:
+                response = await asyncio.wait_for(reply, self.timeout)
+            except asyncio.TimeoutError:
+                SHOP_STATUS_CALLS.labels(result="timeout").inc()
+                print(f"Shop status request for {shop_id} timed out after {self.timeout}s")
+                return None
+        finally:
+            self._pending.pop(correlation_id, None)
+        if response is None:
+            SHOP_STATUS_CALLS.labels(result="unavailable").inc()
+            return None
+        SHOP_STATUS_CALLS.labels(result="replied").inc()
+        return bool(response.get("is_active"))
+
+    def _store(self, shop_id: str, is_active: bool):
+        with self._lock:
+            self._statuses[shop_id] = (is_active, self.clock() + self.ttl_seconds)
+            self._statuses.move_to_end(shop_id)
+            self._requested.pop(shop_id, None)
+            self._unknown.pop(shop_id, None)
+            while len(self._statuses) > self.max_entries:
+                self._statuses.popitem(last=False)
+
+    def _store_unknown(self, shop_id: str):
+        now = self.clock()
+        with self._lock:
+            if len(self._unknown) >= self.max_entries:
+                self._unknown = {unknown: until for unknown, until in self._unknown.items() if until > now}
+            self._unknown[shop_id] = now + self.unknown_ttl_seconds
+
+    def _wake(self, correlation_id: str, response: dict):
+        reply = self._pending.get(correlation_id)
+        if reply is not None and not reply.done():
+            reply.set_result(response)
+
+    def _on_reply(self, correlation_id: Optional[str], body: bytes, content_type: Optional[str] = None):
+        try:
+            response = decode_body(body, content_type)
+        except ValueError as e:
+            print(f"Discarding malformed shop status reply {correlation_id}: {e}")
+            return
+        self._handler(correlation_id, response)
+
+    async def _consume_forever(self):
+        delay = 0.1
+        while True:
+            try:
+                await self.consumer.connect(self._on_reply)
+                delay = 0.1
+                await self.consumer.wait_closed()
+                print("Shop status reply consumer disconnected, reconnecting")
+            except Exception as e:
+                print(f"Failed to start shop status reply consumer, retrying in {delay:.1f}s: {e!r}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.reconnect_seconds)
+
+
+# Application-scoped client, started and stopped by the app lifespan
+shop_status_client = ShopStatusClient()
@@ -1,11 +1,30 @@
 # inventory-service/app/models/database/inventory.py
-from sqlalchemy import Column, String, Boolean, DateTime, Integer, Float, ForeignKey, func, ARRAY
+from sqlalchemy import Column, String, Boolean, DateTime, Integer, BigInteger, Float, ForeignKey, Identity, Index, func, ARRAY, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 import uuid
 from ...db.database import Base
 
 class InventoryItemModel(Base):
     __tablename__ = "inventory_items"
+    __table_args__ = (
+        # Shop listings: shop_id = ? AND is_active ORDER BY created_at, id (offset or keyset)
+        Index(
+            "ix_inventory_items_active_shop_listing",
+            "shop_id", "created_at", "id",
+            postgresql_where=text("is_active"),
+        ),
+        # Global listing: is_active ORDER BY created_at, id
+        Index(
+            "ix_inventory_items_active_listing",
+            "created_at", "id",
+            postgresql_where=text("is_active"),
+        ),
+        Index(
+            "ix_inventory_items_active_category",
+            "category",
+            postgresql_where=text("is_active"),
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     shop_id = Column(UUID(as_uuid=True), nullable=False, index=True)
@@ -17,4 +36,33 @@ class InventoryItemModel(Base):
     image_urls = Column(ARRAY(String), nullable=True)  # Array of image URLs from blob storage
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
-    is_active = Column(Boolean, default=True)
\ No newline at end of file
+    is_active = Column(Boolean, default=True)
+
+
+class InventoryShopVersionModel(Base):
+    """Per-shop counter bumped by the inventory_items triggers on every write; backs shop listing ETags"""
+    __tablename__ = "inventory_shop_versions"
+
+    shop_id = Column(UUID(as_uuid=True), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
+class OutboxMessageModel(Base):
+    """Event written in the same transaction as the change it describes; published later by the outbox relay"""
+    __tablename__ = "inventory_outbox"
+    __table_args__ = (
+        # The relay's claim query: unsent rows in id order
+        Index("ix_inventory_outbox_unsent", "id", postgresql_where=text("sent_at IS NULL")),
+        Index("ix_inventory_outbox_sent_at", "sent_at", postgresql_where=text("sent_at IS NOT NULL")),
+    )
+
+    id = Column(BigInteger, Identity(), primary_key=True)
+    exchange = Column(String, nullable=False)
+    routing_key = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    # AMQP properties beyond the defaults, e.g. reply_to and correlation_id
+    properties = Column(JSONB, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+    # Lease of the relay publishing the message; other relays skip it until then
+    claimed_until = Column(DateTime, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
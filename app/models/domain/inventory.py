@@ -14,6 +14,11 @@ class InventoryItemBase(BaseModel):
 class InventoryItemCreate(InventoryItemBase):
     pass
 
+class InventoryItemImport(InventoryItemCreate):
+    """One row of a bulk import; a row carrying the id of an item in the same shop updates it."""
+    id: Optional[UUID] = None
+    image_urls: Optional[List[str]] = None
+
 class InventoryItemUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
@@ -32,3 +37,85 @@ class InventoryItem(InventoryItemBase):
 
     class Config:
         model_config = ConfigDict(from_attributes=True)
+
+class InventoryItemPage(BaseModel):
+    """One keyset page of a listing; pass next_cursor back to get the following page."""
+    items: List[InventoryItem]
+    next_cursor: Optional[str] = None
+
+class BulkItemError(BaseModel):
+    """Validation failure for one row of a bulk request, by its position in the request."""
+    index: int
+    errors: List[dict]
+
+class BulkCreateResult(BaseModel):
+    created: List[InventoryItem]
+    errors: List[BulkItemError]
+
+class QuantityAdjustment(BaseModel):
+    item_id: UUID
+    delta: int
+
+class QuantityAdjustmentRequest(BaseModel):
+    delta: int
+    floor: int = Field(0, description="Lowest quantity the adjustment may leave behind")
+
+class BatchQuantityAdjustmentRequest(BaseModel):
+    adjustments: List[QuantityAdjustment] = Field(..., min_length=1)
+    floor: int = 0
+
+class BatchQuantityAdjustmentResult(BaseModel):
+    """All adjustments are applied together or none are; failed lists the items that blocked the batch."""
+    applied: bool
+    items: List[InventoryItem]
+    failed: List[UUID]
+
+class BulkDeleteRequest(BaseModel):
+    item_ids: List[UUID] = Field(..., min_length=1)
+
+class BulkDeleteResult(BaseModel):
+    deleted: int
+    item_ids: List[UUID]
+
+class AvailabilityRequestItem(BaseModel):
+    product_id: UUID
+    quantity: int
+
+class AvailabilityRequest(BaseModel):
+    items: List[AvailabilityRequestItem] = Field(..., min_length=1)
+
+class AvailabilityResult(BaseModel):
+    """Stock check for one requested product; reason is set when it is not available.
+
+    An inactive (soft-deleted) product is reported with its name and shop but is
+    never available: current_quantity is 0 and reason is "Insufficient quantity".
+    """
+    product_id: UUID
+    available: bool
+    current_quantity: int
+    requested_quantity: int
+    product_name: Optional[str] = None
+    shop_id: Optional[UUID] = None
+    reason: Optional[str] = None
+
+class AvailabilityResponse(BaseModel):
+    all_available: bool
+    results: List[AvailabilityResult]
+
+class ImportJobStatus(BaseModel):
+    """Progress of a bulk import; rejects holds the first reported validation failures."""
+    id: UUID
+    state: str
+    format: str
+    bytes_total: int
+    bytes_read: int
+    rows_read: int
+    rows_imported: int
+    rows_rejected: int
+    rows_skipped: int
+    rejects: List[BulkItemError]
+    rows_per_second: float
+    eta_seconds: Optional[float] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
@@ -0,0 +1,151 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import uuid
+from datetime import datetime
+from ..models.domain.inventory import InventoryItem, InventoryItemCreate, InventoryItemUpdate, InventoryItemPage, QuantityAdjustment
+from .inventory_queries import select_item_by_id, select_items_by_ids, select_item_updated_at, select_shop_version, select_items_by_shop, select_active_items, select_shop_export, insert_items_returning,\
+    insert_item_returning, update_item_returning, soft_delete_returning, soft_delete_many_returning,\
+    adjust_quantity_returning, adjust_quantities_returning, insert_outbox_messages, merge_deltas, map_to_domain, construct_domain, to_page
+
+class AsyncInventoryRepository:
+    """Async mirror of InventoryRepository for use on the request path"""
+
+    def __init__(self, db: AsyncSession, read_db: Optional[AsyncSession] = None):
+        self.db = db
+        # Read methods go to the replica session when one is given
+        self.read_db = read_db or db
+
+    async def create(self, item: InventoryItemCreate, commit: bool = True) -> InventoryItem:
+        db_item = (await self.db.scalars(insert_item_returning(item.model_dump()))).one()
+        created_item = map_to_domain(db_item)
+        if commit:
+            await self.db.commit()
+        return created_item
+
+    async def bulk_create(self, items: List[InventoryItemCreate], commit: bool = True) -> List[InventoryItem]:
+        """Insert all items in one transaction with multi-row INSERT ... RETURNING"""
+        if not items:
+            return []
+        rows = [item.model_dump() for item in items]
+        db_items = (await self.db.scalars(insert_items_returning(), rows)).all()
+        created_items = [map_to_domain(db_item) for db_item in db_items]
+        if commit:
+            await self.db.commit()
+        return created_items
+
+    async def get_by_id(self, item_id: uuid.UUID) -> Optional[InventoryItem]:
+        row = (await self.read_db.execute(select_item_by_id(item_id))).first()
+        if not row:
+            return None
+        return construct_domain(row)
+
+    async def get_by_ids(self, item_ids: List[uuid.UUID]) -> List[InventoryItem]:
+        """Every item with one of the ids, active or not, in one query; unknown ids are left out"""
+        rows = (await self.read_db.execute(select_items_by_ids(item_ids))).all()
+        return [construct_domain(row) for row in rows]
+
+    async def get_updated_at(self, item_id: uuid.UUID) -> Optional[datetime]:
+        """Only the item's updated_at, for answering conditional requests; None if it does not exist"""
+        return await self.read_db.scalar(select_item_updated_at(item_id))
+
+    async def get_shop_version(self, shop_id: uuid.UUID) -> int:
+        """Counter bumped by every write to the shop's items; 0 for a shop never written to"""
+        return (await self.read_db.scalar(select_shop_version(shop_id))) or 0
+
+    async def get_by_shop_id(self, shop_id: uuid.UUID, skip: int = 0, limit: int = 100) -> List[InventoryItem]:
+        result = await self.read_db.execute(select_items_by_shop(shop_id, skip, limit))
+        return [construct_domain(row) for row in result.all()]
+
+    async def get_all(self, skip: int = 0, limit: int = 100) -> List[InventoryItem]:
+        result = await self.read_db.execute(select_active_items(skip, limit))
+        return [construct_domain(row) for row in result.all()]
+
+    async def get_page_by_shop_id(self, shop_id: uuid.UUID, limit: int = 100, cursor: Optional[str] = None) -> InventoryItemPage:
+        result = await self.read_db.execute(select_items_by_shop(shop_id, limit=limit + 1, cursor=cursor))
+        return to_page(result.all(), limit)
+
+    async def get_page(self, limit: int = 100, cursor: Optional[str] = None) -> InventoryItemPage:
+        result = await self.read_db.execute(select_active_items(limit=limit + 1, cursor=cursor))
+        return to_page(result.all(), limit)
+
+    async def stream_by_shop_id(self, shop_id: uuid.UUID, batch_size: int = 1000) -> AsyncIterator[InventoryItem]:
+        """Yield a shop's active items from a server-side cursor, fetching batch_size rows at a time"""
+        result = await self.read_db.stream(select_shop_export(shop_id).execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            for row in rows:
+                yield construct_domain(row)
+
+    async def update(self, item_id: uuid.UUID, item_update: InventoryItemUpdate, commit: bool = True) -> Optional[InventoryItem]:
+        update_data = item_update.model_dump(exclude_unset=True)
+        if not update_data:
+            return await self.get_by_id(item_id)
+
+        db_item = (await self.db.scalars(update_item_returning(item_id, update_data))).first()
+        item = map_to_domain(db_item) if db_item else None
+        if commit:
+            await self.db.commit()
+        return item
+
+    async def adjust_quantity(self, item_id: uuid.UUID, delta: int, floor: int = 0, commit: bool = True) -> Optional[InventoryItem]:
+        """Atomically add delta to quantity; None if the item is missing or would drop below floor"""
+        db_item = (await self.db.scalars(adjust_quantity_returning(item_id, delta, floor))).first()
+        item = map_to_domain(db_item) if db_item else None
+        if commit:
+            await self.db.commit()
+        return item
+
+    async def adjust_quantities(self, adjustments: List[QuantityAdjustment], floor: int = 0, commit: bool = True) -> Tuple[List[InventoryItem], List[uuid.UUID]]:
+        """Apply many deltas in one transaction, all or nothing.
+
+        Returns the updated items and an empty list, or no items and the ids
+        whose adjustment could not be applied. Those roll back the transaction,
+        or with commit=False only a savepoint around the batch, so the caller's
+        earlier writes survive.
+        """
+        deltas = merge_deltas(adjustments)
+        savepoint = None if commit else await self.db.begin_nested()
+        db_items = (await self.db.scalars(adjust_quantities_returning(deltas, floor))).all()
+        failed = set(deltas) - {db_item.id for db_item in db_items}
+        if failed:
+            await (self.db if savepoint is None else savepoint).rollback()
+            return [], [item_id for item_id in deltas if item_id in failed]
+        updated_items = [map_to_domain(db_item) for db_item in db_items]
+        if savepoint is not None:
+            await savepoint.commit()
+        if commit:
+            await self.db.commit()
+        return updated_items, []
+
+    async def delete(self, item_id: uuid.UUID) -> bool:
+        return await self.soft_delete(item_id) is not None
+
+    async def soft_delete(self, item_id: uuid.UUID, commit: bool = True) -> Optional[InventoryItem]:
+        """Deactivate the item with one UPDATE ... RETURNING; None if it does not exist"""
+        db_item = (await self.db.scalars(soft_delete_returning(item_id))).first()
+        item = map_to_domain(db_item) if db_item else None
+        if commit:
+            await self.db.commit()
+        return item
+
+    async def delete_many(self, item_ids: List[uuid.UUID], commit: bool = True) -> List[Tuple[uuid.UUID, uuid.UUID]]:
+        """Deactivate the given items; returns (item_id, shop_id) for each one actually deactivated"""
+        if not item_ids:
+            return []
+        rows = (await self.db.execute(soft_delete_many_returning(item_ids=item_ids))).all()
+        if commit:
+            await self.db.commit()
+        return [(row.id, row.shop_id) for row in rows]
+
+    async def delete_by_shop(self, shop_id: uuid.UUID, commit: bool = True) -> List[Tuple[uuid.UUID, uuid.UUID]]:
+        """Deactivate every active item of a shop in one statement"""
+        rows = (await self.db.execute(soft_delete_many_returning(shop_id=shop_id))).all()
+        if commit:
+            await self.db.commit()
+        return [(row.id, row.shop_id) for row in rows]
+
+    async def add_outbox_messages(self, messages: List[Dict[str, Any]], commit: bool = True):
+        """Queue events for the outbox relay; pass commit=False writes first so both commit together"""
+        if messages:
+            await self.db.execute(insert_outbox_messages(), messages)
+        if commit:
+            await self.db.commit()
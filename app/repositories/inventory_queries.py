@@ -0,0 +1,252 @@
+# app/repositories/inventory_queries.py
+# Statements and row mapping shared by the sync and async inventory repositories
+import uuid
+from typing import Any, Dict, List, Optional
+from datetime import timedelta
+from sqlalchemy import select, insert, update, delete, values, column, literal_column, table, text, func, or_, tuple_, any_, bindparam, Integer, Row
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert as pg_insert
+from ..models.database.inventory import InventoryItemModel, InventoryShopVersionModel, OutboxMessageModel
+from ..models.domain.inventory import InventoryItem, InventoryItemPage
+from .pagination import encode_cursor, decode_cursor
+
+# Every listing uses the same total order so offset and cursor pages agree
+LISTING_ORDER = (InventoryItemModel.created_at, InventoryItemModel.id)
+
+# Reads select plain columns: rows skip ORM identity-map bookkeeping and are
+# turned into domain objects by construct_domain
+ITEM_COLUMNS = tuple(InventoryItemModel.__table__.columns)
+
+
+def select_item_by_id(item_id: uuid.UUID):
+    return select(*ITEM_COLUMNS).where(InventoryItemModel.id == item_id)
+
+def select_items_by_ids(item_ids: List[uuid.UUID]):
+    """WHERE id = ANY(:ids): one array parameter, so the statement text is the same for any number of ids"""
+    ids = bindparam("ids", list(item_ids), type_=ARRAY(UUID(as_uuid=True)))
+    return select(*ITEM_COLUMNS).where(InventoryItemModel.id == any_(ids))
+
+def select_item_updated_at(item_id: uuid.UUID):
+    return select(InventoryItemModel.updated_at).where(InventoryItemModel.id == item_id)
+
+def select_shop_version(shop_id: uuid.UUID):
+    return select(InventoryShopVersionModel.version).where(InventoryShopVersionModel.shop_id == shop_id)
+
+def select_items_by_shop(shop_id: uuid.UUID, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    stmt = select(*ITEM_COLUMNS)\
+        .where(InventoryItemModel.shop_id == shop_id, InventoryItemModel.is_active == True)
+    return _paginate(stmt, skip, limit, cursor)
+
+def select_active_items(skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    stmt = select(*ITEM_COLUMNS)\
+        .where(InventoryItemModel.is_active == True)
+    return _paginate(stmt, skip, limit, cursor)
+
+def select_shop_export(shop_id: uuid.UUID):
+    """Every active item of a shop in listing order; meant to be streamed with yield_per"""
+    return select(*ITEM_COLUMNS)\
+        .where(InventoryItemModel.shop_id == shop_id, InventoryItemModel.is_active == True)\
+        .order_by(*LISTING_ORDER)
+
+def insert_items_returning():
+    """Multi-row INSERT ... RETURNING; executed with a list of row dicts, SQLAlchemy
+    sends the rows as batched VALUES lists and returns them in parameter order"""
+    return insert(InventoryItemModel).returning(InventoryItemModel, sort_by_parameter_order=True)
+
+def insert_item_returning(row: Dict[str, Any]):
+    return insert(InventoryItemModel).values(**row).returning(InventoryItemModel)
+
+def update_item_returning(item_id: uuid.UUID, update_data: Dict[str, Any]):
+    return update(InventoryItemModel)\
+        .where(InventoryItemModel.id == item_id)\
+        .values(**update_data)\
+        .returning(InventoryItemModel)\
+        .execution_options(populate_existing=True)
+
+def soft_delete_returning(item_id: uuid.UUID):
+    """Deactivate one item in a single statement, returning the deactivated row"""
+    return update(InventoryItemModel)\
+        .where(InventoryItemModel.id == item_id)\
+        .values(is_active=False)\
+        .returning(InventoryItemModel)\
+        .execution_options(populate_existing=True)
+
+def soft_delete_many_returning(item_ids: Optional[List[uuid.UUID]] = None, shop_id: Optional[uuid.UUID] = None):
+    """Deactivate still-active items by id list and/or shop, returning (id, shop_id) pairs"""
+    stmt = update(InventoryItemModel).where(InventoryItemModel.is_active == True)
+    if item_ids is not None:
+        stmt = stmt.where(InventoryItemModel.id.in_(item_ids))
+    if shop_id is not None:
+        stmt = stmt.where(InventoryItemModel.shop_id == shop_id)
+    return stmt.values(is_active=False)\
+        .returning(InventoryItemModel.id, InventoryItemModel.shop_id)\
+        .execution_options(synchronize_session=False)
+
+def adjust_quantity_returning(item_id: uuid.UUID, delta: int, floor: int = 0):
+    """Single conditional UPDATE: applies delta only if the result stays at or above floor"""
+    new_quantity = InventoryItemModel.quantity + delta
+    return update(InventoryItemModel)\
+        .where(InventoryItemModel.id == item_id, InventoryItemModel.is_active == True, new_quantity >= floor)\
+        .values(quantity=new_quantity)\
+        .returning(InventoryItemModel)\
+        .execution_options(populate_existing=True)
+
+def adjust_quantities_returning(deltas: Dict[uuid.UUID, int], floor: int = 0):
+    """UPDATE ... FROM (VALUES ...) applying a per-item delta to many rows in one statement"""
+    adjustments = values(
+        column("item_id", UUID(as_uuid=True)), column("delta", Integer), name="adjustments"
+    ).data(list(deltas.items()))
+    new_quantity = InventoryItemModel.quantity + adjustments.c.delta
+    return update(InventoryItemModel)\
+        .where(
+            InventoryItemModel.id == adjustments.c.item_id,
+            InventoryItemModel.is_active == True,
+            new_quantity >= floor,
+        )\
+        .values(quantity=new_quantity)\
+        .returning(InventoryItemModel)\
+        .execution_options(populate_existing=True)
+
+# Bulk imports COPY rows into a per-connection temp table, then merge them in one statement
+IMPORT_STAGING_TABLE = "inventory_import_staging"
+IMPORT_COLUMNS = ("id", "shop_id", "name", "description", "category", "price", "quantity", "image_urls")
+
+def create_import_staging():
+    """Temp table shaped like inventory_items; emptied by every commit so each chunk starts clean"""
+    return text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {IMPORT_STAGING_TABLE} "
+        "(LIKE inventory_items INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    )
+
+def copy_into_import_staging() -> str:
+    """COPY for the CSV written by the import pipeline; an empty image_urls cell means NULL"""
+    return (
+        f"COPY {IMPORT_STAGING_TABLE} ({', '.join(IMPORT_COLUMNS)}) FROM STDIN "
+        "WITH (FORMAT csv, FORCE_NULL (image_urls))"
+    )
+
+def merge_import_staging():
+    """Insert staged rows; rows whose id already exists update that item when it belongs to the same shop.
+
+    Returns ITEM_COLUMNS and "inserted" (xmax = 0: the row is new, not
+    updated) for every row written. Rows with an id owned by another shop
+    match the conflict but fail the WHERE clause, so they are left untouched
+    and not returned.
+    """
+    staging = table(IMPORT_STAGING_TABLE, *[column(name) for name in IMPORT_COLUMNS])
+    stmt = pg_insert(InventoryItemModel).from_select(IMPORT_COLUMNS, select(*staging.c))
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=[InventoryItemModel.id],
+        set_={
+            "name": excluded.name,
+            "description": excluded.description,
+            "category": excluded.category,
+            "price": excluded.price,
+            "quantity": excluded.quantity,
+            "image_urls": func.coalesce(excluded.image_urls, InventoryItemModel.image_urls),
+            "is_active": True,
+            "updated_at": func.now(),
+        },
+        where=InventoryItemModel.shop_id == excluded.shop_id,
+    ).returning(*ITEM_COLUMNS, literal_column(f"({InventoryItemModel.__tablename__}.xmax = 0)").label("inserted"))
+
+# Outbox: events inserted in the write's transaction, claimed and marked sent by the relay
+def insert_outbox_messages():
+    """Executed with a list of {exchange, routing_key, payload, properties} dicts"""
+    return insert(OutboxMessageModel)
+
+def claim_outbox_batch(limit: int, lease: timedelta, exclude: List[int]):
+    """Lease the oldest unsent, unleased messages and return them.
+
+    Rows locked by another relay's claim are skipped, not waited on; exclude
+    holds ids this relay still has publishes in flight for.
+    """
+    claimable = select(OutboxMessageModel.id)\
+        .where(OutboxMessageModel.sent_at.is_(None))\
+        .where(or_(OutboxMessageModel.claimed_until.is_(None), OutboxMessageModel.claimed_until < func.now()))\
+        .order_by(OutboxMessageModel.id)\
+        .limit(limit)\
+        .with_for_update(skip_locked=True)
+    if exclude:
+        claimable = claimable.where(OutboxMessageModel.id.not_in(exclude))
+    return update(OutboxMessageModel)\
+        .where(OutboxMessageModel.id.in_(claimable))\
+        .values(claimed_until=func.now() + lease)\
+        .returning(
+            OutboxMessageModel.id, OutboxMessageModel.exchange, OutboxMessageModel.routing_key,
+            OutboxMessageModel.payload, OutboxMessageModel.properties,
+        )\
+        .execution_options(synchronize_session=False)
+
+def renew_outbox_claims(message_ids: List[int], lease: timedelta):
+    return update(OutboxMessageModel)\
+        .where(OutboxMessageModel.id.in_(message_ids))\
+        .values(claimed_until=func.now() + lease)\
+        .execution_options(synchronize_session=False)
+
+def release_outbox_claims(message_ids: List[int]):
+    """Make messages claimable again at once, e.g. after a nack"""
+    return update(OutboxMessageModel)\
+        .where(OutboxMessageModel.id.in_(message_ids))\
+        .values(claimed_until=None)\
+        .execution_options(synchronize_session=False)
+
+def mark_outbox_sent(message_ids: List[int]):
+    return update(OutboxMessageModel)\
+        .where(OutboxMessageModel.id.in_(message_ids))\
+        .values(sent_at=func.now())\
+        .execution_options(synchronize_session=False)
+
+def prune_outbox_sent(retention: timedelta):
+    """Delete messages sent more than retention ago, measured on the database clock like sent_at"""
+    return delete(OutboxMessageModel)\
+        .where(OutboxMessageModel.sent_at < func.now() - retention)\
+        .execution_options(synchronize_session=False)
+
+def merge_deltas(adjustments) -> Dict[uuid.UUID, int]:
+    """Sum deltas per item so repeated ids become a single row in the UPDATE"""
+    deltas = {}
+    for adjustment in adjustments:
+        deltas[adjustment.item_id] = deltas.get(adjustment.item_id, 0) + adjustment.delta
+    return deltas
+
+def _paginate(stmt, skip: int, limit: int, cursor: Optional[str]):
+    """Offset pages when no cursor is given, otherwise seek past the cursor row"""
+    stmt = stmt.order_by(*LISTING_ORDER)
+    if cursor:
+        stmt = stmt.where(tuple_(*LISTING_ORDER) > tuple_(*decode_cursor(cursor)))
+        return stmt.limit(limit)
+    return stmt.offset(skip).limit(limit)
+
+def to_page(rows: List[Row], limit: int) -> InventoryItemPage:
+    """Build a page from up to limit + 1 rows; the extra row only signals there is more"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return InventoryItemPage.model_construct(items=[construct_domain(row) for row in rows], next_cursor=next_cursor)
+
+def construct_domain(row: Row) -> InventoryItem:
+    """Fast path for rows read with ITEM_COLUMNS.
+
+    The database already guarantees the column types, so the domain object is
+    built with model_construct, skipping pydantic validation, which dominates
+    the cost on large listings (see benchmarks/bench_serialization.py).
+    """
+    return InventoryItem.model_construct(**row._mapping)
+
+def map_to_domain(db_item: InventoryItemModel) -> InventoryItem:
+    return InventoryItem(
+        id=db_item.id,
+        shop_id=db_item.shop_id,
+        name=db_item.name,
+        description=db_item.description,
+        category=db_item.category,
+        price=db_item.price,
+        quantity=db_item.quantity,
+        image_urls=db_item.image_urls,
+        created_at=db_item.created_at,
+        updated_at=db_item.updated_at,
+        is_active=db_item.is_active
+    )
@@ -1,69 +1,153 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import uuid
+from datetime import datetime
 from ..models.database.inventory import InventoryItemModel
-from ..models.domain.inventory import InventoryItem, InventoryItemCreate, InventoryItemUpdate
+from ..models.domain.inventory import InventoryItem, InventoryItemCreate, InventoryItemUpdate, InventoryItemPage, QuantityAdjustment
+from .inventory_queries import select_item_by_id, select_items_by_ids, select_item_updated_at, select_shop_version, select_items_by_shop, select_active_items, select_shop_export, insert_items_returning,\
+    insert_item_returning, update_item_returning, soft_delete_returning, soft_delete_many_returning,\
+    adjust_quantity_returning, adjust_quantities_returning, insert_outbox_messages, merge_deltas, map_to_domain, construct_domain, to_page
 
 class InventoryRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, read_db: Optional[Session] = None):
         self.db = db
+        # Read methods go to the replica session when one is given
+        self.read_db = read_db or db
   
-    def create(self, item: InventoryItemCreate) -> InventoryItem:
-        db_item = InventoryItemModel(**item.model_dump())
-        self.db.add(db_item)
-        self.db.commit()
-        self.db.refresh(db_item)
-        return self._map_to_domain(db_item)
+    def create(self, item: InventoryItemCreate, commit: bool = True) -> InventoryItem:
+        db_item = self.db.scalars(insert_item_returning(item.model_dump())).one()
+        created_item = self._map_to_domain(db_item)
+        if commit:
+            self.db.commit()
+        return created_item
  
+    def bulk_create(self, items: List[InventoryItemCreate], commit: bool = True) -> List[InventoryItem]:
+        """Insert all items in one transaction with multi-row INSERT ... RETURNING"""
+        if not items:
+            return []
+        rows = [item.model_dump() for item in items]
+        db_items = self.db.scalars(insert_items_returning(), rows).all()
+        created_items = [self._map_to_domain(db_item) for db_item in db_items]
+        if commit:
+            self.db.commit()
+        return created_items
+
     def get_by_id(self, item_id: uuid.UUID) -> Optional[InventoryItem]:
-        db_item = self.db.query(InventoryItemModel).filter(InventoryItemModel.id == item_id).first()
-        if not db_item:
+        row = self.read_db.execute(select_item_by_id(item_id)).first()
+        if not row:
             return None
-        return self._map_to_domain(db_item)
+        return construct_domain(row)
+
+    def get_by_ids(self, item_ids: List[uuid.UUID]) -> List[InventoryItem]:
+        """Every item with one of the ids, active or not, in one query; unknown ids are left out"""
+        rows = self.read_db.execute(select_items_by_ids(item_ids)).all()
+        return [construct_domain(row) for row in rows]
+
+    def get_updated_at(self, item_id: uuid.UUID) -> Optional[datetime]:
+        """Only the item's updated_at, for answering conditional requests; None if it does not exist"""
+        return self.read_db.scalar(select_item_updated_at(item_id))
+
+    def get_shop_version(self, shop_id: uuid.UUID) -> int:
+        """Counter bumped by every write to the shop's items; 0 for a shop never written to"""
+        return self.read_db.scalar(select_shop_version(shop_id)) or 0
 
     def get_by_shop_id(self, shop_id: uuid.UUID, skip: int = 0, limit: int = 100) -> List[InventoryItem]:
-        db_items = self.db.query(InventoryItemModel)\
-            .filter(InventoryItemModel.shop_id == shop_id, InventoryItemModel.is_active == True)\
-            .offset(skip).limit(limit).all()
-        return [self._map_to_domain(item) for item in db_items]
+        rows = self.read_db.execute(select_items_by_shop(shop_id, skip, limit)).all()
+        return [construct_domain(row) for row in rows]
 
     def get_all(self, skip: int = 0, limit: int = 100) -> List[InventoryItem]:
-        db_items = self.db.query(InventoryItemModel).filter(InventoryItemModel.is_active == True).offset(skip).limit(limit).all()
-        return [self._map_to_domain(item) for item in db_items]
+        rows = self.read_db.execute(select_active_items(skip, limit)).all()
+        return [construct_domain(row) for row in rows]
 
-    def update(self, item_id: uuid.UUID, item_update: InventoryItemUpdate) -> Optional[InventoryItem]:
-        db_item = self.db.query(InventoryItemModel).filter(InventoryItemModel.id == item_id).first()
-        if not db_item:
-            return None
-        
+    def get_page_by_shop_id(self, shop_id: uuid.UUID, limit: int = 100, cursor: Optional[str] = None) -> InventoryItemPage:
+        rows = self.read_db.execute(select_items_by_shop(shop_id, limit=limit + 1, cursor=cursor)).all()
+        return to_page(rows, limit)
+
+    def get_page(self, limit: int = 100, cursor: Optional[str] = None) -> InventoryItemPage:
+        rows = self.read_db.execute(select_active_items(limit=limit + 1, cursor=cursor)).all()
+        return to_page(rows, limit)
+
+    def stream_by_shop_id(self, shop_id: uuid.UUID, batch_size: int = 1000) -> Iterator[InventoryItem]:
+        """Yield a shop's active items from a server-side cursor, fetching batch_size rows at a time"""
+        result = self.read_db.execute(select_shop_export(shop_id).execution_options(yield_per=batch_size))
+        for rows in result.partitions():
+            for row in rows:
+                yield construct_domain(row)
+
+    def update(self, item_id: uuid.UUID, item_update: InventoryItemUpdate, commit: bool = True) -> Optional[InventoryItem]:
         update_data = item_update.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_item, key, value)
-        
-        self.db.commit()
-        self.db.refresh(db_item)
-        return self._map_to_domain(db_item)
+        if not update_data:
+            return self.get_by_id(item_id)
+
+        db_item = self.db.scalars(update_item_returning(item_id, update_data)).first()
+        item = self._map_to_domain(db_item) if db_item else None
+        if commit:
+            self.db.commit()
+        return item
+
+    def adjust_quantity(self, item_id: uuid.UUID, delta: int, floor: int = 0, commit: bool = True) -> Optional[InventoryItem]:
+        """Atomically add delta to quantity; None if the item is missing or would drop below floor"""
+        db_item = self.db.scalars(adjust_quantity_returning(item_id, delta, floor)).first()
+        item = self._map_to_domain(db_item) if db_item else None
+        if commit:
+            self.db.commit()
+        return item
+
+    def adjust_quantities(self, adjustments: List[QuantityAdjustment], floor: int = 0, commit: bool = True) -> Tuple[List[InventoryItem], List[uuid.UUID]]:
+        """Apply many deltas in one transaction, all or nothing.
+
+        Returns the updated items and an empty list, or no items and the ids
+        whose adjustment could not be applied. Those roll back the transaction,
+        or with commit=False only a savepoint around the batch, so the caller's
+        earlier writes survive.
+        """
+        deltas = merge_deltas(adjustments)
+        savepoint = None if commit else self.db.begin_nested()
+        db_items = self.db.scalars(adjust_quantities_returning(deltas, floor)).all()
+        failed = set(deltas) - {db_item.id for db_item in db_items}
+        if failed:
+            (self.db if savepoint is None else savepoint).rollback()
+            return [], [item_id for item_id in deltas if item_id in failed]
+        updated_items = [self._map_to_domain(db_item) for db_item in db_items]
+        if savepoint is not None:
+            savepoint.commit()
+        if commit:
+            self.db.commit()
+        return updated_items, []
 
     def delete(self, item_id: uuid.UUID) -> bool:
-        db_item = self.db.query(InventoryItemModel).filter(InventoryItemModel.id == item_id).first()
-        if not db_item:
-            return False
-        
-        db_item.is_active = False
-        self.db.commit()
-        return True
+        return self.soft_delete(item_id) is not None
+
+    def soft_delete(self, item_id: uuid.UUID, commit: bool = True) -> Optional[InventoryItem]:
+        """Deactivate the item with one UPDATE ... RETURNING; None if it does not exist"""
+        db_item = self.db.scalars(soft_delete_returning(item_id)).first()
+        item = self._map_to_domain(db_item) if db_item else None
+        if commit:
+            self.db.commit()
+        return item
+
+    def delete_many(self, item_ids: List[uuid.UUID], commit: bool = True) -> List[Tuple[uuid.UUID, uuid.UUID]]:
+        """Deactivate the given items; returns (item_id, shop_id) for each one actually deactivated"""
+        if not item_ids:
+            return []
+        rows = self.db.execute(soft_delete_many_returning(item_ids=item_ids)).all()
+        if commit:
+            self.db.commit()
+        return [(row.id, row.shop_id) for row in rows]
+
+    def delete_by_shop(self, shop_id: uuid.UUID, commit: bool = True) -> List[Tuple[uuid.UUID, uuid.UUID]]:
+        """Deactivate every active item of a shop in one statement"""
+        rows = self.db.execute(soft_delete_many_returning(shop_id=shop_id)).all()
+        if commit:
+            self.db.commit()
+        return [(row.id, row.shop_id) for row in rows]
+
+    def add_outbox_messages(self, messages: List[Dict[str, Any]], commit: bool = True):
+        """Queue events for the outbox relay; pass commit=False writes first so both commit together"""
+        if messages:
+            self.db.execute(insert_outbox_messages(), messages)
+        if commit:
+            self.db.commit()
 
     def _map_to_domain(self, db_item: InventoryItemModel) -> InventoryItem:
-        return InventoryItem(
-            id=db_item.id,
-            shop_id=db_item.shop_id,
-            name=db_item.name,
-            description=db_item.description,
-            category=db_item.category,
-            price=db_item.price,
-            quantity=db_item.quantity,
-            image_urls=db_item.image_urls,  # Changed from image_url to image_urls
-            created_at=db_item.created_at,
-            updated_at=db_item.updated_at,
-            is_active=db_item.is_active
-        )
\ No newline at end of file
+        return map_to_domain(db_item)
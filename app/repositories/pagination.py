@@ -0,0 +1,23 @@
+# app/repositories/pagination.py
+# Opaque keyset cursors over the (created_at, id) listing order
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, item_id: uuid.UUID) -> str:
+    """Token pointing just past the given row"""
+    raw = json.dumps([created_at.isoformat(), str(item_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, uuid.UUID]:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), uuid.UUID(item_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
@@ -0,0 +1,63 @@
+# app/responses.py
+import uuid
+from datetime import datetime
+from typing import Any, Optional
+import orjson
+from fastapi import Response, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _orjson_default(obj: Any):
+    # Domain models here have no aliases or custom serializers, so their field
+    # values are exactly the JSON shape; orjson handles UUID/datetime natively
+    if isinstance(obj, BaseModel):
+        return vars(obj)
+    # asyncpg returns its own uuid.UUID subclass, which orjson only handles exactly
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize with orjson, accepting the domain models returned by repositories"""
+    return orjson.dumps(content, default=_orjson_default)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered by orjson.
+
+    Return it directly from an endpoint to skip FastAPI's response_model
+    validation; only do that with data that is already well-typed, such as
+    models built by the repositories from database rows.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def item_etag(item_id: uuid.UUID, updated_at: datetime) -> str:
+    """Strong ETag of one item; every write to the row moves updated_at"""
+    return f'"{item_id}-{updated_at.strftime("%Y%m%d%H%M%S%f")}"'
+
+
+def shop_listing_etag(shop_id: uuid.UUID, version: int) -> str:
+    """Strong ETag of a shop listing, from the shop version bumped by every write to its items"""
+    return f'"{shop_id}-v{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str, exists: bool = True) -> bool:
+    """If-None-Match check; the header uses weak comparison, so W/ prefixes are ignored.
+
+    "*" matches any current representation, so only when the resource exists.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return exists
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return etag in (candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -1,13 +1,28 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status, UploadFile, File, Form, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+import asyncio
+import os
 import uuid
 import json
+import tempfile
 from prometheus_client import Counter
-from ..db.database import get_db
-from ..models.domain.inventory import InventoryItem, InventoryItemCreate, InventoryItemUpdate
-from ..services.inventory_service import InventoryService
+from ..db.database import get_async_db, get_async_read_db, open_async_read_session, get_engine
+from ..dependencies.messaging import get_publisher
+from ..models.domain.inventory import (
+    InventoryItem, InventoryItemCreate, InventoryItemUpdate, InventoryItemPage, BulkCreateResult,
+    QuantityAdjustmentRequest, BatchQuantityAdjustmentRequest, BatchQuantityAdjustmentResult,
+    BulkDeleteRequest, BulkDeleteResult, ImportJobStatus, AvailabilityRequest, AvailabilityResponse, BulkItemError,
+)
+from ..messaging.async_publisher import AsyncRabbitMQPublisher
+from ..messaging.outbox import EVENT_OUTBOX_ENABLED
+from ..services.inventory_service import AsyncInventoryService, ShopInactive
+from ..services.bulk_items import parse_item_rows, validate_item_rows
+from ..services.item_export import EXPORT_ENCODERS, EXPORT_MEDIA_TYPES
+from ..services.item_import import IMPORT_MAX_BYTES, import_jobs, import_format_for
+from ..responses import ORJSONResponse, item_etag, shop_listing_etag, etag_matches, not_modified
 from prometheus_client import Gauge
 
 router = APIRouter(
@@ -29,6 +44,8 @@ INVENTORY_ITEMS_BY_CATEGORY = Gauge(
     ['category', 'shop_id']
 )
 
+BULK_CREATE_MAX_ITEMS = int(os.getenv("BULK_CREATE_MAX_ITEMS", "10000"))
+
 
 @router.post("/items/", response_model=InventoryItem, status_code=status.HTTP_201_CREATED)
 async def create_inventory_item(
@@ -39,7 +56,8 @@ async def create_inventory_item(
     price: float = Form(...),
     quantity: int = Form(...),
     images: List[UploadFile] = File(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    publisher: AsyncRabbitMQPublisher = Depends(get_publisher),
 ):
     """Create inventory item with metrics tracking"""
     try:
@@ -53,8 +71,8 @@ async def create_inventory_item(
             quantity=quantity
         )
         
-        inventory_service = InventoryService(db)
-        created_item = inventory_service.create_item(item_data)
+        inventory_service = AsyncInventoryService(db, publisher, outbox=EVENT_OUTBOX_ENABLED)
+        created_item = await inventory_service.create_item(item_data)
         
         # Update metrics
         INVENTORY_OPERATIONS.labels(
@@ -76,6 +94,13 @@ async def create_inventory_item(
         
         return created_item
     
+    except ShopInactive as e:
+        INVENTORY_OPERATIONS.labels(
+            operation="create",
+            shop_id=str(shop_id),
+            status="rejected"
+        ).inc()
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         INVENTORY_OPERATIONS.labels(
             operation="create",
@@ -84,6 +109,294 @@ async def create_inventory_item(
         ).inc()
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.post("/items/bulk", response_model=BulkCreateResult)
+async def bulk_create_inventory_items(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    publisher: AsyncRabbitMQPublisher = Depends(get_publisher),
+):
+    """Create many items from a JSON array or NDJSON body.
+
+    Rows that fail validation, or belong to a shop the shop service reports as
+    inactive, are reported by index in ``errors``; the other rows are still
+    inserted together in a single transaction.
+    """
+    try:
+        rows = parse_item_rows(await request.body(), request.headers.get("content-type"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed bulk body: {e}")
+    if len(rows) > BULK_CREATE_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_CREATE_MAX_ITEMS} items per request")
+
+    valid_rows, errors = validate_item_rows(rows)
+
+    inventory_service = AsyncInventoryService(db, publisher, outbox=EVENT_OUTBOX_ENABLED)
+    inactive = await inventory_service.inactive_shops(str(item.shop_id) for _, item in valid_rows)
+    if inactive:
+        errors = sorted(errors + [
+            BulkItemError(index=index, errors=[{"loc": ["shop_id"], "msg": "Shop is not active", "type": "shop_inactive"}])
+            for index, item in valid_rows if str(item.shop_id) in inactive
+        ], key=lambda error: error.index)
+        valid_rows = [(index, item) for index, item in valid_rows if str(item.shop_id) not in inactive]
+    try:
+        created_items = await inventory_service.bulk_create_items([item for _, item in valid_rows])
+    except Exception as e:
+        INVENTORY_OPERATIONS.labels(operation="bulk_create", shop_id="bulk", status="error").inc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    for item in created_items:
+        INVENTORY_OPERATIONS.labels(operation="create", shop_id=str(item.shop_id), status="success").inc()
+    return BulkCreateResult(created=created_items, errors=errors)
+
+
+@router.post("/imports", response_model=ImportJobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def start_inventory_import(request: Request):
+    """Start a background import of a CSV (text/csv) or NDJSON file sent as the raw request body.
+
+    The body is spooled to a temporary file as it arrives, off the event loop,
+    and then imported chunk by chunk; poll GET /inventory/imports/{job_id} for
+    progress. Bodies over IMPORT_MAX_BYTES are refused with 413.
+    """
+    format = import_format_for(request.headers.get("content-type"))
+    if format is None:
+        raise HTTPException(status_code=415, detail="Send the file as text/csv or application/x-ndjson")
+    too_large = HTTPException(status_code=413, detail=f"Imports are limited to {IMPORT_MAX_BYTES} bytes")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > IMPORT_MAX_BYTES:
+        raise too_large
+
+    upload = tempfile.NamedTemporaryFile(prefix="inventory-import-", suffix=f".{format}", delete=False)
+    bytes_total = 0
+    try:
+        with upload:
+            async for chunk in request.stream():
+                bytes_total += len(chunk)
+                if bytes_total > IMPORT_MAX_BYTES:
+                    raise too_large
+                await asyncio.to_thread(upload.write, chunk)
+    except BaseException:
+        os.remove(upload.name)
+        raise
+
+    job = import_jobs.start(upload.name, format, bytes_total, get_engine())
+    INVENTORY_OPERATIONS.labels(operation="import", shop_id="bulk", status="accepted").inc()
+    return job.status()
+
+
+@router.get("/imports/{job_id}", response_model=ImportJobStatus)
+async def get_inventory_import(job_id: uuid.UUID):
+    job = import_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job.status()
+
+
+# Read endpoints return ORJSONResponse directly: repository reads already hold
+# well-typed values, so FastAPI's response_model validation is skipped and
+# response_model only documents the shape
+
+@router.get("/items/", response_model=Union[InventoryItemPage, List[InventoryItem]])
+async def get_all_inventory(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Keyset cursor; pass an empty value for the first page"),
+    db: AsyncSession = Depends(get_async_db),
+    read_db: AsyncSession = Depends(get_async_read_db),
+):
+    """List active items: a plain list with skip/limit, or an InventoryItemPage when cursor is given"""
+    inventory_service = AsyncInventoryService(db, read_db=read_db)
+    if cursor is None:
+        return ORJSONResponse(await inventory_service.get_all_items(skip, limit))
+    try:
+        return ORJSONResponse(await inventory_service.get_all_items_page(limit, cursor))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/items/{item_id}", response_model=InventoryItem)
+async def get_inventory_item(
+    request: Request,
+    item_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_db),
+    read_db: AsyncSession = Depends(get_async_read_db),
+):
+    """Get one item; answers If-None-Match with 304 after reading only its updated_at"""
+    inventory_service = AsyncInventoryService(db, read_db=read_db)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        updated_at = await inventory_service.get_item_updated_at(item_id)
+        if updated_at is not None and etag_matches(if_none_match, item_etag(item_id, updated_at)):
+            return not_modified(item_etag(item_id, updated_at))
+
+    item = await inventory_service.get_item(item_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Inventory item not found")
+    headers = {"ETag": item_etag(item.id, item.updated_at)} if item.updated_at else None
+    return ORJSONResponse(item, headers=headers)
+
+
+# Get all inventory items for a specific shop
+@router.get("/shop/{shop_id}", response_model=Union[InventoryItemPage, List[InventoryItem]])
+async def get_shop_inventory(
+    request: Request,
+    shop_id: uuid.UUID,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Keyset cursor; pass an empty value for the first page"),
+    db: AsyncSession = Depends(get_async_db),
+    read_db: AsyncSession = Depends(get_async_read_db),
+):
+    """List a shop's active items: a plain list with skip/limit, or an InventoryItemPage when cursor is given.
+
+    The ETag comes from the shop version, read before the listing so the body
+    is never older than its tag; a matching If-None-Match costs only that lookup.
+    """
+    inventory_service = AsyncInventoryService(db, read_db=read_db)
+    version = await inventory_service.get_shop_version(shop_id)
+    etag = shop_listing_etag(shop_id, version)
+    # Version 0: nothing was ever written to the shop
+    if etag_matches(request.headers.get("if-none-match"), etag, exists=version > 0):
+        return not_modified(etag)
+
+    headers = {"ETag": etag}
+    if cursor is None:
+        return ORJSONResponse(await inventory_service.get_items_by_shop(shop_id, skip, limit, version), headers=headers)
+    try:
+        return ORJSONResponse(await inventory_service.get_items_page_by_shop(shop_id, limit, cursor, version), headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/shop/{shop_id}/export")
+async def export_shop_inventory(
+    request: Request,
+    shop_id: uuid.UUID,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+):
+    """Stream every active item of a shop as NDJSON or CSV.
+
+    Rows come from a server-side cursor and are encoded as they arrive, so
+    memory use does not grow with the size of the shop.
+    """
+    async def body():
+        # The body is sent after this handler returns, so the stream owns its session
+        async with open_async_read_session(request) as read_db:
+            inventory_service = AsyncInventoryService(read_db, read_db=read_db)
+            async for chunk in EXPORT_ENCODERS[format](inventory_service.export_shop_items(shop_id)):
+                yield chunk
+
+    INVENTORY_OPERATIONS.labels(operation="export", shop_id=str(shop_id), status="success").inc()
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="inventory-{shop_id}.{format}"'},
+    )
+
+
+@router.put("/items/{item_id}", response_model=InventoryItem)
+async def update_inventory_item(
+    item_id: uuid.UUID,
+    item_update: InventoryItemUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    publisher: AsyncRabbitMQPublisher = Depends(get_publisher),
+):
+    inventory_service = AsyncInventoryService(db, publisher, outbox=EVENT_OUTBOX_ENABLED)
+    updated_item = await inventory_service.update_item(item_id, item_update)
+    if updated_item is None:
+        raise HTTPException(status_code=404, detail="Inventory item not found")
+
+    INVENTORY_OPERATIONS.labels(
+        operation="update",
+        shop_id=str(updated_item.shop_id),
+        status="success"
+    ).inc()
+    return updated_item
+
+
+@router.patch("/items/quantity", response_model=BatchQuantityAdjustmentResult)
+async def adjust_inventory_quantities(
+    request: BatchQuantityAdjustmentRequest,
+    db: AsyncSession = Depends(get_async_db),
+    publisher: AsyncRabbitMQPublisher = Depends(get_publisher),
+):
+    """Apply stock deltas to many items in one transaction; 409 and nothing applied if any would underflow"""
+    inventory_service = AsyncInventoryService(db, publisher, outbox=EVENT_OUTBOX_ENABLED)
+    updated_items, failed = await inventory_service.adjust_quantities(request.adjustments, request.floor)
+    result = BatchQuantityAdjustmentResult(applied=not failed, items=updated_items, failed=failed)
+    if failed:
+        raise HTTPException(status_code=409, detail=result.model_dump(mode="json"))
+    return result
+
+
+@router.patch("/items/{item_id}/quantity", response_model=InventoryItem)
+async def adjust_inventory_quantity(
+    item_id: uuid.UUID,
+    adjustment: QuantityAdjustmentRequest,
+    db: AsyncSession = Depends(get_async_db),
+    publisher: AsyncRabbitMQPublisher = Depends(get_publisher),
+):
+    """Atomically add delta (negative to take stock) without reading the item first"""
+    inventory_service = AsyncInventoryService(db, publisher, outbox=EVENT_OUTBOX_ENABLED)
+    updated_item = await inventory_service.adjust_quantity(item_id, adjustment.delta, adjustment.floor)
+    if updated_item is None:
+        item = await inventory_service.get_item(item_id)
+        if item is None or not item.is_active:
+            raise HTTPException(status_code=404, detail="Inventory item not found")
+        raise HTTPException(status_code=409, detail="Insufficient quantity")
+
+    INVENTORY_OPERATIONS.labels(
+        operation="adjust_quantity",
+        shop_id=str(updated_item.shop_id),
+        status="success"
+    ).inc()
+    return updated_item
+
+
+@router.post("/availability", response_model=AvailabilityResponse, response_model_exclude_none=True)
+async def check_inventory_availability(
+    request: AvailabilityRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Whether every requested quantity is in stock; same answer as the inventory_check_queue RPC"""
+    inventory_service = AsyncInventoryService(db)
+    return await inventory_service.check_availability(request.items)
+
+
+@router.delete("/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_inventory_item(
+    item_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_db),
+    publisher: AsyncRabbitMQPublisher = Depends(get_publisher),
+):
+    inventory_service = AsyncInventoryService(db, publisher, outbox=EVENT_OUTBOX_ENABLED)
+    if not await inventory_service.delete_item(item_id):
+        raise HTTPException(status_code=404, detail="Inventory item not found")
+
+
+@router.post("/items/bulk-delete", response_model=BulkDeleteResult)
+async def bulk_delete_inventory_items(
+    request: BulkDeleteRequest,
+    db: AsyncSession = Depends(get_async_db),
+    publisher: AsyncRabbitMQPublisher = Depends(get_publisher),
+):
+    """Soft delete many items with one statement; unknown or already inactive ids are skipped"""
+    inventory_service = AsyncInventoryService(db, publisher, outbox=EVENT_OUTBOX_ENABLED)
+    deleted_ids = await inventory_service.delete_items(request.item_ids)
+    return BulkDeleteResult(deleted=len(deleted_ids), item_ids=deleted_ids)
+
+
+@router.delete("/shop/{shop_id}", response_model=BulkDeleteResult)
+async def delete_shop_inventory(
+    shop_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_db),
+    publisher: AsyncRabbitMQPublisher = Depends(get_publisher),
+):
+    """Soft delete every active item of a shop"""
+    inventory_service = AsyncInventoryService(db, publisher, outbox=EVENT_OUTBOX_ENABLED)
+    deleted_ids = await inventory_service.delete_shop_items(shop_id)
+    return BulkDeleteResult(deleted=len(deleted_ids), item_ids=deleted_ids)
+
 # from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
 # from sqlalchemy.orm import Session
 # from typing import List, Optional
@@ -169,19 +482,6 @@ async def create_inventory_item(
 #         ).inc()
 #         raise HTTPException(status_code=500, detail=str(e))
 
-# Get all inventory items for a specific shop
-# @router.get("/shop/{shop_id}", response_model=List[InventoryItem])
-# async def get_shop_inventory(
-#     shop_id: uuid.UUID,
-#     skip: int = Query(0, ge=0),
-#     limit: int = Query(100, ge=1, le=1000),
-#     db: Session = Depends(get_db),
-#     publisher: RabbitMQPublisher = Depends(get_publisher)
-# ):
-#     inventory_service = InventoryService(db, publisher)
-#     items = inventory_service.get_items_by_shop(shop_id, skip, limit)
-#     return items
-
 # # Add images to existing inventory item
 # @router.post("/items/{item_id}/images", response_model=InventoryItem)
 # async def add_images(
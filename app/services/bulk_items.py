@@ -0,0 +1,72 @@
+# app/services/bulk_items.py
+# Parsing and batched validation of InventoryItemCreate rows for bulk endpoints
+import json
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, List, Tuple, Type
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from ..models.domain.inventory import InventoryItemCreate, BulkItemError
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+@lru_cache(maxsize=None)
+def _batch_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def parse_item_rows(body: bytes, content_type: str) -> List[Any]:
+    """Decode a JSON array or NDJSON body into raw row objects"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in NDJSON_CONTENT_TYPES:
+        return list(iter_ndjson_rows(body.splitlines()))
+
+    rows = json.loads(body)
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of inventory items")
+    return rows
+
+
+def iter_ndjson_rows(lines: Iterable[bytes]) -> Iterator[Any]:
+    """Yield one decoded object per non-blank line; undecodable lines come back as raw text"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield line.decode(errors="replace")
+
+
+def validate_item_rows(rows: List[Any], batch_size: int = 500, start_index: int = 0, model: Type[BaseModel] = InventoryItemCreate) -> Tuple[List[Tuple[int, BaseModel]], List[BulkItemError]]:
+    """Validate rows a batch at a time.
+
+    A clean batch costs one validator call. When a batch has errors, the
+    failing indexes come from the batch error and only the remaining rows are
+    revalidated individually, so one bad row never rejects its neighbours.
+    """
+    valid = []
+    errors = []
+    for offset in range(0, len(rows), batch_size):
+        batch = rows[offset:offset + batch_size]
+        base = start_index + offset
+        try:
+            items = _batch_adapter(model).validate_python(batch)
+            valid.extend((base + i, item) for i, item in enumerate(items))
+            continue
+        except ValidationError as e:
+            failed = {}
+            for error in e.errors(include_url=False, include_context=False):
+                position, field_loc = error["loc"][0], error["loc"][1:]
+                failed.setdefault(position, []).append({
+                    "loc": list(field_loc),
+                    "msg": error["msg"],
+                    "type": error["type"],
+                })
+
+        for i, row in enumerate(batch):
+            if i in failed:
+                errors.append(BulkItemError(index=base + i, errors=failed[i]))
+            else:
+                valid.append((base + i, model.model_validate(row)))
+    return valid, errors
@@ -0,0 +1,145 @@
+# app/services/change_listener.py
+# Background LISTEN on inventory_changes that evicts local cache entries written by any replica
+import asyncio
+import os
+from typing import Callable, Optional
+import asyncpg
+from prometheus_client import Counter, Gauge
+from ..db.database import get_listen_dsn
+from ..db.notifications import CHANGE_CHANNEL, parse_change_payload
+from .item_cache import ItemCache, item_cache, item_change_tags, shop_tag
+
+# Notifications arriving within this window are applied as one invalidation
+CHANGE_COALESCE_SECONDS = float(os.getenv("CHANGE_COALESCE_SECONDS", "0.05"))
+CHANGE_RECONNECT_MAX_SECONDS = float(os.getenv("CHANGE_RECONNECT_MAX_SECONDS", "30"))
+# An idle LISTEN connection is pinged this often so a dead socket is noticed
+CHANGE_PING_SECONDS = float(os.getenv("CHANGE_PING_SECONDS", "30"))
+
+CHANGE_NOTIFICATIONS = Counter(
+    'inventory_change_notifications_total',
+    'Change notifications received from PostgreSQL'
+)
+
+CHANGE_INVALIDATION_BATCHES = Counter(
+    'inventory_change_invalidation_batches_total',
+    'Coalesced cache invalidations applied from change notifications'
+)
+
+CHANGE_LISTENER_CONNECTED = Gauge(
+    'inventory_change_listener_connected',
+    'Whether the change listener currently holds a LISTEN connection'
+)
+
+
+class ChangeListener:
+    """Keeps the local item cache in step with writes committed by any replica.
+
+    Notifications are buffered and applied together once CHANGE_COALESCE_SECONDS
+    pass, so a burst of writes costs one invalidation. The connection is
+    re-established with exponential backoff, and the cache is cleared on every
+    (re)connect because notifications sent while disconnected are lost.
+    """
+
+    def __init__(self, cache: ItemCache = item_cache, dsn: Optional[str] = None,
+                 coalesce_seconds: float = CHANGE_COALESCE_SECONDS,
+                 reconnect_max_seconds: float = CHANGE_RECONNECT_MAX_SECONDS,
+                 ping_seconds: float = CHANGE_PING_SECONDS,
+                 connect: Callable = asyncpg.connect):
+        self.cache = cache
+        self.dsn = dsn
+        self.coalesce_seconds = coalesce_seconds
+        self.reconnect_max_seconds = reconnect_max_seconds
+        self.ping_seconds = ping_seconds
+        self._connect = connect
+        self._pending_tags = set()
+        self._pending_all = False
+        self._task = None
+
+    async def start(self):
+        if self._task is None:
+            # Created here so they belong to the running loop
+            self.connected = asyncio.Event()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _on_notification(self, connection, pid, channel, payload):
+        CHANGE_NOTIFICATIONS.inc()
+        items, shops, everything = parse_change_payload(payload)
+        if everything:
+            self._pending_all = True
+        self._pending_tags |= item_change_tags(items)
+        self._pending_tags.update(shop_tag(shop_id) for shop_id in shops)
+        self._wakeup.set()
+
+    def _flush(self):
+        tags, everything = self._pending_tags, self._pending_all
+        self._pending_tags, self._pending_all = set(), False
+        if everything:
+            self.cache.clear()
+        elif tags:
+            self.cache.invalidate(tags)
+        else:
+            return
+        CHANGE_INVALIDATION_BATCHES.inc()
+
+    async def _run(self):
+        delay = 0.1
+        while True:
+            try:
+                connection = await self._connect(self.dsn or get_listen_dsn())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Change listener could not connect, retrying in {delay:.1f}s: {e!r}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.reconnect_max_seconds)
+                continue
+
+            delay = 0.1
+            lost = asyncio.Event()
+
+            def on_termination(_):
+                lost.set()
+                self._wakeup.set()
+
+            connection.add_termination_listener(on_termination)
+            try:
+                await connection.add_listener(CHANGE_CHANNEL, self._on_notification)
+                self.cache.clear()
+                CHANGE_LISTENER_CONNECTED.set(1)
+                self.connected.set()
+                await self._pump(connection, lost)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Change listener connection lost, reconnecting in {delay:.1f}s: {e!r}")
+            finally:
+                self.connected.clear()
+                CHANGE_LISTENER_CONNECTED.set(0)
+                connection.terminate()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.reconnect_max_seconds)
+
+    async def _pump(self, connection, lost: asyncio.Event):
+        """Apply buffered notifications until the connection drops"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.ping_seconds)
+            except asyncio.TimeoutError:
+                await asyncio.wait_for(connection.execute("SELECT 1"), timeout=self.ping_seconds)
+                continue
+            if lost.is_set():
+                return
+            # Let the rest of a burst arrive before invalidating
+            await asyncio.sleep(self.coalesce_seconds)
+            self._wakeup.clear()
+            self._flush()
@@ -1,169 +1,485 @@
 import uuid
-import json
-import pika
 import os
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator, List, Optional, Set, Tuple, Union
 from sqlalchemy.orm import Session
-from ..models.domain.inventory import InventoryItem, InventoryItemCreate
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..db.database import async_read_target, open_async_session
+from ..models.domain.inventory import InventoryItem, InventoryItemCreate, InventoryItemUpdate, InventoryItemPage, QuantityAdjustment,\
+    AvailabilityRequestItem, AvailabilityResponse, AvailabilityResult
 from ..repositories.inventory_repository import InventoryRepository
+from ..repositories.async_inventory_repository import AsyncInventoryRepository
+from ..messaging.async_publisher import AsyncRabbitMQPublisher
+from ..messaging.outbox import outbox_message, outbox_relay, shop_status_request_message
+from ..messaging.publisher import RabbitMQPublisher, event_publisher
+from ..messaging.shop_status import SHOP_STATUS_REPLY_QUEUE, ShopStatusClient, shop_status_client
+from .item_cache import ItemCache, item_cache, item_key, item_tag, shop_listing_key, shop_tag
 
+BULK_EVENT_CHUNK_SIZE = int(os.getenv("BULK_EVENT_CHUNK_SIZE", "500"))
+# Rows fetched per round trip when streaming an export from the server-side cursor
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
 
-class RabbitMQPublisher:
-    """RabbitMQ publisher for inventory events"""
-    
-    def __init__(self):
-        self.connection = None
-        self.channel = None
-        self._setup_connection()
-    
-    def _setup_connection(self):
-        """Setup RabbitMQ connection"""
-        try:
-            connection_params = pika.ConnectionParameters(
-                host=os.getenv("RABBITMQ_HOST", "localhost"),
-                port=int(os.getenv("RABBITMQ_PORT", "5672")),
-                credentials=pika.PlainCredentials(
-                    os.getenv("RABBITMQ_USER", "guest"),
-                    os.getenv("RABBITMQ_PASSWORD", "guest")
-                )
-            )
-            
-            self.connection = pika.BlockingConnection(connection_params)
-            self.channel = self.connection.channel()
-            
-            # Declare exchanges
-            self.channel.exchange_declare(exchange='inventory_events', exchange_type='topic')
-            self.channel.exchange_declare(exchange='shop_events', exchange_type='topic')
-            
-        except Exception as e:
-            print(f"Failed to setup RabbitMQ connection: {e}")
-            self.connection = None
-            self.channel = None
-    
-    def publish_event(self, exchange: str, routing_key: str, body: dict):
-        """Publish event to RabbitMQ"""
-        if not self.channel:
-            print("RabbitMQ channel not available, skipping publish")
-            return
-        
-        try:
-            self.channel.basic_publish(
-                exchange=exchange,
-                routing_key=routing_key,
-                body=json.dumps(body),
-                properties=pika.BasicProperties(
-                    delivery_mode=2,  # Make message persistent
-                    content_type='application/json'
-                )
-            )
-            print(f"Published event to {exchange}/{routing_key}: {body}")
-        except Exception as e:
-            print(f"Failed to publish event: {e}")
-    
-    def request_shop_status(self, shop_id: str, callback_queue: str) -> str:
-        """Request shop status with correlation ID pattern"""
-        if not self.channel:
-            print("RabbitMQ channel not available")
-            return None
-        
-        correlation_id = str(uuid.uuid4())
-        
-        try:
-            request_body = {
-                "shop_id": shop_id,
-                "request_type": "status_check"
-            }
-            
-            self.channel.basic_publish(
-                exchange='shop_events',
-                routing_key='shop.status.request',
-                properties=pika.BasicProperties(
-                    reply_to=callback_queue,
-                    correlation_id=correlation_id,
-                    content_type='application/json'
-                ),
-                body=json.dumps(request_body)
-            )
-            
-            print(f"Requested shop status for {shop_id} with correlation_id: {correlation_id}")
-            return correlation_id
-            
-        except Exception as e:
-            print(f"Failed to request shop status: {e}")
-            return None
-    
-    def close(self):
-        """Close RabbitMQ connection"""
-        if self.connection and not self.connection.is_closed:
-            self.connection.close()
+
+class ShopInactive(Exception):
+    """The shop service reported the item's shop as inactive"""
+
+
+def item_created_event(item: InventoryItem) -> dict:
+    return {
+        "event_type": "inventory_item_created",
+        "item_id": str(item.id),
+        "shop_id": str(item.shop_id),
+        "name": item.name,
+        "category": item.category,
+        "price": float(item.price),
+        "quantity": item.quantity,
+        "timestamp": item.created_at.isoformat() if item.created_at else None
+    }
+
+
+def items_created_event(items: List[InventoryItem]) -> dict:
+    """One event for a batch of created items; each entry has the single-item event shape"""
+    return {
+        "event_type": "inventory_items_created",
+        "count": len(items),
+        "items": [item_created_event(item) for item in items]
+    }
+
+
+def item_updated_event(item: InventoryItem) -> dict:
+    return {
+        "event_type": "inventory_item_updated",
+        "item_id": str(item.id),
+        "shop_id": str(item.shop_id),
+        "name": item.name,
+        "price": float(item.price),
+        "quantity": item.quantity,
+        "timestamp": item.updated_at.isoformat() if item.updated_at else None
+    }
+
+
+def item_deleted_event(item: InventoryItem) -> dict:
+    return {
+        "event_type": "inventory_item_deleted",
+        "item_id": str(item.id),
+        "shop_id": str(item.shop_id)
+    }
+
+
+def items_deleted_events(deleted: List[Tuple[uuid.UUID, uuid.UUID]]) -> List[dict]:
+    """One event per shop for a batch of (item_id, shop_id) soft deletes"""
+    item_ids_by_shop = {}
+    for item_id, shop_id in deleted:
+        item_ids_by_shop.setdefault(str(shop_id), []).append(str(item_id))
+    return [
+        {
+            "event_type": "inventory_items_deleted",
+            "shop_id": shop_id,
+            "item_ids": item_ids
+        }
+        for shop_id, item_ids in item_ids_by_shop.items()
+    ]
+
+
+def availability_response(requested: List[AvailabilityRequestItem], items: List[InventoryItem]) -> AvailabilityResponse:
+    """Check each requested quantity against items fetched in one query.
+
+    Inactive (soft-deleted) items are still found and named, but have nothing
+    to sell: they are unavailable, even for a quantity of 0, and report
+    current_quantity 0 and "Insufficient quantity".
+    """
+    by_id = {item.id: item for item in items}
+    results = []
+    for request in requested:
+        item = by_id.get(request.product_id)
+        if item is None:
+            results.append(AvailabilityResult(
+                product_id=request.product_id,
+                available=False,
+                reason="Product not found",
+                current_quantity=0,
+                requested_quantity=request.quantity
+            ))
+            continue
+        current_quantity = item.quantity if item.is_active else 0
+        available = item.is_active and current_quantity >= request.quantity
+        results.append(AvailabilityResult(
+            product_id=request.product_id,
+            available=available,
+            current_quantity=current_quantity,
+            requested_quantity=request.quantity,
+            product_name=item.name,
+            shop_id=item.shop_id,
+            reason=None if available else "Insufficient quantity"
+        ))
+    return AvailabilityResponse(all_available=all(result.available for result in results), results=results)
 
 
 class InventoryService:
-    def __init__(self, db: Session, publisher: RabbitMQPublisher = None):
-        self.repository = InventoryRepository(db)
-        self.publisher = publisher or RabbitMQPublisher()
+    def __init__(self, db: Session, publisher: RabbitMQPublisher = None, read_db: Session = None, cache: ItemCache = item_cache,
+                 shop_status: ShopStatusClient = shop_status_client):
+        self.repository = InventoryRepository(db, read_db)
+        self.publisher = publisher or event_publisher
+        self.cache = cache
+        self.shop_status = shop_status
+
+    def _primary_reads(self) -> InventoryRepository:
+        """Cache fills read the primary: a lagging replica could put back a row a write just invalidated"""
+        return InventoryRepository(self.repository.db)
     
     def create_item(self, item: InventoryItemCreate) -> InventoryItem:
-        """Create inventory item and publish event"""
+        """Create inventory item and publish event; raises ShopInactive for shops known to be inactive"""
+        if not self.validate_shop_status(str(item.shop_id)):
+            raise ShopInactive(f"Shop {item.shop_id} is not active")
         # Create the item
         created_item = self.repository.create(item)
+        self.cache.invalidate_items([(created_item.id, created_item.shop_id)])
         
         # Publish inventory item created event
         if self.publisher:
             self.publisher.publish_event(
                 exchange="inventory_events",
                 routing_key="inventory.created",
-                body={
-                    "event_type": "inventory_item_created",
-                    "item_id": str(created_item.id),
-                    "shop_id": str(created_item.shop_id),
-                    "name": created_item.name,
-                    "category": created_item.category,
-                    "price": float(created_item.price),
-                    "quantity": created_item.quantity,
-                    "timestamp": created_item.created_at.isoformat() if created_item.created_at else None
-                }
-            )
-            
-            # Request shop status validation (correlation ID pattern)
-            callback_queue = "shop_status_responses"
-            correlation_id = self.publisher.request_shop_status(
-                shop_id=str(created_item.shop_id),
-                callback_queue=callback_queue
+                body=item_created_event(created_item)
             )
             
-            if correlation_id:
-                print(f"Shop status requested with correlation ID: {correlation_id}")
+            # Request shop status validation (correlation ID pattern), unless it is cached or already asked for
+            for shop_id in self.shop_status.shops_to_check([str(created_item.shop_id)]):
+                correlation_id = self.publisher.request_shop_status(
+                    shop_id=shop_id,
+                    callback_queue=SHOP_STATUS_REPLY_QUEUE
+                )
+
+                if correlation_id:
+                    print(f"Shop status requested with correlation ID: {correlation_id}")
         
         return created_item
+
+    def get_item(self, item_id: uuid.UUID) -> Optional[InventoryItem]:
+        return self.cache.get_or_load(
+            item_key(item_id), [item_tag(item_id)], lambda: self._primary_reads().get_by_id(item_id)
+        )
+
+    def check_availability(self, requested: List[AvailabilityRequestItem]) -> AvailabilityResponse:
+        """Stock check for a whole order with one query"""
+        items = self.repository.get_by_ids(list({request.product_id for request in requested}))
+        return availability_response(requested, items)
+
+    def get_item_updated_at(self, item_id: uuid.UUID) -> Optional[datetime]:
+        return self.repository.get_updated_at(item_id)
+
+    def get_shop_version(self, shop_id: uuid.UUID) -> int:
+        return self.repository.get_shop_version(shop_id)
+
+    def get_items_by_shop(self, shop_id: uuid.UUID, skip: int = 0, limit: int = 100, version: Optional[int] = None) -> List[InventoryItem]:
+        """Cached shop listing; pass the shop version read beforehand to key the cache entry by it"""
+        return self.cache.get_or_load(
+            shop_listing_key(shop_id, version, "offset", skip, limit), [shop_tag(shop_id)],
+            lambda: self._primary_reads().get_by_shop_id(shop_id, skip, limit),
+        )
+
+    def export_shop_items(self, shop_id: uuid.UUID) -> Iterator[InventoryItem]:
+        return self.repository.stream_by_shop_id(shop_id, EXPORT_BATCH_SIZE)
+
+    def get_all_items(self, skip: int = 0, limit: int = 100) -> List[InventoryItem]:
+        return self.repository.get_all(skip, limit)
+
+    def update_item(self, item_id: uuid.UUID, item_update: InventoryItemUpdate) -> Optional[InventoryItem]:
+        """Update inventory item and publish event"""
+        updated_item = self.repository.update(item_id, item_update)
+        if updated_item:
+            self.cache.invalidate_items([(updated_item.id, updated_item.shop_id)])
+        if updated_item and self.publisher:
+            self.publisher.publish_event(
+                exchange="inventory_events",
+                routing_key="inventory.updated",
+                body=item_updated_event(updated_item)
+            )
+        return updated_item
+
+    def adjust_quantity(self, item_id: uuid.UUID, delta: int, floor: int = 0) -> Optional[InventoryItem]:
+        """Atomic stock change; None if the item is missing or stock would fall below floor"""
+        updated_item = self.repository.adjust_quantity(item_id, delta, floor)
+        if updated_item:
+            self.cache.invalidate_items([(updated_item.id, updated_item.shop_id)])
+        if updated_item and self.publisher:
+            self.publisher.publish_event(
+                exchange="inventory_events",
+                routing_key="inventory.updated",
+                body=item_updated_event(updated_item)
+            )
+        return updated_item
+
+    def adjust_quantities(self, adjustments: List[QuantityAdjustment], floor: int = 0) -> Tuple[List[InventoryItem], List[uuid.UUID]]:
+        """All-or-nothing stock change for many items"""
+        updated_items, failed = self.repository.adjust_quantities(adjustments, floor)
+        self.cache.invalidate_items((item.id, item.shop_id) for item in updated_items)
+        if self.publisher:
+            for updated_item in updated_items:
+                self.publisher.publish_event(
+                    exchange="inventory_events",
+                    routing_key="inventory.updated",
+                    body=item_updated_event(updated_item)
+                )
+        return updated_items, failed
+
+    def delete_item(self, item_id: uuid.UUID) -> bool:
+        """Soft delete inventory item and publish event"""
+        deleted_item = self.repository.soft_delete(item_id)
+        if deleted_item:
+            self.cache.invalidate_items([(deleted_item.id, deleted_item.shop_id)])
+        if deleted_item and self.publisher:
+            self.publisher.publish_event(
+                exchange="inventory_events",
+                routing_key="inventory.deleted",
+                body=item_deleted_event(deleted_item)
+            )
+        return deleted_item is not None
+
+    def delete_items(self, item_ids: List[uuid.UUID]) -> List[uuid.UUID]:
+        """Soft delete many items in one statement; returns the ids actually deactivated"""
+        deleted = self.repository.delete_many(item_ids)
+        self.cache.invalidate_items(deleted)
+        if self.publisher:
+            for body in items_deleted_events(deleted):
+                self.publisher.publish_event(
+                    exchange="inventory_events",
+                    routing_key="inventory.deleted",
+                    body=body
+                )
+        return [item_id for item_id, _ in deleted]
+
+    def delete_shop_items(self, shop_id: uuid.UUID) -> List[uuid.UUID]:
+        """Soft delete every active item of a shop in one statement"""
+        deleted = self.repository.delete_by_shop(shop_id)
+        self.cache.invalidate_items(deleted)
+        if self.publisher:
+            for body in items_deleted_events(deleted):
+                self.publisher.publish_event(
+                    exchange="inventory_events",
+                    routing_key="inventory.deleted",
+                    body=body
+                )
+        return [item_id for item_id, _ in deleted]
     
     def validate_shop_status(self, shop_id: str) -> bool:
-        """Validate if shop is active (synchronous version for testing)"""
-        # In real implementation, this would use the correlation ID pattern
-        # For testing, we'll simulate the validation
-        if os.getenv("TESTING") == "true":
-            return True  # Mock successful validation in tests
-        
-        # Real implementation would:
-        # 1. Send request with correlation ID
-        # 2. Wait for response
-        # 3. Return validation result
-        return True
+        """Validate if shop is active from cached status replies; shops not heard from yet pass"""
+        return self.shop_status.cached(shop_id) is not False
     
     def handle_shop_status_response(self, correlation_id: str, response: dict):
-        """Handle shop status response from shop service"""
+        """Handle shop status response from shop service: cache it and wake the call waiting on it"""
         print(f"Received shop status response for correlation ID {correlation_id}: {response}")
+        self.shop_status.resolve(correlation_id, response)
         
-        if response.get("is_active"):
-            print(f"Shop {response.get('shop_id')} is active")
-            # Here you could update item status, send notifications, etc.
-        else:
+        if not response.get("is_active"):
             print(f"Shop {response.get('shop_id')} is inactive - may need to disable items")
-            # Handle inactive shop scenario
-    
-    def __del__(self):
-        """Cleanup on service destruction"""
-        if hasattr(self, 'publisher') and self.publisher:
-            self.publisher.close()
+
+
+class AsyncInventoryService:
+    """Request-path service on top of AsyncInventoryRepository.
+
+    Database work is awaited on the event loop. With outbox=True a write's
+    events are inserted into the outbox in the write's own transaction and
+    published later by the outbox relay, so no event is lost to a crash after
+    commit and the broker is off the request path. Otherwise events are
+    published after commit: an AsyncRabbitMQPublisher is awaited directly and
+    the blocking pika publisher is pushed to a worker thread.
+    """
+
+    def __init__(self, db: AsyncSession, publisher: Union[AsyncRabbitMQPublisher, RabbitMQPublisher] = None,
+                 read_db: AsyncSession = None, cache: ItemCache = item_cache, outbox: bool = False,
+                 shop_status: ShopStatusClient = shop_status_client):
+        self.repository = AsyncInventoryRepository(db, read_db)
+        self.publisher = publisher
+        self.cache = cache
+        self.outbox = outbox
+        self.shop_status = shop_status
+
+    async def _call_publisher(self, method: str, *args):
+        call = getattr(self.publisher, method)
+        if asyncio.iscoroutinefunction(call):
+            return await call(*args)
+        return await asyncio.to_thread(call, *args)
+
+    async def _publish(self, routing_key: str, body: dict):
+        if self.publisher:
+            await self._call_publisher("publish_event", "inventory_events", routing_key, body)
+
+    async def _finish_write(self, changed: Iterable[Tuple[uuid.UUID, uuid.UUID]], events: List[Tuple[str, dict]],
+                            status_shop_ids: Iterable[str] = ()):
+        """Commit-side half of every write: deliver its events and evict the (item_id, shop_id) pairs it changed.
+
+        Write methods run their statement with commit=not self.outbox, so in
+        outbox mode the events are inserted into the still-open transaction here.
+        Status requests go only to shops whose status is neither cached nor already asked for.
+        """
+        status_shop_ids = self.shop_status.shops_to_check(status_shop_ids)
+        if self.outbox:
+            messages = [outbox_message("inventory_events", routing_key, body) for routing_key, body in events]
+            messages += [shop_status_request_message(shop_id, SHOP_STATUS_REPLY_QUEUE) for shop_id in status_shop_ids]
+            await self.repository.add_outbox_messages(messages)
+            self.cache.invalidate_items(changed)
+            if messages:
+                outbox_relay.wake()
+            return
+
+        self.cache.invalidate_items(changed)
+        for routing_key, body in events:
+            await self._publish(routing_key, body)
+        if self.publisher:
+            for shop_id in status_shop_ids:
+                correlation_id = await self._call_publisher("request_shop_status", shop_id, SHOP_STATUS_REPLY_QUEUE)
+                if correlation_id:
+                    print(f"Shop status requested with correlation ID: {correlation_id}")
+
+    async def create_item(self, item: InventoryItemCreate) -> InventoryItem:
+        """Create inventory item and publish event; raises ShopInactive if the shop service says so"""
+        if not await self.validate_shop_status(str(item.shop_id)):
+            raise ShopInactive(f"Shop {item.shop_id} is not active")
+        created_item = await self.repository.create(item, commit=not self.outbox)
+        await self._finish_write(
+            [(created_item.id, created_item.shop_id)],
+            [("inventory.created", item_created_event(created_item))],
+            [str(created_item.shop_id)],
+        )
+        return created_item
+
+    async def bulk_create_items(self, items: List[InventoryItemCreate]) -> List[InventoryItem]:
+        """Insert items in one transaction and publish them as chunked batch events.
+
+        Raises ShopInactive if any item's shop is inactive; leave those items out
+        with inactive_shops() first to create the rest.
+        """
+        inactive = await self.inactive_shops(str(item.shop_id) for item in items)
+        if inactive:
+            raise ShopInactive(f"Shops {', '.join(sorted(inactive))} are not active")
+        created_items = await self.repository.bulk_create(items, commit=not self.outbox)
+        events = [
+            ("inventory.created", items_created_event(created_items[offset:offset + BULK_EVENT_CHUNK_SIZE]))
+            for offset in range(0, len(created_items), BULK_EVENT_CHUNK_SIZE)
+        ]
+        # One status check per shop rather than per item
+        status_shop_ids = {str(item.shop_id) for item in created_items}
+        await self._finish_write([(item.id, item.shop_id) for item in created_items], events, status_shop_ids)
+        return created_items
+
+    async def validate_shop_status(self, shop_id: str) -> bool:
+        """Ask the shop service (or its cached answer) whether the shop is active; unknown shops pass"""
+        return await self.shop_status.is_shop_active(shop_id) is not False
+
+    async def inactive_shops(self, shop_ids: Iterable[str]) -> Set[str]:
+        """The shops among shop_ids known to be inactive, asked about concurrently"""
+        shop_ids = list(set(shop_ids))
+        statuses = await asyncio.gather(*(self.validate_shop_status(shop_id) for shop_id in shop_ids))
+        return {shop_id for shop_id, active in zip(shop_ids, statuses) if not active}
+
+    async def _shared_read(self, key: tuple, tags: List[tuple], read: Callable[[AsyncInventoryRepository], Awaitable[Any]]) -> Any:
+        """Cached and coalesced read; read(repository) runs on a session of its own.
+
+        The load is shared by every concurrent caller, so it must not use this
+        request's session, which closes when the request ends. With the cache
+        on it reads the primary, so a fill cannot store a row older than the
+        last write's invalidation; otherwise it reads where this request would.
+        """
+        target = "primary" if self.cache.enabled else async_read_target(self.repository.read_db)
+
+        async def load():
+            async with self._load_repository(target) as repository:
+                return await read(repository)
+
+        return await self.cache.get_or_load_async(key, tags, load, target)
+
+    @asynccontextmanager
+    async def _load_repository(self, target: str) -> AsyncIterator[AsyncInventoryRepository]:
+        async with open_async_session(target) as session:
+            yield AsyncInventoryRepository(session)
+
+    async def get_item(self, item_id: uuid.UUID) -> Optional[InventoryItem]:
+        return await self._shared_read(
+            item_key(item_id), [item_tag(item_id)], lambda repository: repository.get_by_id(item_id)
+        )
+
+    async def check_availability(self, requested: List[AvailabilityRequestItem]) -> AvailabilityResponse:
+        """Stock check for a whole order with one query"""
+        items = await self.repository.get_by_ids(list({request.product_id for request in requested}))
+        return availability_response(requested, items)
+
+    async def get_item_updated_at(self, item_id: uuid.UUID) -> Optional[datetime]:
+        return await self.repository.get_updated_at(item_id)
+
+    async def get_shop_version(self, shop_id: uuid.UUID) -> int:
+        return await self.repository.get_shop_version(shop_id)
+
+    async def get_items_by_shop(self, shop_id: uuid.UUID, skip: int = 0, limit: int = 100, version: Optional[int] = None) -> List[InventoryItem]:
+        """Cached shop listing; pass the shop version read beforehand to key the cache entry by it"""
+        return await self._shared_read(
+            shop_listing_key(shop_id, version, "offset", skip, limit), [shop_tag(shop_id)],
+            lambda repository: repository.get_by_shop_id(shop_id, skip, limit),
+        )
+
+    def export_shop_items(self, shop_id: uuid.UUID) -> AsyncIterator[InventoryItem]:
+        """All active items of a shop, streamed; iterate with ``async for``"""
+        return self.repository.stream_by_shop_id(shop_id, EXPORT_BATCH_SIZE)
+
+    async def get_all_items(self, skip: int = 0, limit: int = 100) -> List[InventoryItem]:
+        return await self.repository.get_all(skip, limit)
+
+    async def get_items_page_by_shop(self, shop_id: uuid.UUID, limit: int = 100, cursor: Optional[str] = None, version: Optional[int] = None) -> InventoryItemPage:
+        return await self._shared_read(
+            shop_listing_key(shop_id, version, "cursor", limit, cursor), [shop_tag(shop_id)],
+            lambda repository: repository.get_page_by_shop_id(shop_id, limit, cursor),
+        )
+
+    async def get_all_items_page(self, limit: int = 100, cursor: Optional[str] = None) -> InventoryItemPage:
+        return await self.repository.get_page(limit, cursor)
+
+    async def update_item(self, item_id: uuid.UUID, item_update: InventoryItemUpdate) -> Optional[InventoryItem]:
+        """Update inventory item and publish event"""
+        updated_item = await self.repository.update(item_id, item_update, commit=not self.outbox)
+        await self._finish_write(*self._item_changes(updated_item, "inventory.updated", item_updated_event))
+        return updated_item
+
+    async def adjust_quantity(self, item_id: uuid.UUID, delta: int, floor: int = 0) -> Optional[InventoryItem]:
+        """Atomic stock change; None if the item is missing or stock would fall below floor"""
+        updated_item = await self.repository.adjust_quantity(item_id, delta, floor, commit=not self.outbox)
+        await self._finish_write(*self._item_changes(updated_item, "inventory.updated", item_updated_event))
+        return updated_item
+
+    async def adjust_quantities(self, adjustments: List[QuantityAdjustment], floor: int = 0) -> Tuple[List[InventoryItem], List[uuid.UUID]]:
+        """All-or-nothing stock change for many items"""
+        updated_items, failed = await self.repository.adjust_quantities(adjustments, floor, commit=not self.outbox)
+        await self._finish_write(
+            [(item.id, item.shop_id) for item in updated_items],
+            [("inventory.updated", item_updated_event(item)) for item in updated_items],
+        )
+        return updated_items, failed
+
+    async def delete_item(self, item_id: uuid.UUID) -> bool:
+        """Soft delete inventory item and publish event"""
+        deleted_item = await self.repository.soft_delete(item_id, commit=not self.outbox)
+        await self._finish_write(*self._item_changes(deleted_item, "inventory.deleted", item_deleted_event))
+        return deleted_item is not None
+
+    async def delete_items(self, item_ids: List[uuid.UUID]) -> List[uuid.UUID]:
+        """Soft delete many items in one statement; returns the ids actually deactivated"""
+        deleted = await self.repository.delete_many(item_ids, commit=not self.outbox)
+        await self._finish_write(deleted, [("inventory.deleted", body) for body in items_deleted_events(deleted)])
+        return [item_id for item_id, _ in deleted]
+
+    async def delete_shop_items(self, shop_id: uuid.UUID) -> List[uuid.UUID]:
+        """Soft delete every active item of a shop in one statement"""
+        deleted = await self.repository.delete_by_shop(shop_id, commit=not self.outbox)
+        await self._finish_write(deleted, [("inventory.deleted", body) for body in items_deleted_events(deleted)])
+        return [item_id for item_id, _ in deleted]
+
+    @staticmethod
+    def _item_changes(item: Optional[InventoryItem], routing_key: str, event) -> Tuple[list, list]:
+        """_finish_write arguments for a single-item write; nothing when the item was not found"""
+        if item is None:
+            return [], []
+        return [(item.id, item.shop_id)], [(routing_key, event(item))]
 
 
 # from typing import List, Optional
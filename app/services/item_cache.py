@@ -0,0 +1,252 @@
+# app/services/item_cache.py
+# In-process read-through cache for items and shop listings
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Tuple
+from prometheus_client import Counter
+from .single_flight import SingleFlight
+
+ITEM_CACHE_MAX_ENTRIES = int(os.getenv("ITEM_CACHE_MAX_ENTRIES", "10000"))
+ITEM_CACHE_TTL_SECONDS = float(os.getenv("ITEM_CACHE_TTL_SECONDS", "30"))
+
+CACHE_HITS = Counter(
+    'inventory_cache_hits_total',
+    'Item cache lookups answered from memory',
+    ['kind']
+)
+
+CACHE_MISSES = Counter(
+    'inventory_cache_misses_total',
+    'Item cache lookups that went to the database',
+    ['kind']
+)
+
+CACHE_EVICTIONS = Counter(
+    'inventory_cache_evictions_total',
+    'Entries removed from the item cache',
+    ['reason']
+)
+
+MISSING = object()
+
+
+def item_key(item_id: uuid.UUID) -> tuple:
+    return ("item", item_id)
+
+def shop_listing_key(shop_id: uuid.UUID, *params) -> tuple:
+    return ("shop", shop_id) + params
+
+def item_tag(item_id: uuid.UUID) -> tuple:
+    return ("item", item_id)
+
+def shop_tag(shop_id: uuid.UUID) -> tuple:
+    return ("shop", shop_id)
+
+def item_change_tags(items: Iterable[Tuple[uuid.UUID, uuid.UUID]]) -> set:
+    """Tags a write to (item_id, shop_id) pairs invalidates: each item and every listing of its shop"""
+    tags = set()
+    for item_id, shop_id in items:
+        tags.add(item_tag(item_id))
+        tags.add(shop_tag(shop_id))
+    return tags
+
+
+class ItemCache:
+    """Bounded LRU cache with a TTL, invalidated by tags.
+
+    Every entry carries tags (an item, a shop) and a write invalidates the
+    tags it touched. Fills are stamped with the generation current before the
+    database read started; a fill whose tags were invalidated after that is
+    dropped, so a read racing a write can never cache the pre-write value.
+    The cache is thread-safe and shared by the sync and async services.
+
+    Async misses for the same key and routing target are coalesced: one
+    caller runs the load and fill while concurrent callers wait for its
+    result. Invalidating a tag also detaches the loads in flight for it, so
+    a caller arriving after a write never joins a read that began before it.
+    """
+
+    def __init__(self, max_entries: int = ITEM_CACHE_MAX_ENTRIES, ttl_seconds: float = ITEM_CACHE_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, tags, value)
+        self._keys_by_tag = {}
+        self._generation = 0
+        # Generation at which each tag was last invalidated, kept only while fills are in flight
+        self._invalidated = {}
+        self._cleared_at = -1
+        self._fills_in_flight = 0
+        # tag -> {flight key: loads in flight}, for detaching loads on invalidation
+        self._loads_by_tag = {}
+        self._lock = threading.Lock()
+        self.flights = SingleFlight()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Hashable) -> Any:
+        """Cached value for key, or MISSING"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                self._remove(key)
+                CACHE_EVICTIONS.labels(reason="expired").inc()
+                entry = None
+            if entry is None:
+                CACHE_MISSES.labels(kind=key[0]).inc()
+                return MISSING
+            self._entries.move_to_end(key)
+            CACHE_HITS.labels(kind=key[0]).inc()
+            return entry[2]
+
+    def begin_fill(self) -> int:
+        """Stamp taken before reading the database; pass it to end_fill or cancel_fill"""
+        with self._lock:
+            self._fills_in_flight += 1
+            return self._generation
+
+    def end_fill(self, key: Hashable, value: Any, tags: Iterable[Hashable], generation: int) -> bool:
+        """Store value unless one of its tags was invalidated since generation"""
+        tags = tuple(tags)
+        with self._lock:
+            stale = generation <= self._cleared_at or any(
+                self._invalidated.get(tag, -1) >= generation for tag in tags
+            )
+            self._fill_done()
+            if stale:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self._clock() + self.ttl_seconds, tags, value)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                CACHE_EVICTIONS.labels(reason="capacity").inc()
+            return True
+
+    def cancel_fill(self):
+        with self._lock:
+            self._fill_done()
+
+    def get_or_load(self, key: Hashable, tags: Iterable[Hashable], load: Callable[[], Any]) -> Any:
+        """Read-through lookup; None results are returned but not cached"""
+        if not self.enabled:
+            return load()
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+        generation = self.begin_fill()
+        try:
+            value = load()
+        except BaseException:
+            self.cancel_fill()
+            raise
+        self._finish_load(key, value, tags, generation)
+        return value
+
+    async def get_or_load_async(self, key: tuple, tags: Iterable[Hashable], load: Callable[[], Awaitable[Any]],
+                                target: str = "primary") -> Any:
+        """Async twin of get_or_load; concurrent misses for key on the same target share a single load.
+
+        The shared load runs in a task of its own, so load must not use a
+        caller's session. Only loads from the primary fill the cache: a
+        lagging replica can return a row older than the last invalidation.
+        """
+        tags = tuple(tags)
+        if self.enabled:
+            value = self.get(key)
+            if value is not MISSING:
+                return value
+        flight_key = key + (target,)
+        # Followers take the leader's value rather than filling themselves: their
+        # stamp would postdate the leader's read and could cache a stale row
+        fills = self.enabled and target == "primary"
+        return await self.flights.do(flight_key, lambda: self._load_and_fill(flight_key, key, tags, load, fills))
+
+    async def _load_and_fill(self, flight_key: tuple, key: tuple, tags: Tuple[Hashable, ...],
+                             load: Callable[[], Awaitable[Any]], fills: bool) -> Any:
+        self._track_load(flight_key, tags, 1)
+        generation = self.begin_fill() if fills else None
+        try:
+            value = await load()
+        except BaseException:
+            if generation is not None:
+                self.cancel_fill()
+            raise
+        finally:
+            self._track_load(flight_key, tags, -1)
+        if generation is not None:
+            self._finish_load(key, value, tags, generation)
+        return value
+
+    def _track_load(self, flight_key: tuple, tags: Tuple[Hashable, ...], delta: int):
+        with self._lock:
+            for tag in tags:
+                loads = self._loads_by_tag.setdefault(tag, {})
+                loads[flight_key] = loads.get(flight_key, 0) + delta
+                if not loads[flight_key]:
+                    del loads[flight_key]
+                if not loads:
+                    del self._loads_by_tag[tag]
+
+    def _finish_load(self, key: Hashable, value: Any, tags: Iterable[Hashable], generation: int):
+        if value is None:
+            self.cancel_fill()
+        else:
+            self.end_fill(key, value, tags, generation)
+
+    def invalidate(self, tags: Iterable[Hashable]):
+        with self._lock:
+            for tag in tags:
+                if self._fills_in_flight:
+                    self._invalidated[tag] = self._generation
+                for flight_key in self._loads_by_tag.get(tag, ()):
+                    self.flights.forget(flight_key)
+                for key in list(self._keys_by_tag.get(tag, ())):
+                    self._remove(key)
+                    CACHE_EVICTIONS.labels(reason="invalidated").inc()
+            self._generation += 1
+
+    def invalidate_items(self, items: Iterable[Tuple[uuid.UUID, uuid.UUID]]):
+        """Invalidate the entries affected by writes to (item_id, shop_id) pairs"""
+        tags = item_change_tags(items)
+        if tags:
+            self.invalidate(tags)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_tag.clear()
+            for loads in self._loads_by_tag.values():
+                for flight_key in loads:
+                    self.flights.forget(flight_key)
+            # Nothing read before now may be stored
+            self._cleared_at = self._generation
+            self._generation += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _fill_done(self):
+        self._fills_in_flight -= 1
+        if not self._fills_in_flight:
+            self._invalidated = {}
+
+    def _remove(self, key: Hashable):
+        _, tags, _ = self._entries.pop(key)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+item_cache = ItemCache()
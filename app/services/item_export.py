@@ -0,0 +1,57 @@
+# app/services/item_export.py
+# Encoders turning a stream of inventory items into NDJSON or CSV byte chunks
+import csv
+import io
+from typing import AsyncIterator, List
+from ..models.domain.inventory import InventoryItem
+from ..responses import dumps
+
+EXPORT_FIELDS = list(InventoryItem.model_fields)
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+async def ndjson_chunks(items: AsyncIterator[InventoryItem], rows_per_chunk: int = 500) -> AsyncIterator[bytes]:
+    """One JSON object per line, sent rows_per_chunk lines at a time"""
+    lines: List[bytes] = []
+    async for item in items:
+        lines.append(dumps(item))
+        if len(lines) >= rows_per_chunk:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+def _csv_row(item: InventoryItem) -> list:
+    row = [getattr(item, field) for field in EXPORT_FIELDS]
+    # image_urls is the only list column; keep it in one cell as a JSON array
+    row[EXPORT_FIELDS.index("image_urls")] = dumps(item.image_urls or []).decode()
+    return row
+
+
+async def csv_chunks(items: AsyncIterator[InventoryItem], rows_per_chunk: int = 500) -> AsyncIterator[bytes]:
+    """Header line followed by one row per item, sent rows_per_chunk rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    rows = 0
+    async for item in items:
+        writer.writerow(_csv_row(item))
+        rows += 1
+        if rows >= rows_per_chunk:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+EXPORT_ENCODERS = {
+    "ndjson": ndjson_chunks,
+    "csv": csv_chunks,
+}
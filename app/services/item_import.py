@@ -0,0 +1,276 @@
+# app/services/item_import.py
+# Bulk import jobs: uploaded CSV/NDJSON is parsed and validated in chunks, each
+# chunk is COPYed into a staging table and merged into inventory_items
+import csv
+import io
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Iterator, List, Optional, Sequence, Tuple
+from prometheus_client import Counter
+from sqlalchemy import Row
+from sqlalchemy.engine import Engine
+from ..messaging.coalescer import items_updated_event
+from ..messaging.outbox import EVENT_OUTBOX_ENABLED, outbox_message, outbox_relay
+from ..messaging.publisher import event_publisher
+from ..models.domain.inventory import InventoryItemImport, ImportJobStatus, BulkItemError
+from ..repositories.inventory_queries import create_import_staging, copy_into_import_staging, merge_import_staging,\
+    insert_outbox_messages, construct_domain
+from .bulk_items import NDJSON_CONTENT_TYPES, iter_ndjson_rows, validate_item_rows
+from .inventory_service import BULK_EVENT_CHUNK_SIZE, items_created_event, item_updated_event
+from .item_cache import item_cache
+
+logger = logging.getLogger(__name__)
+
+# Rows parsed, validated and committed together; memory use is bounded by one chunk
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+# Largest upload accepted by POST /inventory/imports, which spools it to local disk
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(512 * 1024 * 1024)))
+IMPORT_MAX_REPORTED_REJECTS = int(os.getenv("IMPORT_MAX_REPORTED_REJECTS", "100"))
+# Finished jobs are forgotten oldest first once this many are tracked
+IMPORT_JOBS_RETAINED = int(os.getenv("IMPORT_JOBS_RETAINED", "100"))
+
+IMPORT_CONTENT_TYPES = {media_type: "ndjson" for media_type in NDJSON_CONTENT_TYPES}
+IMPORT_CONTENT_TYPES["text/csv"] = "csv"
+
+IMPORT_ROWS = Counter(
+    'inventory_import_rows_total',
+    'Rows processed by bulk import jobs',
+    ['status']
+)
+
+
+def import_format_for(content_type: Optional[str]) -> Optional[str]:
+    """"csv" or "ndjson" for a supported upload content type, otherwise None"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return IMPORT_CONTENT_TYPES.get(media_type)
+
+
+def iter_csv_rows(stream: BinaryIO) -> Iterator[dict]:
+    """Yield CSV records as dicts shaped like NDJSON rows.
+
+    Empty cells are dropped so optional fields fall back to their defaults, and
+    image_urls is decoded from the JSON array cell written by the CSV export.
+    """
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        for record in csv.DictReader(text_stream):
+            row = {key: value for key, value in record.items() if key and value not in ("", None)}
+            if "image_urls" in row:
+                try:
+                    row["image_urls"] = json.loads(row["image_urls"])
+                except ValueError:
+                    pass
+            yield row
+    finally:
+        # Leave the binary stream open for the caller, who tracks progress with tell()
+        text_stream.detach()
+
+
+def iter_import_rows(stream: BinaryIO, format: str) -> Iterator[Any]:
+    if format == "csv":
+        return iter_csv_rows(stream)
+    return iter_ndjson_rows(stream)
+
+
+def _pg_array(values: List[str]) -> str:
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"') for value in values)
+    return "{" + ",".join(f'"{value}"' for value in escaped) + "}"
+
+
+def import_events(merged: Sequence[Row]) -> List[Tuple[str, dict]]:
+    """Batch events for the rows returned by merge_import_staging, in chunks of BULK_EVENT_CHUNK_SIZE items"""
+    created = [construct_domain(row) for row in merged if row.inserted]
+    updated = [construct_domain(row) for row in merged if not row.inserted]
+    events = [
+        ("inventory.created", items_created_event(created[offset:offset + BULK_EVENT_CHUNK_SIZE]))
+        for offset in range(0, len(created), BULK_EVENT_CHUNK_SIZE)
+    ]
+    events += [
+        ("inventory.updated", items_updated_event([item_updated_event(item) for item in updated[offset:offset + BULK_EVENT_CHUNK_SIZE]]))
+        for offset in range(0, len(updated), BULK_EVENT_CHUNK_SIZE)
+    ]
+    return events
+
+
+def write_copy_rows(items: List[InventoryItemImport], buffer: io.StringIO):
+    """CSV for copy_into_import_staging; items without an id get a new one"""
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+    for item in items:
+        writer.writerow((
+            item.id or uuid.uuid4(), item.shop_id, item.name, item.description, item.category,
+            repr(item.price), item.quantity, "" if item.image_urls is None else _pg_array(item.image_urls),
+        ))
+
+
+class ImportJob:
+    """State of one import, updated by its worker thread and read by the status endpoint"""
+
+    def __init__(self, path: str, format: str, bytes_total: int):
+        self.id = uuid.uuid4()
+        self.path = path
+        self.format = format
+        self.bytes_total = bytes_total
+        self.bytes_read = 0
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.rows_rejected = 0
+        self.rows_skipped = 0
+        self.rejects: List[BulkItemError] = []
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._started = None
+        self._finished = None
+        self._lock = threading.Lock()
+
+    def status(self) -> ImportJobStatus:
+        with self._lock:
+            elapsed = ((self._finished or time.monotonic()) - self._started) if self._started else 0.0
+            rows_per_second = self.rows_read / elapsed if elapsed > 0 else 0.0
+            eta_seconds = None
+            if self.state == "running" and self.bytes_read:
+                # Bytes are the only measure of the remaining work known up front
+                eta_seconds = elapsed * (self.bytes_total - self.bytes_read) / self.bytes_read
+            elif self.state == "completed":
+                eta_seconds = 0.0
+            return ImportJobStatus(
+                id=self.id, state=self.state, format=self.format,
+                bytes_total=self.bytes_total, bytes_read=self.bytes_read,
+                rows_read=self.rows_read, rows_imported=self.rows_imported,
+                rows_rejected=self.rows_rejected, rows_skipped=self.rows_skipped,
+                rejects=list(self.rejects), rows_per_second=round(rows_per_second, 1),
+                eta_seconds=None if eta_seconds is None else round(eta_seconds, 1),
+                started_at=self.started_at, finished_at=self.finished_at, error=self.error,
+            )
+
+    def _begin(self):
+        with self._lock:
+            self.state = "running"
+            self.started_at = datetime.now(timezone.utc)
+            self._started = time.monotonic()
+
+    def _record_chunk(self, bytes_read: int, rows: int, imported: int, skipped: int, errors: List[BulkItemError]):
+        with self._lock:
+            self.bytes_read = bytes_read
+            self.rows_read += rows
+            self.rows_imported += imported
+            self.rows_skipped += skipped
+            self.rows_rejected += len(errors)
+            room = IMPORT_MAX_REPORTED_REJECTS - len(self.rejects)
+            if room > 0:
+                self.rejects.extend(errors[:room])
+
+    def _finish(self, error: Optional[str] = None):
+        with self._lock:
+            self.state = "failed" if error else "completed"
+            self.error = error
+            if not error:
+                self.bytes_read = self.bytes_total
+            self.finished_at = datetime.now(timezone.utc)
+            self._finished = time.monotonic()
+
+
+def run_import(job: ImportJob, engine: Engine, outbox: bool = EVENT_OUTBOX_ENABLED):
+    """Import job.path chunk by chunk; each chunk commits on its own.
+
+    Each chunk's item events are inserted into the outbox in the chunk's
+    transaction, or with outbox=False published after it commits. A failed
+    job keeps the chunks committed before the failure, which rows_imported
+    reports. The uploaded file is removed either way.
+    """
+    job._begin()
+    try:
+        with open(job.path, "rb") as stream, engine.connect() as connection:
+            connection.execute(create_import_staging())
+            connection.commit()
+            cursor = connection.connection.driver_connection.cursor()
+            rows = iter_import_rows(stream, job.format)
+            offset = 0
+            while True:
+                chunk = list(itertools.islice(rows, IMPORT_CHUNK_SIZE))
+                if not chunk:
+                    break
+                valid, errors = validate_item_rows(chunk, start_index=offset, model=InventoryItemImport)
+                items = _last_per_id([item for _, item in valid])
+                imported = 0
+                if items:
+                    buffer = io.StringIO()
+                    write_copy_rows(items, buffer)
+                    buffer.seek(0)
+                    cursor.copy_expert(copy_into_import_staging(), buffer)
+                    merged = connection.execute(merge_import_staging()).all()
+                    imported = len(merged)
+                    events = import_events(merged)
+                    if outbox and events:
+                        connection.execute(insert_outbox_messages(), [
+                            outbox_message("inventory_events", routing_key, body) for routing_key, body in events
+                        ])
+                    connection.commit()
+                    item_cache.invalidate_items((row.id, row.shop_id) for row in merged)
+                    if outbox and events:
+                        outbox_relay.wake()
+                    elif events:
+                        for routing_key, body in events:
+                            event_publisher.publish_event("inventory_events", routing_key, body)
+                skipped = len(valid) - imported
+                job._record_chunk(stream.tell(), len(chunk), imported, skipped, errors)
+                IMPORT_ROWS.labels(status="imported").inc(imported)
+                IMPORT_ROWS.labels(status="rejected").inc(len(errors))
+                IMPORT_ROWS.labels(status="skipped").inc(skipped)
+                offset += len(chunk)
+        job._finish()
+    except Exception as e:
+        logger.exception("Import %s failed", job.id)
+        job._finish(str(e))
+    finally:
+        try:
+            os.remove(job.path)
+        except OSError:
+            pass
+
+
+def _last_per_id(items: List[InventoryItemImport]) -> List[InventoryItemImport]:
+    """Keep the last row for each explicit id; one statement cannot update a row twice"""
+    by_id = {}
+    for position, item in enumerate(items):
+        by_id[item.id or position] = item
+    return list(by_id.values())
+
+
+class ImportJobRegistry:
+    """Jobs known to this process, by id"""
+
+    def __init__(self, retained: int = IMPORT_JOBS_RETAINED):
+        self.retained = retained
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, path: str, format: str, bytes_total: int, engine: Engine) -> ImportJob:
+        job = ImportJob(path, format, bytes_total)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._forget_finished()
+        threading.Thread(target=run_import, args=(job, engine), name=f"inventory-import-{job.id}", daemon=True).start()
+        return job
+
+    def get(self, job_id: uuid.UUID) -> Optional[ImportJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _forget_finished(self):
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.retained:
+                break
+            if self._jobs[job_id].state in ("completed", "failed"):
+                del self._jobs[job_id]
+
+
+import_jobs = ImportJobRegistry()
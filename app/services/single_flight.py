@@ -0,0 +1,52 @@
+# app/services/single_flight.py
+# Request coalescing: concurrent identical reads share one in-flight database call
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+from prometheus_client import Counter
+
+# coalescing ratio = rate(role="follower") / rate(all roles)
+COALESCED_READS = Counter(
+    'inventory_coalesced_reads_total',
+    'Reads by coalescing role: leaders run the query, followers reuse its result',
+    ['kind', 'role']
+)
+
+
+class SingleFlight:
+    """Runs one call per key at a time on the running event loop and fans its result out.
+
+    The call runs in its own task, so a caller that gives up (a client
+    disconnecting) does not cancel the work the other callers are waiting on.
+    Exceptions reach every caller of that flight.
+    """
+
+    def __init__(self):
+        self._flights = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        flight = self._flights.get(key)
+        if flight is not None and flight.get_loop() is loop:
+            COALESCED_READS.labels(kind=_kind(key), role="follower").inc()
+            return await asyncio.shield(flight)
+
+        COALESCED_READS.labels(kind=_kind(key), role="leader").inc()
+        flight = loop.create_task(call())
+        self._flights[key] = flight
+        flight.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(flight)
+
+    def forget(self, key: Hashable):
+        """Detach the flight for key: its callers still get its result, later callers start a new one"""
+        self._flights.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def _forget(self, key: Hashable, flight: asyncio.Task):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+
+def _kind(key: Hashable) -> str:
+    return key[0] if isinstance(key, tuple) and key else "other"
@@ -0,0 +1,69 @@
+"""Encode/decode throughput and size of inventory events per codec.
+
+    python -m benchmarks.bench_event_codecs
+
+stdlib:  json.dumps / json.loads, how events were encoded before the codec layer
+json:    JsonCodec (orjson), the default content type
+msgpack: MsgpackCodec, selected with EVENT_CONTENT_TYPE=application/msgpack
+
+single is one inventory_item_created event; batch is an
+inventory_items_created event carrying 100 of them.
+"""
+import json
+import timeit
+import uuid
+from datetime import datetime
+from app.messaging.codecs import JsonCodec, MsgpackCodec
+
+CALLS = 2000
+REPEAT = 5
+
+
+class StdlibJson:
+    def encode(self, body):
+        return json.dumps(body).encode()
+
+    def decode(self, data):
+        return json.loads(data)
+
+
+def item_event(n, shop_id):
+    return {
+        "event_type": "inventory_item_created",
+        "item_id": str(uuid.uuid4()),
+        "shop_id": shop_id,
+        "name": f"Bouquet {n}",
+        "category": "Bouquets",
+        "price": 19.99,
+        "quantity": n,
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+def per_call(run, number):
+    return min(timeit.repeat(run, number=number, repeat=REPEAT)) / number
+
+
+def main():
+    shop_id = str(uuid.uuid4())
+    single = item_event(0, shop_id)
+    items = [item_event(n, shop_id) for n in range(100)]
+    events = {
+        "single": single,
+        "batch": {"event_type": "inventory_items_created", "count": len(items), "items": items},
+    }
+    codecs = (("stdlib", StdlibJson()), ("json", JsonCodec()), ("msgpack", MsgpackCodec()))
+
+    print(f"{'event':>7} {'codec':>8} {'bytes':>7} {'encode us':>10} {'decode us':>10}")
+    for event_name, event in events.items():
+        number = CALLS if event_name == "single" else CALLS // 20
+        for codec_name, codec in codecs:
+            data = codec.encode(event)
+            assert codec.decode(data) == event
+            encode = per_call(lambda: codec.encode(event), number)
+            decode = per_call(lambda: codec.decode(data), number)
+            print(f"{event_name:>7} {codec_name:>8} {len(data):>7} {encode * 1e6:>10.2f} {decode * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
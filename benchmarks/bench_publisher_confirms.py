@@ -0,0 +1,56 @@
+"""Publish throughput with broker confirms, waited one by one vs pipelined.
+
+    python -m benchmarks.bench_publisher_confirms
+
+The broker is InMemoryBroker, whose confirm_delay stands in for the network
+round trip to RabbitMQ: everything published within one round trip is settled
+by a single multiple=True ack, as the real broker does.
+
+sync:        await each confirm before the next publish, one round trip per message
+window=N:    AsyncRabbitMQPublisher pipelining with at most N unconfirmed messages
+"""
+import asyncio
+import time
+from app.messaging.async_publisher import AsyncRabbitMQPublisher, InMemoryBroker
+
+MESSAGES = 2000
+ROUND_TRIP_SECONDS = 0.001
+WINDOWS = (1, 16, 128, 1024)
+
+
+async def publish_all(publisher, wait_each: bool) -> float:
+    started = time.perf_counter()
+    confirms = []
+    for n in range(MESSAGES):
+        confirm = await publisher.publish_event("inventory_events", "inventory.updated", {"item_id": n, "quantity": n})
+        if wait_each:
+            await confirm
+        else:
+            confirms.append(confirm)
+    await asyncio.gather(*confirms)
+    return time.perf_counter() - started
+
+
+async def run(max_in_flight: int, wait_each: bool = False) -> float:
+    broker = InMemoryBroker(confirm_delay=ROUND_TRIP_SECONDS, max_in_flight=max_in_flight)
+    publisher = AsyncRabbitMQPublisher(broker, buffer_size=MESSAGES)
+    try:
+        return await publish_all(publisher, wait_each)
+    finally:
+        await publisher.close()
+
+
+async def main():
+    results = [("sync", await run(1, wait_each=True))]
+    for window in WINDOWS:
+        results.append((f"window={window}", await run(window)))
+
+    baseline = results[0][1]
+    print(f"{MESSAGES} messages, {ROUND_TRIP_SECONDS * 1000:.1f}ms simulated round trip")
+    print(f"{'mode':>12} {'msg/s':>10} {'speedup':>9}")
+    for name, seconds in results:
+        print(f"{name:>12} {MESSAGES / seconds:>10.0f} {baseline / seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
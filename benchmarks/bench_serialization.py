@@ -0,0 +1,76 @@
+"""Compare the validated and fast response paths for inventory listings.
+
+    python -m benchmarks.bench_serialization
+
+validated: map_to_domain per row, response_model validation of the list,
+           then stdlib json rendering (FastAPI's default JSONResponse)
+fast:      construct_domain per row, rendered directly by ORJSONResponse
+"""
+import json
+import timeit
+import uuid
+from datetime import datetime
+from typing import List
+from pydantic import TypeAdapter
+from app.models.domain.inventory import InventoryItem
+from app.repositories.inventory_queries import map_to_domain, construct_domain
+from app.responses import ORJSONResponse
+
+SIZES = (100, 1000, 10000)
+REPEAT = 5
+
+response_adapter = TypeAdapter(List[InventoryItem])
+
+
+class FakeRow:
+    """Stand-in for a SQLAlchemy Row: attribute access plus _mapping"""
+
+    def __init__(self, mapping):
+        self._mapping = mapping
+        self.__dict__.update(mapping)
+
+
+def make_rows(count):
+    now = datetime.now()
+    shop_id = uuid.uuid4()
+    return [
+        FakeRow({
+            "id": uuid.uuid4(),
+            "shop_id": shop_id,
+            "name": f"Bouquet {n}",
+            "description": "Seasonal flowers wrapped in kraft paper",
+            "category": "Bouquets",
+            "price": 19.99,
+            "quantity": n,
+            "image_urls": [f"https://example.invalid/{n}.jpg"],
+            "created_at": now,
+            "updated_at": now,
+            "is_active": True,
+        })
+        for n in range(count)
+    ]
+
+
+def validated_path(rows):
+    items = [map_to_domain(row) for row in rows]
+    content = response_adapter.dump_python(response_adapter.validate_python(items), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def fast_path(rows):
+    return ORJSONResponse([construct_domain(row) for row in rows]).body
+
+
+def main():
+    print(f"{'rows':>8} {'validated ms':>14} {'fast ms':>10} {'speedup':>9}")
+    for size in SIZES:
+        rows = make_rows(size)
+        assert json.loads(validated_path(rows)) == json.loads(fast_path(rows))
+        number = max(1, 20000 // size)
+        validated = min(timeit.repeat(lambda: validated_path(rows), number=number, repeat=REPEAT)) / number
+        fast = min(timeit.repeat(lambda: fast_path(rows), number=number, repeat=REPEAT)) / number
+        print(f"{size:>8} {validated * 1000:>14.2f} {fast * 1000:>10.2f} {validated / fast:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
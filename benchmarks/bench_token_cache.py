@@ -0,0 +1,72 @@
+"""Time verify_jwt_token with the verified-token cache cold and warm.
+
+    python -m benchmarks.bench_token_cache
+
+uncached: cache disabled, every call parses, looks up the key and checks the RS256 signature and claims
+cold:     a distinct token per call, so every lookup misses and the result is stored
+warm:     the same token on every call, answered from the cache
+"""
+import time
+import timeit
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+from app.dependencies import auth
+from app.dependencies.auth import AUDIENCE, ISSUER, JWKSManager, VerifiedTokenCache
+
+CALLS = 2000
+REPEAT = 5
+
+
+def make_key_set():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    signing_key = jwk.construct(pem, algorithm="RS256")
+    public = signing_key.public_key().to_dict()
+    public.update(kid="bench", use="sig")
+    return signing_key, {"keys": [public]}
+
+
+def make_tokens(signing_key, count):
+    exp = int(time.time()) + 3600
+    return [
+        "Bearer " + jwt.encode(
+            {"aud": AUDIENCE, "iss": ISSUER, "exp": exp, "sub": f"user-{n}"}, signing_key,
+            algorithm="RS256", headers={"kid": "bench"},
+        )
+        for n in range(count)
+    ]
+
+
+def per_call(run):
+    return min(timeit.repeat(run, number=1, repeat=REPEAT)) / CALLS
+
+
+def main():
+    signing_key, key_set = make_key_set()
+    auth.jwks_manager = JWKSManager(fetcher=lambda: key_set)
+    tokens = make_tokens(signing_key, CALLS)
+
+    auth.verified_tokens = VerifiedTokenCache(max_entries=0)
+    uncached = per_call(lambda: [auth.verify_jwt_token(token) for token in tokens])
+
+    def cold():
+        auth.verified_tokens = VerifiedTokenCache(max_entries=CALLS)
+        for token in tokens:
+            auth.verify_jwt_token(token)
+
+    cold_time = per_call(cold)
+
+    auth.verified_tokens = VerifiedTokenCache(max_entries=CALLS)
+    auth.verify_jwt_token(tokens[0])
+    warm = per_call(lambda: [auth.verify_jwt_token(tokens[0]) for _ in range(CALLS)])
+
+    print(f"{'path':>10} {'us/call':>10} {'speedup':>9}")
+    for name, seconds in (("uncached", uncached), ("cold", cold_time), ("warm", warm)):
+        print(f"{name:>10} {seconds * 1e6:>10.1f} {uncached / seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import uuid
+import pytest
+from urllib.parse import urlparse
+
+
+@pytest.fixture(scope="session")
+def postgres_url():
+    """PostgreSQL for DB-backed tests: TEST_DATABASE_URL if set, otherwise a throwaway container"""
+    database_url = os.getenv("TEST_DATABASE_URL")
+    if database_url:
+        yield database_url
+        return
+
+    from testcontainers.postgres import PostgresContainer
+    with PostgresContainer("postgres:15") as postgres:
+        yield postgres.get_connection_url()
+
+
+@pytest.fixture
+def postgres_env(postgres_url, monkeypatch):
+    """Point app.db.database at the test database and start from a fresh engine"""
+    from app.db.database import dispose_engine
+
+    parsed_pg = urlparse(postgres_url)
+    monkeypatch.setenv("POSTGRES_HOST", parsed_pg.hostname)
+    monkeypatch.setenv("POSTGRES_PORT", str(parsed_pg.port))
+    monkeypatch.setenv("POSTGRES_USER", parsed_pg.username)
+    monkeypatch.setenv("POSTGRES_PASSWORD", parsed_pg.password)
+    monkeypatch.setenv("POSTGRES_DB", parsed_pg.path.lstrip("/"))
+
+    dispose_engine()
+    yield postgres_url
+    dispose_engine()
+
+
+@pytest.fixture
+def inventory_tables(postgres_env):
+    """Create the schema on the test database and empty it before each test"""
+    from sqlalchemy import text
+    from app.db.database import create_schema, get_engine
+    from app.models.database.inventory import InventoryItemModel, InventoryShopVersionModel, OutboxMessageModel
+    from app.services.item_cache import item_cache
+
+    engine = get_engine()
+    create_schema(engine)
+    with engine.begin() as connection:
+        connection.execute(text(
+            f"TRUNCATE {InventoryItemModel.__tablename__}, {InventoryShopVersionModel.__tablename__}, "
+            f"{OutboxMessageModel.__tablename__}"
+        ))
+    # The truncate bypasses the services, so drop anything cached by earlier tests
+    item_cache.clear()
+    yield engine
+
+
+def item_fields(shop_id=None, n=0, **overrides):
+    """Fields of a valid item numbered n; a new shop unless shop_id is given"""
+    fields = {
+        "shop_id": shop_id or uuid.uuid4(),
+        "name": f"Stem {n}",
+        "description": "Single stem",
+        "category": "Stems",
+        "price": 2.5,
+        "quantity": 5,
+    }
+    fields.update(overrides)
+    return fields
+
+
+@pytest.fixture
+def new_item():
+    """Factory for InventoryItemCreate: new_item(shop_id=None, n=0, **overrides)"""
+    from app.models.domain.inventory import InventoryItemCreate
+
+    def new_item(shop_id=None, n=0, **overrides):
+        return InventoryItemCreate(**item_fields(shop_id, n, **overrides))
+    return new_item
+
+
+@pytest.fixture
+def item_row():
+    """Factory for an item as a JSON row, as posted to the bulk and import endpoints"""
+    def item_row(shop_id=None, n=0, **overrides):
+        row = item_fields(shop_id, n, **overrides)
+        row["shop_id"] = str(row["shop_id"])
+        return row
+    return item_row
@@ -0,0 +1,280 @@
+import asyncio
+import json
+import time
+import uuid
+import httpx
+import pika
+import pytest
+from app.messaging import async_publisher
+from app.messaging.async_publisher import AsyncRabbitMQPublisher, InMemoryBroker, PikaTransport, PublishBufferFull, PublishNacked
+from app.messaging.confirms import ConfirmTracker, PublishError
+
+
+class StalledBroker(InMemoryBroker):
+    """Connects only once released, so everything published before that stays buffered"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = asyncio.Event()
+
+    async def connect(self):
+        await self.release.wait()
+        await super().connect()
+
+
+class ScriptedConnection:
+    """AsyncioConnection stand-in whose exchange_declare succeeds, never answers, or loses the connection"""
+
+    declare = "ok"
+    opened = []
+
+    def __init__(self, parameters, on_open_callback, on_open_error_callback, on_close_callback, custom_ioloop):
+        self.on_close_callback = on_close_callback
+        self.is_open = self.is_closing = self.is_closed = False
+        self.mode = ScriptedConnection.declare
+        ScriptedConnection.opened.append(self)
+        custom_ioloop.call_soon(self._open, on_open_callback)
+
+    def _open(self, on_open_callback):
+        self.is_open = True
+        on_open_callback(self)
+
+    def channel(self, on_open_callback):
+        channel = ScriptedChannel(self)
+        asyncio.get_running_loop().call_soon(on_open_callback, channel)
+        return channel
+
+    def close(self):
+        self.is_open, self.is_closed = False, True
+        self.on_close_callback(self, "closed")
+
+
+class ScriptedChannel:
+    def __init__(self, connection):
+        self.connection = connection
+        self.is_open = True
+
+    def add_on_close_callback(self, callback):
+        pass
+
+    def exchange_declare(self, exchange, exchange_type, callback):
+        if self.connection.mode == "ok":
+            asyncio.get_running_loop().call_soon(callback, None)
+        elif self.connection.mode == "close":
+            asyncio.get_running_loop().call_soon(self.connection.close)
+
+    def confirm_delivery(self, on_confirm, callback):
+        asyncio.get_running_loop().call_soon(callback, None)
+
+
+@pytest.mark.asyncio
+async def test_connect_fails_instead_of_hanging_when_the_broker_stops_answering(monkeypatch):
+    monkeypatch.setattr(async_publisher, "AsyncioConnection", ScriptedConnection)
+    monkeypatch.setattr(ScriptedConnection, "opened", [])
+    transport = PikaTransport(parameters=lambda: None, connect_timeout=0.2)
+
+    # The connection closes while the exchanges are being declared
+    monkeypatch.setattr(ScriptedConnection, "declare", "close")
+    with pytest.raises(PublishError):
+        await asyncio.wait_for(transport.connect(), 1)
+    assert not transport.is_open and not transport._calls
+
+    # The broker never answers a declaration: the attempt times out and is torn down
+    monkeypatch.setattr(ScriptedConnection, "declare", "stall")
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(transport.connect(), 1)
+    assert ScriptedConnection.opened[-1].is_closed and not transport._calls
+
+    monkeypatch.setattr(ScriptedConnection, "declare", "ok")
+    await asyncio.wait_for(transport.connect(), 1)
+    assert transport.is_open and len(ScriptedConnection.opened) == 3
+
+
+@pytest.mark.asyncio
+async def test_publish_returns_before_the_broker_confirms():
+    broker = InMemoryBroker(confirm_delay=0.2)
+    publisher = AsyncRabbitMQPublisher(broker)
+    try:
+        started = time.monotonic()
+        confirm = await publisher.publish_event("inventory_events", "inventory.created", {"n": 1})
+        assert time.monotonic() - started < 0.1 and not confirm.done()
+        await asyncio.wait_for(confirm, 1)
+
+        correlation_id = await publisher.request_shop_status("shop-1", "shop_status_responses")
+        exchange, routing_key, body, properties = broker.messages[-1]
+        assert (exchange, routing_key) == ("shop_events", "shop.status.request")
+        assert properties.correlation_id == correlation_id and json.loads(body)["shop_id"] == "shop-1"
+
+        broker.nack_next = True
+        confirm = await publisher.publish_event("inventory_events", "inventory.updated", {"n": 2})
+        with pytest.raises(PublishNacked):
+            await confirm
+    finally:
+        await publisher.close()
+    assert broker.connects == 1
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_applies_backpressure_then_drops():
+    broker = StalledBroker()
+    publisher = AsyncRabbitMQPublisher(broker, buffer_size=2, buffer_timeout=0.1)
+    try:
+        # One message is held by the sender waiting to connect, two fill the buffer
+        confirms = [await publisher.publish_event("inventory_events", "inventory.updated", {"n": n}) for n in range(3)]
+        started = time.monotonic()
+        dropped = await publisher.publish_event("inventory_events", "inventory.updated", {"n": 3})
+        assert time.monotonic() - started >= 0.1
+        with pytest.raises(PublishBufferFull):
+            await dropped
+
+        # Space frees up as soon as the broker is back
+        waiting = asyncio.ensure_future(publisher.publish_event("inventory_events", "inventory.updated", {"n": 4}))
+        await asyncio.sleep(0.02)
+        assert not waiting.done()
+        broker.release.set()
+        confirms.append(await asyncio.wait_for(waiting, 1))
+        await asyncio.wait_for(asyncio.gather(*confirms), 1)
+    finally:
+        await publisher.close()
+    assert [json.loads(body)["n"] for _, _, body, _ in broker.messages] == [0, 1, 2, 4]
+
+
+@pytest.mark.asyncio
+async def test_confirm_tracker_settles_batches_within_a_bounded_window():
+    tracker = ConfirmTracker(max_in_flight=4)
+    await tracker.wait_for_room()
+    confirms = [tracker.track() for _ in range(4)]
+    waiting = asyncio.ensure_future(tracker.wait_for_room())
+    await asyncio.sleep(0.01)
+    assert not waiting.done()
+
+    # One multiple ack settles every tag up to it and frees the window
+    tracker.ack(2, multiple=True)
+    await asyncio.wait_for(waiting, 1)
+    assert [c.done() for c in confirms] == [True, True, False, False] and len(tracker) == 2
+
+    tracker.nack(4)
+    with pytest.raises(PublishNacked):
+        await confirms[3]
+    tracker.reset(PublishError("channel closed"))
+    with pytest.raises(PublishError):
+        await confirms[2]
+    assert len(tracker) == 0 and tracker.last_tag == 0
+
+
+@pytest.mark.asyncio
+async def test_sender_pipelines_up_to_the_in_flight_window():
+    broker = InMemoryBroker(confirm_delay=0.02, max_in_flight=8)
+    publisher = AsyncRabbitMQPublisher(broker)
+    in_flight = []
+    track = broker.confirms.track
+
+    def tracking():
+        confirm = track()
+        in_flight.append(len(broker.confirms))
+        return confirm
+
+    broker.confirms.track = tracking
+    try:
+        started = time.monotonic()
+        confirms = [await publisher.publish_event("inventory_events", "inventory.updated", {"n": n}) for n in range(40)]
+        await asyncio.wait_for(asyncio.gather(*confirms), 2)
+        # Five round trips of eight, not forty round trips of one
+        assert time.monotonic() - started < 0.5
+    finally:
+        await publisher.close()
+    assert max(in_flight) == 8
+    assert [json.loads(body)["n"] for _, _, body, _ in broker.messages] == list(range(40))
+
+
+@pytest.mark.asyncio
+async def test_coalescing_keeps_the_latest_update_per_item_in_order():
+    broker = InMemoryBroker()
+    publisher = AsyncRabbitMQPublisher(broker, coalesce_window=0.05)
+
+    async def update(item_id, quantity):
+        return await publisher.publish_event("inventory_events", "inventory.updated", {"item_id": item_id, "quantity": quantity})
+
+    try:
+        started = time.monotonic()
+        confirms = [await update(f"item-{n % 3}", n) for n in range(30)]
+        assert broker.messages == []
+        # Any other event on the exchange flushes the window first
+        confirms.append(await publisher.publish_event("inventory_events", "inventory.deleted", {"item_id": "item-0"}))
+        confirms.append(await update("item-1", 100))
+        await asyncio.wait_for(asyncio.gather(*confirms), 1)
+        assert time.monotonic() - started >= 0.05
+    finally:
+        await publisher.close()
+
+    events = [(routing_key, json.loads(body)) for _, routing_key, body, _ in broker.messages]
+    assert [routing_key for routing_key, _ in events] == ["inventory.updated", "inventory.deleted", "inventory.updated"]
+    batch = events[0][1]
+    assert batch["event_type"] == "inventory_items_updated" and batch["count"] == 3
+    assert [(item["item_id"], item["quantity"]) for item in batch["items"]] == [("item-0", 27), ("item-1", 28), ("item-2", 29)]
+    assert events[2][1] == {"item_id": "item-1", "quantity": 100}
+
+
+@pytest.mark.asyncio
+async def test_window_flushes_are_held_until_done_and_awaited_on_close():
+    import gc
+    from app.messaging.coalescer import UpdateCoalescer
+
+    release = asyncio.Event()
+    sent = []
+
+    async def send(exchange, routing_key, body, properties):
+        await release.wait()
+        sent.append(json.loads(body))
+        confirm = asyncio.get_running_loop().create_future()
+        confirm.set_result(None)
+        return confirm
+
+    coalescer = UpdateCoalescer(send, window_seconds=0.01)
+    properties = pika.BasicProperties(content_type="application/json")
+    confirm = await coalescer.add("inventory_events", json.dumps({"item_id": "item-0"}).encode(), properties)
+    await asyncio.sleep(0.05)
+    # The window closed and its flush is parked on the send; nothing but the coalescer refers to it
+    assert len(coalescer._tasks) == 1
+    gc.collect()
+
+    release.set()
+    await asyncio.wait_for(coalescer.close(), 1)
+    assert not coalescer._tasks and sent == [{"item_id": "item-0"}]
+    assert confirm.done() and confirm.exception() is None
+
+
+@pytest.mark.asyncio
+async def test_requests_share_the_async_publisher(inventory_tables, monkeypatch):
+    from app.main import app
+    from app.db.database import dispose_async_engine
+    from app.messaging.async_publisher import async_event_publisher
+    from app.messaging.outbox import outbox_relay
+
+    broker = InMemoryBroker()
+    await async_event_publisher.close()
+    monkeypatch.setattr(async_event_publisher, "transport", broker)
+    shop_id = str(uuid.uuid4())
+
+    async def create(client, n):
+        response = await client.post("/inventory/items/", data={
+            "shop_id": shop_id, "name": f"Tulip {n}", "description": "Red",
+            "category": "Stems", "price": "3.00", "quantity": "5",
+        })
+        assert response.status_code == 201
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await asyncio.gather(*(create(client, n) for n in range(10)))
+        # The requests' events reach the broker through the application's relay and publisher
+        while await outbox_relay.relay_batch():
+            pass
+    finally:
+        await async_event_publisher.close()
+        await dispose_async_engine()
+
+    assert broker.connects == 1
+    routing_keys = [routing_key for _, routing_key, _, _ in broker.messages]
+    assert routing_keys.count("inventory.created") == 10
+    assert routing_keys.count("shop.status.request") == 1
@@ -0,0 +1,105 @@
+import asyncio
+import time
+import uuid
+import httpx
+import pytest
+from sqlalchemy import text
+
+
+@pytest.mark.asyncio
+async def test_async_repository_crud(inventory_tables, new_item):
+    from app.db.database import get_async_session_local, dispose_async_engine
+    from app.repositories.async_inventory_repository import AsyncInventoryRepository
+
+    async with get_async_session_local()() as session:
+        await check_repository_crud(AsyncInventoryRepository(session), new_item)
+    await dispose_async_engine()
+
+
+async def check_repository_crud(repository, new_item):
+    from app.models.domain.inventory import InventoryItemUpdate
+
+    shop_id = uuid.uuid4()
+
+    created = await repository.create(new_item(shop_id, name="Rose Bouquet"))
+    await repository.create(new_item(shop_id, name="Tulips"))
+    await repository.create(new_item(name="Other shop"))
+
+    assert (await repository.get_by_id(created.id)).name == "Rose Bouquet"
+    assert len(await repository.get_by_shop_id(shop_id)) == 2
+    assert len(await repository.get_all()) == 3
+
+    updated = await repository.update(created.id, InventoryItemUpdate(quantity=3))
+    assert updated.quantity == 3
+    assert updated.name == "Rose Bouquet"
+
+    assert await repository.delete(created.id) is True
+    assert len(await repository.get_by_shop_id(shop_id)) == 1
+    assert await repository.delete(uuid.uuid4()) is False
+    assert await repository.update(uuid.uuid4(), InventoryItemUpdate(quantity=1)) is None
+
+
+@pytest.mark.asyncio
+async def test_async_sessions_do_not_block_each_other(inventory_tables):
+    from app.db.database import get_async_db, dispose_async_engine
+
+    async def slow_query():
+        async for db in get_async_db():
+            await db.execute(text("SELECT pg_sleep(0.3)"))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(slow_query() for _ in range(5)))
+    elapsed = time.perf_counter() - started
+    await dispose_async_engine()
+
+    assert elapsed < 1.0
+
+
+@pytest.mark.asyncio
+async def test_router_uses_async_path_end_to_end(inventory_tables):
+    from unittest.mock import MagicMock
+    from app.main import app
+    from app.db.database import dispose_async_engine
+    from app.dependencies.messaging import get_publisher
+
+    publisher = MagicMock()
+    publisher.request_shop_status.return_value = None
+    app.dependency_overrides[get_publisher] = lambda: publisher
+
+    shop_id = str(uuid.uuid4())
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/inventory/items/", data={
+                "shop_id": shop_id,
+                "name": "Peonies",
+                "description": "Pink peonies",
+                "category": "Stems",
+                "price": "12.00",
+                "quantity": "4",
+            })
+            assert response.status_code == 201
+            item_id = response.json()["id"]
+
+            response = await client.get(f"/inventory/shop/{shop_id}")
+            assert [item["id"] for item in response.json()] == [item_id]
+
+            response = await client.put(f"/inventory/items/{item_id}", json={"quantity": 9})
+            assert response.json()["quantity"] == 9
+
+            response = await client.delete(f"/inventory/items/{item_id}")
+            assert response.status_code == 204
+
+            response = await client.get(f"/inventory/items/{uuid.uuid4()}")
+            assert response.status_code == 404
+    finally:
+        app.dependency_overrides.clear()
+        await dispose_async_engine()
+
+    # Events were queued in the outbox with each write, not published on the request path
+    with inventory_tables.connect() as connection:
+        routing_keys = connection.execute(text(
+            "SELECT routing_key FROM inventory_outbox WHERE exchange = 'inventory_events' ORDER BY id"
+        )).scalars().all()
+    assert routing_keys == ["inventory.created", "inventory.updated", "inventory.deleted"]
+    publisher.publish_event.assert_not_called()
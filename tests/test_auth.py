@@ -0,0 +1,166 @@
+import time
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwk, jwt
+from app.dependencies import auth
+from app.dependencies.auth import AUDIENCE, ISSUER, JWKSManager, SigningKeyNotFound, SigningKeysUnavailable, VerifiedTokenCache
+
+
+def signing_key(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    public = jwk.construct(pem, algorithm="RS256").public_key().to_dict()
+    public.update(kid=kid, use="sig")
+    return pem, public
+
+
+def token_for(pem, kid, **claims):
+    claims = {"aud": AUDIENCE, "iss": ISSUER, "exp": int(time.time()) + 300, "sub": "user-1", **claims}
+    return jwt.encode(claims, pem, algorithm="RS256", headers={"kid": kid})
+
+
+class LocalKeySet:
+    def __init__(self, *keys):
+        self.keys = list(keys)
+        self.fetches = 0
+
+    def __call__(self):
+        self.fetches += 1
+        return {"keys": list(self.keys)}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_keys_are_fetched_lazily_once_and_rotations_are_rate_limited(monkeypatch):
+    old_pem, old_key = signing_key("old")
+    new_pem, new_key = signing_key("new")
+    key_set, clock = LocalKeySet(old_key), FakeClock()
+    manager = JWKSManager(fetcher=key_set, ttl_seconds=3600, min_refetch_seconds=30, clock=clock)
+    monkeypatch.setattr(auth, "jwks_manager", manager)
+    monkeypatch.setattr(auth, "verified_tokens", VerifiedTokenCache(max_entries=0))
+    assert key_set.fetches == 0
+
+    for _ in range(5):
+        assert auth.verify_jwt_token(f"Bearer {token_for(old_pem, 'old')}")["sub"] == "user-1"
+    assert key_set.fetches == 1
+
+    # The provider rotates: the unknown kid is fetched on demand
+    clock.now += 60
+    key_set.keys.append(new_key)
+    assert auth.verify_jwt_token(token_for(new_pem, "new"))["sub"] == "user-1"
+    assert key_set.fetches == 2
+
+    # Made-up kids cannot force a fetch per request
+    for _ in range(3):
+        with pytest.raises(HTTPException) as error:
+            auth.verify_jwt_token(token_for(new_pem, "forged"))
+        assert error.value.status_code == 401
+    assert key_set.fetches == 2
+
+    with pytest.raises(SigningKeyNotFound):
+        manager.get_key("forged")
+
+
+def test_stale_keys_refresh_in_background_and_survive_fetch_errors():
+    _, key = signing_key("a")
+    key_set, clock = LocalKeySet(key), FakeClock()
+    manager = JWKSManager(fetcher=key_set, ttl_seconds=60, min_refetch_seconds=10, clock=clock)
+    first = manager.get_key("a")
+
+    def unavailable():
+        raise OSError("no network")
+
+    manager.fetcher = unavailable
+    clock.now += 120
+    # Served from the current set while the refresh runs and fails
+    assert manager.get_key("a") is first
+    for _ in range(100):
+        if not manager._refreshing:
+            break
+        time.sleep(0.01)
+    assert manager.get_key("a") is first
+
+    manager.fetcher = key_set
+    clock.now += 120
+    manager.get_key("a")
+    for _ in range(100):
+        if key_set.fetches == 2:
+            break
+        time.sleep(0.01)
+    assert key_set.fetches == 2
+    assert manager.get_key("a") is not first
+
+
+def test_failing_first_fetch_is_rate_limited_and_fails_fast(monkeypatch):
+    pem, key = signing_key("a")
+    key_set, clock = LocalKeySet(key), FakeClock()
+    attempts = []
+
+    def unavailable():
+        attempts.append(clock.now)
+        raise OSError("identity provider down")
+
+    manager = JWKSManager(fetcher=unavailable, ttl_seconds=3600, min_refetch_seconds=30, clock=clock)
+    monkeypatch.setattr(auth, "jwks_manager", manager)
+    monkeypatch.setattr(auth, "verified_tokens", VerifiedTokenCache(max_entries=0))
+    for _ in range(3):
+        with pytest.raises(HTTPException) as error:
+            auth.verify_jwt_token(token_for(pem, "a"))
+        assert error.value.status_code == 503
+    with pytest.raises(SigningKeysUnavailable):
+        manager.get_key("a")
+    assert len(attempts) == 1
+
+    clock.now += 30
+    manager.fetcher = key_set
+    assert auth.verify_jwt_token(token_for(pem, "a"))["sub"] == "user-1"
+    assert key_set.fetches == 1
+    with pytest.raises(SigningKeyNotFound):
+        manager.get_key("b")
+
+
+def test_verified_tokens_are_cached_until_exp(monkeypatch):
+    pem, key = signing_key("k")
+    clock = FakeClock()
+    clock.now = time.time()
+    cache = VerifiedTokenCache(max_entries=2, ttl_seconds=300, clock=clock)
+    monkeypatch.setattr(auth, "jwks_manager", JWKSManager(fetcher=LocalKeySet(key)))
+    monkeypatch.setattr(auth, "verified_tokens", cache)
+    decodes = []
+    real_decode = jwt.decode
+    monkeypatch.setattr(auth.jwt, "decode", lambda *args, **kwargs: decodes.append(1) or real_decode(*args, **kwargs))
+
+    token = token_for(pem, "k", exp=int(clock.now) + 60)
+    first = auth.verify_jwt_token(f"Bearer {token}")
+    first["roles"] = ["tampered"]
+    again = auth.verify_jwt_token(f"Bearer {token}")
+    assert again["sub"] == "user-1" and "roles" not in again
+    assert len(decodes) == 1
+
+    # Tokens for another audience are rejected and never cached
+    foreign = token_for(pem, "k", aud="someone-else")
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            auth.verify_jwt_token(foreign)
+    assert len(decodes) == 3 and len(cache) == 1
+
+    # The entry dies with the token and an expired token is not stored again
+    clock.now += 61
+    auth.verify_jwt_token(token)
+    assert len(decodes) == 4 and len(cache) == 0
+
+    # Bounded: the least recently used token is evicted
+    tokens = [token_for(pem, "k", sub=f"user-{n}") for n in range(3)]
+    for item in tokens:
+        cache.put(item, {"sub": item})
+    assert cache.get(tokens[0]) is None and cache.get(tokens[2]) == {"sub": tokens[2]}
@@ -0,0 +1,177 @@
+import uuid
+from types import SimpleNamespace
+import httpx
+import pika
+import pytest
+from sqlalchemy import event
+from app.messaging.codecs import MSGPACK_CONTENT_TYPE, MsgpackCodec, decode_body
+
+
+class FakeChannel:
+    def __init__(self):
+        self.published = []
+        self.acked = []
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        self.published.append((routing_key, body, properties))
+
+    def basic_ack(self, delivery_tag):
+        self.acked.append(delivery_tag)
+
+
+def seed_items():
+    from app.db.database import get_session_local
+    from app.models.domain.inventory import InventoryItemCreate
+    from app.repositories.inventory_repository import InventoryRepository
+
+    shop_id = uuid.uuid4()
+    with get_session_local()() as db:
+        repository = InventoryRepository(db)
+        scarce, plenty, gone = repository.bulk_create([
+            InventoryItemCreate(shop_id=shop_id, name=name, description="", category="Stems", price=2.0, quantity=quantity)
+            for name, quantity in (("Dahlia", 2), ("Aster", 10), ("Zinnia", 50))
+        ])
+        repository.soft_delete(gone.id)
+    return scarce, plenty, gone
+
+
+def order(scarce, plenty, gone, missing):
+    return {"items": [
+        {"product_id": str(scarce.id), "quantity": 3},
+        {"product_id": str(plenty.id), "quantity": 10},
+        {"product_id": str(gone.id), "quantity": 1},
+        {"product_id": str(missing), "quantity": 1},
+    ]}
+
+
+@pytest.mark.asyncio
+async def test_availability_endpoint_and_rpc_answer_with_one_query(inventory_tables):
+    from app.main import app
+    from app.db.database import dispose_async_engine, get_async_engine, get_engine, get_session_local
+    from app.messaging.consumer import InventoryConsumer
+
+    scarce, plenty, gone = seed_items()
+    request = order(scarce, plenty, gone, uuid.uuid4())
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(get_async_engine().sync_engine, "before_cursor_execute", record)
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/inventory/availability", json=request)
+    finally:
+        event.remove(get_async_engine().sync_engine, "before_cursor_execute", record)
+        await dispose_async_engine()
+
+    assert response.status_code == 200
+    body = response.json()
+    item_queries = [statement for statement in statements if "inventory_items" in statement]
+    assert len(item_queries) == 1 and "= ANY" in item_queries[0]
+    assert body["all_available"] is False
+    assert [(r["available"], r.get("reason")) for r in body["results"]] == [
+        (False, "Insufficient quantity"), (True, None), (False, "Insufficient quantity"), (False, "Product not found"),
+    ]
+    # A soft-deleted item is still reported by name, with nothing left to sell
+    assert body["results"][2] == {
+        "product_id": str(gone.id), "available": False, "current_quantity": 0, "requested_quantity": 1,
+        "product_name": "Zinnia", "shop_id": str(gone.shop_id), "reason": "Insufficient quantity",
+    }
+    assert body["results"][1] == {
+        "product_id": str(plenty.id), "available": True, "current_quantity": 10, "requested_quantity": 10,
+        "product_name": "Aster", "shop_id": str(plenty.shop_id),
+    }
+
+    # The RPC consumer replies with the same body, in the request's content type
+    statements.clear()
+    channel = FakeChannel()
+    consumer = InventoryConsumer(session_factory=get_session_local())
+    properties = pika.BasicProperties(reply_to="orders.replies", correlation_id="c-1", content_type=MSGPACK_CONTENT_TYPE)
+    event.listen(get_engine(), "before_cursor_execute", record)
+    try:
+        consumer._handle_inventory_check(channel, SimpleNamespace(delivery_tag=7), properties, MsgpackCodec().encode(request))
+    finally:
+        event.remove(get_engine(), "before_cursor_execute", record)
+    assert len(statements) == 1 and "= ANY" in statements[0]
+    routing_key, reply, reply_properties = channel.published[0]
+    assert routing_key == "orders.replies" and reply_properties.correlation_id == "c-1"
+    assert decode_body(reply, reply_properties.content_type) == body
+    assert channel.acked == [7]
+
+    # Malformed requests still get an answer and are acknowledged
+    consumer._handle_inventory_check(channel, SimpleNamespace(delivery_tag=8), properties, b"\xc1")
+    error = decode_body(channel.published[1][1], channel.published[1][2].content_type)
+    assert error["all_available"] is False and "error" in error
+    assert channel.acked == [7, 8]
+
+
+def test_inactive_items_are_never_available():
+    from datetime import datetime, timezone
+    from app.models.domain.inventory import AvailabilityRequestItem, InventoryItem
+    from app.services.inventory_service import availability_response
+
+    now = datetime.now(timezone.utc)
+    item = InventoryItem(
+        shop_id=uuid.uuid4(), name="Zinnia", description="", category="Stems", price=2.0, quantity=50,
+        created_at=now, updated_at=now, is_active=False,
+    )
+    response = availability_response([AvailabilityRequestItem(product_id=item.id, quantity=0)], [item])
+
+    assert response.all_available is False
+    result = response.results[0]
+    assert (result.available, result.current_quantity, result.reason) == (False, 0, "Insufficient quantity")
+
+
+def test_consumer_reconnects_until_stopped():
+    from app.messaging.consumer import InventoryConsumer
+
+    attempts = []
+
+    class Connection:
+        is_closed = False
+        is_open = True
+
+        def __init__(self, lost):
+            self.lost = lost
+
+        def channel(self):
+            connection = self
+
+            class Channel(FakeChannel):
+                def queue_declare(self, queue, durable):
+                    pass
+
+                def basic_qos(self, prefetch_count):
+                    pass
+
+                def basic_consume(self, queue, on_message_callback):
+                    pass
+
+                def start_consuming(self):
+                    if connection.lost:
+                        raise pika.exceptions.StreamLostError("broker restarted")
+                    consumer.stop_consuming()
+
+                def stop_consuming(self):
+                    pass
+
+            return Channel()
+
+        def add_callback_threadsafe(self, callback):
+            callback()
+
+        def close(self):
+            self.is_closed = True
+
+    def connect():
+        attempts.append(len(attempts))
+        if len(attempts) <= 6:
+            raise pika.exceptions.AMQPConnectionError("refused")
+        return Connection(lost=len(attempts) == 7)
+
+    consumer = InventoryConsumer(connect=connect, reconnect_seconds=0.01)
+    consumer.start_consuming()
+    # More refusals than the old five-attempt limit, a lost connection, then a clean stop
+    assert len(attempts) == 8 and consumer.connection.is_closed
@@ -0,0 +1,82 @@
+import json
+import uuid
+from unittest.mock import MagicMock
+import httpx
+import pytest
+from sqlalchemy import event, text
+
+
+def test_validation_reports_bad_rows_without_dropping_neighbours(item_row):
+    from app.services.bulk_items import validate_item_rows
+
+    shop_id = uuid.uuid4()
+    rows = [item_row(shop_id, 1), item_row(shop_id, 2, price=0), "not an object", item_row(shop_id, 3)]
+    valid, errors = validate_item_rows(rows, batch_size=3)
+
+    assert [index for index, _ in valid] == [0, 3]
+    assert [error.index for error in errors] == [1, 2]
+    assert errors[0].errors[0]["loc"] == ["price"]
+
+
+def test_ndjson_parsing_skips_blank_lines():
+    from app.services.bulk_items import parse_item_rows
+
+    body = b'{"a": 1}\n\n{"a": 2}\n{broken\n'
+    assert parse_item_rows(body, "application/x-ndjson; charset=utf-8") == [{"a": 1}, {"a": 2}, "{broken"]
+    with pytest.raises(ValueError):
+        parse_item_rows(b'{"a": 1}', "application/json")
+
+
+@pytest.mark.asyncio
+async def test_bulk_endpoint_inserts_valid_rows_in_batched_statements(inventory_tables, item_row):
+    from app.main import app
+    from app.db.database import dispose_async_engine, get_async_engine
+    from app.dependencies.messaging import get_publisher
+    from app.messaging.shop_status import shop_status_client
+
+    publisher = MagicMock()
+    app.dependency_overrides[get_publisher] = lambda: publisher
+
+    inserts = []
+    event.listen(
+        get_async_engine().sync_engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: inserts.append(statement) if statement.startswith("INSERT INTO inventory_items") else None,
+    )
+
+    shops = [uuid.uuid4(), uuid.uuid4()]
+    rows = [item_row(shops[n % 2], n) for n in range(1500)]
+    rows[10]["quantity"] = -1
+    # Rows of a shop the shop service reported inactive are refused like invalid ones
+    closed_shop = uuid.uuid4()
+    shop_status_client.resolve(None, {"shop_id": str(closed_shop), "is_active": False})
+    rows[20]["shop_id"] = rows[21]["shop_id"] = str(closed_shop)
+    body = "\n".join(json.dumps(row) for row in rows).encode()
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post(
+                "/inventory/items/bulk", content=body,
+                headers={"content-type": "application/x-ndjson"},
+            )
+            assert response.status_code == 200
+            result = response.json()
+
+            response = await client.get(f"/inventory/shop/{shops[0]}", params={"limit": 1000})
+            assert len(response.json()) == 748
+    finally:
+        app.dependency_overrides.clear()
+        await dispose_async_engine()
+
+    assert len(result["created"]) == 1497
+    assert [error["index"] for error in result["errors"]] == [10, 20, 21]
+    assert result["errors"][1]["errors"][0]["type"] == "shop_inactive"
+    # 1497 rows travel as a couple of multi-row INSERTs, not one statement per row
+    assert len(inserts) <= 2
+
+    with inventory_tables.connect() as connection:
+        outbox = connection.execute(text("SELECT routing_key, payload FROM inventory_outbox ORDER BY id")).all()
+    created_events = [payload for routing_key, payload in outbox if routing_key == "inventory.created"]
+    assert [body["event_type"] for body in created_events] == ["inventory_items_created"] * 3
+    assert sum(body["count"] for body in created_events) == 1497
+    assert [routing_key for routing_key, _ in outbox].count("shop.status.request") == 2
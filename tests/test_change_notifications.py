@@ -0,0 +1,171 @@
+import asyncio
+import json
+import select
+import uuid
+import asyncpg
+import pytest
+from prometheus_client import REGISTRY
+from app.db.notifications import CHANGE_CHANNEL, parse_change_payload
+
+
+def drain_notifications(raw_connection, timeout=1.0):
+    payloads = []
+    if select.select([raw_connection], [], [], timeout)[0]:
+        raw_connection.poll()
+        while raw_connection.notifies:
+            payloads.append(raw_connection.notifies.pop(0).payload)
+    return payloads
+
+
+def test_parse_change_payload():
+    item_id, shop_id = uuid.uuid4(), uuid.uuid4()
+    assert parse_change_payload(json.dumps({"items": [[str(item_id), str(shop_id)]]})) == ({(item_id, shop_id)}, set(), False)
+    assert parse_change_payload(json.dumps({"shops": [str(shop_id)]})) == (set(), {shop_id}, False)
+    assert parse_change_payload('{"all": true}')[2] is True
+    assert parse_change_payload("garbage")[2] is True
+
+
+def test_committed_writes_notify_once_per_statement(inventory_tables, new_item):
+    from app.db.database import get_session_local
+    from app.models.domain.inventory import InventoryItemUpdate, QuantityAdjustment
+    from app.repositories.inventory_repository import InventoryRepository
+
+    listen_connection = inventory_tables.raw_connection()
+    try:
+        raw = listen_connection.driver_connection
+        raw.autocommit = True
+        raw.cursor().execute(f"LISTEN {CHANGE_CHANNEL}")
+
+        shop_id = uuid.uuid4()
+        with get_session_local()() as db:
+            repository = InventoryRepository(db)
+            created = repository.create(new_item(shop_id))
+            repository.update(created.id, InventoryItemUpdate(quantity=3))
+            repository.update(uuid.uuid4(), InventoryItemUpdate(quantity=3))
+            # Rolled back writes are never announced
+            repository.adjust_quantities([QuantityAdjustment(item_id=created.id, delta=-100)])
+
+            payloads = drain_notifications(raw)
+            assert [parse_change_payload(p)[0] for p in payloads] == [{(created.id, shop_id)}] * 2
+
+            # Too many ids for one payload: the statement is announced by shop
+            repository.bulk_create([new_item(shop_id, n) for n in range(150)])
+            payloads = drain_notifications(raw)
+            assert [parse_change_payload(p)[:2] for p in payloads] == [(set(), {shop_id})]
+
+            # Too many shops for one payload: split by shop, never announced as everything
+            shop_ids = [uuid.uuid4() for _ in range(400)]
+            repository.bulk_create([new_item(each) for each in shop_ids])
+            parsed = [parse_change_payload(p) for p in drain_notifications(raw)]
+            assert len(parsed) == 3
+            assert not any(everything for _, _, everything in parsed)
+            assert set().union(*(shops for _, shops, _ in parsed)) == set(shop_ids)
+    finally:
+        listen_connection.close()
+
+
+def test_reinstalling_notifications_does_not_wait_on_open_reads(inventory_tables, monkeypatch):
+    from sqlalchemy import text
+    from app.db.database import dispose_engine, get_engine
+    from app.db.notifications import install_change_notifications
+
+    with inventory_tables.connect() as reader:
+        # A long read, such as an export stream, holds ACCESS SHARE on the table
+        reader.execute(text("SELECT count(*) FROM inventory_items"))
+        # A second start-up must not queue behind it; CREATE or DROP TRIGGER would hit the lock timeout
+        monkeypatch.setenv("PGOPTIONS", "-c lock_timeout=1000")
+        dispose_engine()
+        install_change_notifications(get_engine())
+        reader.rollback()
+
+
+@pytest.mark.asyncio
+async def test_listener_evicts_coalesces_and_reconnects(inventory_tables, new_item):
+    from sqlalchemy import text
+    from app.db.database import get_listen_dsn, get_session_local
+    from app.models.domain.inventory import InventoryItemUpdate
+    from app.repositories.inventory_repository import InventoryRepository
+    from app.services.change_listener import ChangeListener
+    from app.services.item_cache import ItemCache, item_key, item_tag, shop_listing_key, shop_tag
+
+    connects = []
+
+    async def connect(dsn):
+        connects.append(dsn)
+        return await asyncpg.connect(dsn)
+
+    cache = ItemCache()
+    listener = ChangeListener(cache, dsn=get_listen_dsn(), coalesce_seconds=0.1, connect=connect)
+    shop_id = uuid.uuid4()
+
+    def fill_cache(item):
+        cache.end_fill(item_key(item.id), item, [item_tag(item.id)], cache.begin_fill())
+        cache.end_fill(shop_listing_key(shop_id, 0, 100), [item], [shop_tag(shop_id)], cache.begin_fill())
+
+    async def wait_until_evicted():
+        for _ in range(100):
+            if len(cache) == 0:
+                return
+            await asyncio.sleep(0.02)
+        raise AssertionError("cache entries were not evicted")
+
+    await listener.start()
+    try:
+        await asyncio.wait_for(listener.connected.wait(), 5)
+        with get_session_local()() as db:
+            repository = InventoryRepository(db)
+            item = repository.create(new_item(shop_id))
+            await asyncio.sleep(0.3)
+
+            fill_cache(item)
+            batches = REGISTRY.get_sample_value("inventory_change_invalidation_batches_total")
+            # Another replica's burst of writes
+            for quantity in range(10):
+                repository.update(item.id, InventoryItemUpdate(quantity=quantity))
+            await wait_until_evicted()
+            await asyncio.sleep(0.2)
+            assert REGISTRY.get_sample_value("inventory_change_invalidation_batches_total") - batches <= 2
+
+            # Kill the LISTEN backend; the listener reconnects on its own
+            db.execute(text(
+                "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                "WHERE query ILIKE 'LISTEN%' AND pid <> pg_backend_pid()"
+            ))
+            db.commit()
+            for _ in range(250):
+                if len(connects) == 2 and listener.connected.is_set():
+                    break
+                await asyncio.sleep(0.02)
+            else:
+                raise AssertionError("listener did not reconnect")
+
+            fill_cache(item)
+            repository.update(item.id, InventoryItemUpdate(quantity=1))
+            await wait_until_evicted()
+    finally:
+        await listener.stop()
+
+
+@pytest.mark.asyncio
+async def test_listener_keeps_retrying_after_unexpected_errors():
+    from app.services.change_listener import ChangeListener
+    from app.services.item_cache import ItemCache
+
+    attempts = []
+
+    async def connect(dsn):
+        attempts.append(dsn)
+        if len(attempts) == 1:
+            raise RuntimeError("driver bug")
+        raise asyncpg.InterfaceError("cannot connect")
+
+    listener = ChangeListener(ItemCache(), dsn="postgresql://unused", reconnect_max_seconds=0.01, connect=connect)
+    await listener.start()
+    try:
+        for _ in range(100):
+            if len(attempts) >= 3:
+                break
+            await asyncio.sleep(0.01)
+        assert len(attempts) >= 3 and not listener._task.done()
+    finally:
+        await listener.stop()
@@ -0,0 +1,53 @@
+import json
+import uuid
+from datetime import datetime
+import pytest
+from app.messaging.async_publisher import AsyncRabbitMQPublisher, InMemoryBroker
+from app.messaging.codecs import MSGPACK_CONTENT_TYPE, JsonCodec, MsgpackCodec, codec_for, decode_body
+
+
+def sample_event():
+    return {
+        "event_type": "inventory_item_created",
+        "item_id": str(uuid.uuid4()),
+        "shop_id": str(uuid.uuid4()),
+        "name": "Peony",
+        "category": "Stems",
+        "price": 4.5,
+        "quantity": 12,
+        "timestamp": datetime(2024, 5, 1, 9, 30).isoformat(),
+    }
+
+
+def test_codecs_are_chosen_by_content_type_and_default_to_json():
+    assert isinstance(codec_for(None), JsonCodec) and isinstance(codec_for(""), JsonCodec)
+    assert isinstance(codec_for("application/json; charset=utf-8"), JsonCodec)
+    assert isinstance(codec_for("application/x-msgpack"), MsgpackCodec)
+    with pytest.raises(ValueError):
+        codec_for("text/csv")
+
+    event = sample_event()
+    # Messages published before codecs existed carry plain JSON, with or without a content type
+    legacy = json.dumps(event).encode()
+    assert decode_body(legacy, None) == decode_body(legacy, "application/json") == event
+    packed = MsgpackCodec().encode(event)
+    assert decode_body(packed, MSGPACK_CONTENT_TYPE) == event
+    assert len(packed) < len(legacy)
+
+
+@pytest.mark.asyncio
+async def test_publisher_encodes_events_and_batches_with_its_codec():
+    broker = InMemoryBroker()
+    publisher = AsyncRabbitMQPublisher(broker, coalesce_window=0.01, content_type=MSGPACK_CONTENT_TYPE)
+    try:
+        await publisher.publish_event("inventory_events", "inventory.created", {"item_id": "a", "quantity": 1})
+        for quantity in (2, 3):
+            await publisher.publish_event("inventory_events", "inventory.updated", {"item_id": "a", "quantity": quantity})
+        await publisher.publish_event("inventory_events", "inventory.updated", {"item_id": "b", "quantity": 9})
+    finally:
+        await publisher.close()
+
+    decoded = [decode_body(body, properties.content_type) for _, _, body, properties in broker.messages]
+    assert all(properties.content_type == MSGPACK_CONTENT_TYPE for _, _, _, properties in broker.messages)
+    assert decoded[0] == {"item_id": "a", "quantity": 1}
+    assert [item["quantity"] for item in decoded[1]["items"]] == [3, 9]
@@ -0,0 +1,62 @@
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+
+def test_pool_settings_from_environment(monkeypatch):
+    from app.db.database import get_pool_settings
+
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "7")
+    monkeypatch.setenv("DB_POOL_RECYCLE", "60")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+
+    settings = get_pool_settings()
+    assert settings["pool_size"] == 3
+    assert settings["max_overflow"] == 7
+    assert settings["pool_recycle"] == 60
+    assert settings["pool_pre_ping"] is False
+
+
+def test_engine_is_built_once_per_process(postgres_env):
+    from app.db.database import get_engine, get_session_local, dispose_engine
+
+    engine = get_engine()
+    assert get_engine() is engine
+    assert get_session_local() is get_session_local()
+
+    dispose_engine()
+    assert get_engine() is not engine
+
+
+def test_repeated_requests_reuse_pooled_connections(postgres_env):
+    from app.db.database import get_db, get_engine
+
+    connects = []
+    event.listen(get_engine(), "connect", lambda dbapi_conn, record: connects.append(record))
+
+    app = FastAPI()
+
+    @app.get("/ping")
+    def ping(db: Session = Depends(get_db)):
+        return {"value": db.execute(text("SELECT 1")).scalar()}
+
+    client = TestClient(app)
+    for _ in range(25):
+        response = client.get("/ping")
+        assert response.status_code == 200
+        assert response.json() == {"value": 1}
+
+    assert len(connects) == 1
+    assert get_engine().pool.checkedout() == 0
+
+
+def test_statement_timeout_applied(postgres_env, monkeypatch):
+    from app.db.database import get_engine, dispose_engine
+
+    monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "1500")
+    dispose_engine()
+
+    with get_engine().connect() as connection:
+        assert connection.execute(text("SHOW statement_timeout")).scalar() == "1500ms"
@@ -0,0 +1,136 @@
+import uuid
+import httpx
+import pytest
+from sqlalchemy import event
+from app.responses import etag_matches
+
+
+def test_etag_matching():
+    assert etag_matches('"a"', '"a"')
+    assert etag_matches('W/"a"', '"a"')
+    assert etag_matches('"x", "a"', '"a"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches("*", '"a"', exists=False)
+    assert not etag_matches('"b"', '"a"')
+    assert not etag_matches(None, '"a"')
+
+
+def test_every_committed_write_bumps_the_shop_version(inventory_tables, new_item):
+    from app.db.database import get_session_local
+    from app.models.domain.inventory import InventoryItemUpdate, QuantityAdjustment
+    from app.repositories.inventory_repository import InventoryRepository
+
+    shop_id, other_shop = uuid.uuid4(), uuid.uuid4()
+    with get_session_local()() as db:
+        repository = InventoryRepository(db)
+        assert repository.get_shop_version(shop_id) == 0
+
+        item = repository.create(new_item(shop_id))
+        assert repository.get_shop_version(shop_id) == 1
+        repository.update(item.id, InventoryItemUpdate(quantity=5))
+        assert repository.get_shop_version(shop_id) == 2
+        # One statement, one bump, however many rows
+        repository.bulk_create([new_item(shop_id, n) for n in range(3)] + [new_item(other_shop)])
+        assert (repository.get_shop_version(shop_id), repository.get_shop_version(other_shop)) == (3, 1)
+        # Rolled back and no-op writes leave the version alone
+        repository.adjust_quantities([QuantityAdjustment(item_id=item.id, delta=-100)])
+        repository.update(uuid.uuid4(), InventoryItemUpdate(quantity=1))
+        assert repository.get_shop_version(shop_id) == 3
+        repository.delete_by_shop(shop_id)
+        assert repository.get_shop_version(shop_id) == 4
+
+
+def test_concurrent_multi_shop_writes_do_not_deadlock_on_shop_versions(inventory_tables, new_item, monkeypatch):
+    import threading
+    from app.db.database import dispose_engine, get_session_local
+    from app.repositories.inventory_repository import InventoryRepository
+
+    # Fresh connections that plan the trigger's DISTINCT with hashing, whose output order
+    # depends on the input: only ORDER BY shop_id keeps the version rows' lock order stable
+    monkeypatch.setenv("PGOPTIONS", "-c enable_sort=off")
+    dispose_engine()
+
+    shop_ids = sorted(uuid.uuid4() for _ in range(300))
+    with get_session_local()() as db:
+        InventoryRepository(db).bulk_create([new_item(shop_id) for shop_id in shop_ids])
+
+    rounds = 100
+    start = threading.Barrier(2)
+    errors = []
+
+    def write(shops):
+        start.wait(5)
+        try:
+            for _ in range(rounds):
+                with get_session_local()() as db:
+                    # One statement over many shops; the threads overlap on some, listed in opposite orders
+                    InventoryRepository(db).bulk_create([new_item(shop_id) for shop_id in shops])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(order,)) for order in (shop_ids[:60], shop_ids[::-1])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+    assert errors == []
+    with get_session_local()() as db:
+        assert {InventoryRepository(db).get_shop_version(shop_id) for shop_id in shop_ids[:60]} == {1 + 2 * rounds}
+
+
+@pytest.mark.asyncio
+async def test_conditional_gets_answer_304_with_one_lookup(inventory_tables, new_item):
+    from app.main import app
+    from app.db.database import dispose_async_engine, get_async_engine, get_session_local
+    from app.repositories.inventory_repository import InventoryRepository
+
+    shop_id = uuid.uuid4()
+    with get_session_local()() as db:
+        item = InventoryRepository(db).create(new_item(shop_id))
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            listing = await client.get(f"/inventory/shop/{shop_id}")
+            item_response = await client.get(f"/inventory/items/{item.id}")
+            assert listing.headers["etag"] and item_response.headers["etag"]
+
+            event.listen(get_async_engine().sync_engine, "before_cursor_execute", record)
+            try:
+                response = await client.get(f"/inventory/shop/{shop_id}", headers={"If-None-Match": listing.headers["etag"]})
+                assert response.status_code == 304 and response.content == b""
+                assert response.headers["etag"] == listing.headers["etag"]
+                assert len(statements) == 1 and "inventory_shop_versions" in statements[0]
+
+                statements.clear()
+                response = await client.get(f"/inventory/items/{item.id}", headers={"If-None-Match": item_response.headers["etag"]})
+                assert response.status_code == 304
+                assert len(statements) == 1 and statements[0].startswith("SELECT inventory_items.updated_at")
+            finally:
+                event.remove(get_async_engine().sync_engine, "before_cursor_execute", record)
+
+            # "*" only matches what exists
+            response = await client.get(f"/inventory/shop/{uuid.uuid4()}", headers={"If-None-Match": "*"})
+            assert response.status_code == 200 and response.json() == []
+            response = await client.get(f"/inventory/items/{uuid.uuid4()}", headers={"If-None-Match": "*"})
+            assert response.status_code == 404
+            response = await client.get(f"/inventory/items/{item.id}", headers={"If-None-Match": "*"})
+            assert response.status_code == 304
+
+            await client.put(f"/inventory/items/{item.id}", json={"quantity": 9})
+
+            response = await client.get(f"/inventory/shop/{shop_id}", headers={"If-None-Match": listing.headers["etag"]})
+            assert response.status_code == 200
+            assert response.json()[0]["quantity"] == 9
+            assert response.headers["etag"] != listing.headers["etag"]
+
+            response = await client.get(f"/inventory/items/{item.id}", headers={"If-None-Match": item_response.headers["etag"]})
+            assert response.status_code == 200
+            assert response.headers["etag"] != item_response.headers["etag"]
+    finally:
+        await dispose_async_engine()
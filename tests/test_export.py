@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+import uuid
+import httpx
+import pytest
+
+
+@pytest.fixture
+def shop_with_items(inventory_tables):
+    from app.db.database import get_session_local
+    from app.models.domain.inventory import InventoryItemCreate, InventoryItemUpdate
+    from app.repositories.inventory_repository import InventoryRepository
+
+    shop_id = uuid.uuid4()
+    with get_session_local()() as db:
+        repository = InventoryRepository(db)
+        created = repository.bulk_create([
+            InventoryItemCreate(
+                shop_id=shop_id, name=f"Item {n}", description="Stem, long",
+                category="Stems", price=1.5, quantity=n,
+            )
+            for n in range(30)
+        ])
+        repository.soft_delete(created[0].id)
+        repository.update(created[1].id, InventoryItemUpdate(image_urls=["https://img/1.png", "https://img/1b.png"]))
+    return shop_id
+
+
+def test_stream_yields_active_items_in_listing_order(shop_with_items):
+    from app.db.database import get_session_local
+    from app.repositories.inventory_repository import InventoryRepository
+
+    with get_session_local()() as db:
+        repository = InventoryRepository(db)
+        streamed = [item.id for item in repository.stream_by_shop_id(shop_with_items, batch_size=7)]
+        listed = [item.id for item in repository.get_by_shop_id(shop_with_items, 0, 100)]
+
+    assert len(streamed) == 29
+    assert streamed == listed
+
+
+@pytest.mark.asyncio
+async def test_export_endpoint_streams_ndjson_and_csv(shop_with_items):
+    from app.main import app
+    from app.db.database import dispose_async_engine
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(f"/inventory/shop/{shop_with_items}/export")
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "application/x-ndjson"
+            rows = [json.loads(line) for line in response.text.splitlines()]
+            assert len(rows) == 29
+            assert all(row["shop_id"] == str(shop_with_items) and row["is_active"] for row in rows)
+            assert sorted(row["quantity"] for row in rows) == list(range(1, 30))
+
+            response = await client.get(f"/inventory/shop/{shop_with_items}/export", params={"format": "csv"})
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/csv")
+            records = list(csv.DictReader(io.StringIO(response.text)))
+            assert len(records) == 29
+            assert records[0]["description"] == "Stem, long"
+            image_urls = {int(record["quantity"]): json.loads(record["image_urls"]) for record in records}
+            assert image_urls[1] == ["https://img/1.png", "https://img/1b.png"]
+            assert image_urls[2] == []
+
+            response = await client.get(f"/inventory/shop/{shop_with_items}/export", params={"format": "xml"})
+            assert response.status_code == 422
+    finally:
+        await dispose_async_engine()
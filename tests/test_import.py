@@ -0,0 +1,124 @@
+import asyncio
+import json
+import uuid
+import httpx
+import pytest
+from sqlalchemy import text
+
+
+async def _wait_for(client, job_id):
+    for _ in range(200):
+        status = (await client.get(f"/inventory/imports/{job_id}")).json()
+        if status["state"] in ("completed", "failed"):
+            return status
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"import {job_id} did not finish: {status}")
+
+
+@pytest.fixture
+def existing_item(inventory_tables, new_item):
+    from app.db.database import get_session_local
+    from app.repositories.inventory_repository import InventoryRepository
+
+    with get_session_local()() as db:
+        return InventoryRepository(db).create(new_item(name="Old", description="Before import", quantity=1))
+
+
+@pytest.mark.asyncio
+async def test_ndjson_import_merges_in_chunks_and_reports_rejects(inventory_tables, existing_item, item_row, monkeypatch):
+    from app.main import app
+    from app.db.database import dispose_async_engine, get_session_local
+    from app.repositories.inventory_repository import InventoryRepository
+    from app.services import item_import
+
+    monkeypatch.setattr(item_import, "IMPORT_CHUNK_SIZE", 4)
+    shop_id = uuid.uuid4()
+    lines = [json.dumps(item_row(shop_id, n, quantity=n, image_urls=[f'https://img/"{n}",x.png'])) for n in range(9)]
+    lines.insert(3, json.dumps(item_row(shop_id, 99, price=-1)))
+    lines.insert(6, "{not json")
+    lines.append(json.dumps(item_row(existing_item.shop_id, 42, quantity=42, id=str(existing_item.id), name="Renamed")))
+    # Same id, different shop: must not take over the item
+    lines.append(json.dumps(item_row(shop_id, 7, id=str(existing_item.id), name="Hijacked")))
+    body = ("\n".join(lines) + "\n").encode()
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post(
+                "/inventory/imports", content=body, headers={"content-type": "application/x-ndjson"}
+            )
+            assert response.status_code == 202
+            status = await _wait_for(client, response.json()["id"])
+    finally:
+        await dispose_async_engine()
+
+    assert status["state"] == "completed", status
+    assert status["rows_read"] == 13
+    assert status["rows_imported"] == 10
+    assert status["rows_rejected"] == 2
+    assert status["rows_skipped"] == 1
+    assert sorted(reject["index"] for reject in status["rejects"]) == [3, 6]
+    assert status["bytes_read"] == status["bytes_total"] == len(body)
+    assert status["eta_seconds"] == 0
+
+    with get_session_local()() as db:
+        repository = InventoryRepository(db)
+        imported = repository.get_by_shop_id(shop_id, 0, 100)
+        updated = repository.get_by_id(existing_item.id)
+    assert sorted(item.quantity for item in imported) == list(range(9))
+    assert {item.image_urls[0] for item in imported} == {f'https://img/"{n}",x.png' for n in range(9)}
+    assert updated.name == "Renamed" and updated.quantity == 42
+    assert updated.shop_id == existing_item.shop_id
+
+    # Each chunk queued its batch events with the merge; the skipped row has none
+    with inventory_tables.connect() as connection:
+        events = connection.execute(text("SELECT routing_key, payload FROM inventory_outbox ORDER BY id")).all()
+    created = [item for routing_key, payload in events if routing_key == "inventory.created" for item in payload["items"]]
+    updated_events = [payload for routing_key, payload in events if routing_key == "inventory.updated"]
+    assert sorted(item["quantity"] for item in created) == list(range(9))
+    assert [payload["event_type"] for payload in updated_events] == ["inventory_items_updated"]
+    assert [(item["item_id"], item["name"]) for item in updated_events[0]["items"]] == [(str(existing_item.id), "Renamed")]
+
+
+@pytest.mark.asyncio
+async def test_csv_export_can_be_imported(existing_item):
+    from app.main import app
+    from app.db.database import dispose_async_engine
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            exported = await client.get(f"/inventory/shop/{existing_item.shop_id}/export", params={"format": "csv"})
+            response = await client.post(
+                "/inventory/imports", content=exported.content, headers={"content-type": "text/csv"}
+            )
+            status = await _wait_for(client, response.json()["id"])
+
+            response = await client.post("/inventory/imports", content=b"<xml/>", headers={"content-type": "application/xml"})
+            assert response.status_code == 415
+            assert (await client.get(f"/inventory/imports/{uuid.uuid4()}")).status_code == 404
+    finally:
+        await dispose_async_engine()
+
+    assert status["state"] == "completed", status
+    assert (status["rows_read"], status["rows_imported"], status["rows_rejected"]) == (1, 1, 0)
+
+
+@pytest.mark.asyncio
+async def test_oversized_imports_are_refused(inventory_tables, item_row, monkeypatch):
+    from app.main import app
+    from app.routers import inventory_router
+
+    monkeypatch.setattr(inventory_router, "IMPORT_MAX_BYTES", 100)
+    body = ("\n".join(json.dumps(item_row(uuid.uuid4(), n)) for n in range(5)) + "\n").encode()
+
+    async def chunked():
+        # No content-length: the limit is enforced while spooling
+        for offset in range(0, len(body), 32):
+            yield body[offset:offset + 32]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"content-type": "application/x-ndjson"}
+        assert (await client.post("/inventory/imports", content=body, headers=headers)).status_code == 413
+        assert (await client.post("/inventory/imports", content=chunked(), headers=headers)).status_code == 413
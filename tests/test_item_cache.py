@@ -0,0 +1,154 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+import pytest
+from prometheus_client import REGISTRY
+from app.models.domain.inventory import InventoryItem, InventoryItemUpdate
+from app.services.item_cache import ItemCache, MISSING, item_key, item_tag, shop_listing_key, shop_tag
+from app.services.inventory_service import AsyncInventoryService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fill(cache, key, value, tags):
+    return cache.end_fill(key, value, tags, cache.begin_fill())
+
+
+def test_lru_capacity_and_ttl():
+    clock = FakeClock()
+    cache = ItemCache(max_entries=2, ttl_seconds=10, clock=clock)
+    evicted = REGISTRY.get_sample_value("inventory_cache_evictions_total", {"reason": "capacity"}) or 0
+
+    fill(cache, item_key(1), "a", [item_tag(1)])
+    fill(cache, item_key(2), "b", [item_tag(2)])
+    assert cache.get(item_key(1)) == "a"  # 1 becomes most recently used
+    fill(cache, item_key(3), "c", [item_tag(3)])
+
+    assert cache.get(item_key(2)) is MISSING
+    assert cache.get(item_key(1)) == "a"
+    assert REGISTRY.get_sample_value("inventory_cache_evictions_total", {"reason": "capacity"}) == evicted + 1
+
+    clock.now = 10
+    assert cache.get(item_key(1)) is MISSING
+    assert len(cache) == 1
+
+
+def test_invalidating_a_shop_drops_its_listings_only():
+    cache = ItemCache()
+    shop_a, shop_b = uuid.uuid4(), uuid.uuid4()
+    fill(cache, shop_listing_key(shop_a, 0, 10), ["a"], [shop_tag(shop_a)])
+    fill(cache, shop_listing_key(shop_a, 10, 10), ["a2"], [shop_tag(shop_a)])
+    fill(cache, shop_listing_key(shop_b, 0, 10), ["b"], [shop_tag(shop_b)])
+
+    cache.invalidate_items([(uuid.uuid4(), shop_a)])
+
+    assert cache.get(shop_listing_key(shop_a, 0, 10)) is MISSING
+    assert cache.get(shop_listing_key(shop_a, 10, 10)) is MISSING
+    assert cache.get(shop_listing_key(shop_b, 0, 10)) == ["b"]
+
+
+def test_fill_racing_a_write_is_dropped():
+    cache = ItemCache()
+    generation = cache.begin_fill()
+    # A write commits and invalidates while the read is still in flight
+    cache.invalidate([item_tag(1)])
+    assert not cache.end_fill(item_key(1), "stale", [item_tag(1)], generation)
+    assert cache.get(item_key(1)) is MISSING
+
+    # Unrelated writes do not block the fill, and a fill started after the write is kept
+    generation = cache.begin_fill()
+    cache.invalidate([item_tag(2)])
+    assert cache.end_fill(item_key(1), "fresh", [item_tag(1)], generation)
+
+    generation = cache.begin_fill()
+    cache.clear()
+    assert not cache.end_fill(item_key(1), "stale", [item_tag(1)], generation)
+
+
+@pytest.mark.asyncio
+async def test_invalidation_detaches_loads_in_flight():
+    cache = ItemCache()
+    started, release = asyncio.Event(), asyncio.Event()
+    reads = []
+
+    async def load():
+        reads.append(f"read {len(reads) + 1}")
+        value = reads[-1]
+        started.set()
+        await release.wait()
+        return value
+
+    before = asyncio.ensure_future(cache.get_or_load_async(item_key(1), [item_tag(1)], load))
+    await started.wait()
+    # A write commits while the first read is in flight: later callers must not join it
+    cache.invalidate([item_tag(1)])
+    after = asyncio.ensure_future(cache.get_or_load_async(item_key(1), [item_tag(1)], load))
+    # Loads from another database are never shared either
+    replica = asyncio.ensure_future(cache.get_or_load_async(item_key(1), [item_tag(1)], load, target="replica"))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert (await before, await after, await replica) == ("read 1", "read 2", "read 3")
+    # Only the primary read that began after the write is cached
+    assert cache.get(item_key(1)) == "read 2"
+    assert len(cache.flights) == 0 and not cache._loads_by_tag
+
+
+class CountingRepository:
+    def __init__(self, item):
+        self.item = item
+        self.reads = 0
+
+    async def get_by_id(self, item_id):
+        self.reads += 1
+        return self.item if item_id == self.item.id else None
+
+    async def get_by_shop_id(self, shop_id, skip, limit):
+        self.reads += 1
+        return [self.item]
+
+    async def update(self, item_id, item_update, commit=True):
+        self.item = self.item.model_copy(update=item_update.model_dump(exclude_unset=True))
+        return self.item
+
+
+@pytest.mark.asyncio
+async def test_service_reads_through_cache_and_writes_invalidate():
+    now = datetime.now()
+    item = InventoryItem(
+        shop_id=uuid.uuid4(), name="Tulip", description="Red", category="Bulbs", price=3.0,
+        quantity=10, created_at=now, updated_at=now, is_active=True,
+    )
+    service = AsyncInventoryService(None, cache=ItemCache())
+    service.repository = repository = CountingRepository(item)
+
+    @asynccontextmanager
+    async def load_repository(target):
+        # Cache fills read the primary on a session of their own
+        assert target == "primary"
+        yield repository
+
+    service._load_repository = load_repository
+
+    assert (await service.get_item(item.id)).quantity == 10
+    assert (await service.get_item(item.id)).quantity == 10
+    await service.get_items_by_shop(item.shop_id)
+    await service.get_items_by_shop(item.shop_id)
+    assert repository.reads == 2
+
+    # Missing items are not cached
+    await service.get_item(uuid.uuid4())
+    await service.get_item(uuid.uuid4())
+    assert repository.reads == 4
+
+    await service.update_item(item.id, InventoryItemUpdate(quantity=4))
+    assert (await service.get_item(item.id)).quantity == 4
+    assert (await service.get_items_by_shop(item.shop_id))[0].quantity == 4
+    assert repository.reads == 6
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import uuid
+import httpx
+import pytest
+from sqlalchemy import text
+from app.messaging.async_publisher import AsyncRabbitMQPublisher, InMemoryBroker
+from app.messaging.outbox import OutboxRelay, outbox_message
+
+
+def unsent_count(engine):
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT count(*) FROM inventory_outbox WHERE sent_at IS NULL")).scalar()
+
+
+async def drain(relay):
+    batches = []
+    while True:
+        sent = await relay.relay_batch()
+        if not sent:
+            return batches
+        batches.append(sent)
+
+
+@pytest.mark.asyncio
+async def test_events_commit_or_roll_back_with_the_write(inventory_tables, new_item, monkeypatch):
+    from app.db.database import dispose_async_engine, get_async_session_local
+    from app.models.domain.inventory import QuantityAdjustment
+    from app.repositories.async_inventory_repository import AsyncInventoryRepository
+    from app.services.inventory_service import AsyncInventoryService
+
+    shop_id = uuid.uuid4()
+    try:
+        async with get_async_session_local()() as session:
+            service = AsyncInventoryService(session, outbox=True)
+            item = await service.create_item(new_item(shop_id))
+            assert unsent_count(inventory_tables) == 2
+
+            # Rolled back writes leave no events behind
+            await service.adjust_quantities([QuantityAdjustment(item_id=item.id, delta=-100)])
+            assert unsent_count(inventory_tables) == 2
+
+            # Nor do events survive without their write
+            async def crash(self, messages, commit=True):
+                raise ConnectionError("process died before commit")
+
+            monkeypatch.setattr(AsyncInventoryRepository, "add_outbox_messages", crash)
+            with pytest.raises(ConnectionError):
+                await service.create_item(new_item(shop_id, 1))
+            await session.rollback()
+            assert [i.name for i in await service.get_items_by_shop(shop_id)] == ["Stem 0"]
+    finally:
+        await dispose_async_engine()
+
+
+@pytest.mark.asyncio
+async def test_relay_publishes_request_events_in_batches(inventory_tables):
+    from app.main import app
+    from app.db.database import dispose_async_engine
+
+    broker = InMemoryBroker()
+    publisher = AsyncRabbitMQPublisher(broker)
+    relay = OutboxRelay(publisher, batch_size=8)
+    shop_id = str(uuid.uuid4())
+
+    async def create(client, n):
+        response = await client.post("/inventory/items/", data={
+            "shop_id": shop_id, "name": f"Tulip {n}", "description": "Red",
+            "category": "Stems", "price": "3.00", "quantity": "5",
+        })
+        assert response.status_code == 201
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await asyncio.gather(*(create(client, n) for n in range(10)))
+        # The requests never touched the broker, and only the first asked for the shop's status
+        assert broker.connects == 0 and unsent_count(inventory_tables) == 11
+
+        assert await drain(relay) == [8, 3]
+    finally:
+        await publisher.close()
+        await dispose_async_engine()
+
+    assert broker.connects == 1 and unsent_count(inventory_tables) == 0
+    routing_keys = [routing_key for _, routing_key, _, _ in broker.messages]
+    assert routing_keys.count("inventory.created") == 10 and routing_keys.count("shop.status.request") == 1
+    status_request = next(m for m in broker.messages if m[1] == "shop.status.request")
+    assert status_request[3].reply_to == "shop_status_responses" and status_request[3].correlation_id
+    assert len({properties.message_id for _, _, _, properties in broker.messages}) == 11
+
+
+@pytest.mark.asyncio
+async def test_concurrent_relays_skip_locked_rows_and_retry_nacks(inventory_tables):
+    from app.db.database import dispose_async_engine, get_session_local
+    from app.repositories.inventory_repository import InventoryRepository
+
+    with get_session_local()() as db:
+        InventoryRepository(db).add_outbox_messages([
+            outbox_message("inventory_events", "inventory.updated", {"n": n}) for n in range(100)
+        ])
+
+    brokers = [InMemoryBroker(confirm_delay=0.02), InMemoryBroker(confirm_delay=0.02)]
+    publishers = [AsyncRabbitMQPublisher(broker) for broker in brokers]
+    relays = [OutboxRelay(publisher, batch_size=15) for publisher in publishers]
+    brokers[0].nack_next = True
+    try:
+        await asyncio.gather(*(drain(relay) for relay in relays))
+        # The nacked message stayed unsent until a later batch
+        await drain(relays[0])
+    finally:
+        for publisher in publishers:
+            await publisher.close()
+        await dispose_async_engine()
+
+    delivered = [json.loads(body)["n"] for broker in brokers for _, _, body, _ in broker.messages]
+    assert sorted(delivered) == list(range(100))
+    assert all(broker.messages for broker in brokers)
+    assert unsent_count(inventory_tables) == 0
+
+
+@pytest.mark.asyncio
+async def test_relay_releases_its_claim_and_holds_back_while_the_broker_is_down(inventory_tables):
+    from app.db.database import dispose_async_engine, get_session_local
+    from app.repositories.inventory_repository import InventoryRepository
+
+    class DownBroker(InMemoryBroker):
+        def __init__(self):
+            super().__init__()
+            self.up = asyncio.Event()
+
+        async def connect(self):
+            await self.up.wait()
+            await super().connect()
+
+    with get_session_local()() as db:
+        InventoryRepository(db).add_outbox_messages([
+            outbox_message("inventory_events", "inventory.updated", {"n": n}) for n in range(5)
+        ])
+
+    broker = DownBroker()
+    publisher = AsyncRabbitMQPublisher(broker)
+    relay = OutboxRelay(publisher, confirm_timeout=0.05)
+    try:
+        assert await relay.relay_batch() == 0
+        # Nothing is locked while the relay waits, and the rows are leased rather than claimable
+        with inventory_tables.connect() as connection:
+            leased = connection.execute(text(
+                "SELECT id FROM inventory_outbox WHERE claimed_until > now() FOR UPDATE NOWAIT"
+            )).all()
+        assert len(leased) == 5
+
+        # Later polls neither publish the rows again nor claim new ones
+        with get_session_local()() as db:
+            InventoryRepository(db).add_outbox_messages([outbox_message("inventory_events", "inventory.updated", {"n": 5})])
+        assert await relay.relay_batch() == 0
+        assert publisher._buffer.qsize() + 1 == 5
+
+        broker.up.set()
+        await asyncio.wait_for(publisher._buffer.join(), 1)
+        assert sum(await drain(relay)) == 6
+    finally:
+        await publisher.close()
+        await dispose_async_engine()
+
+    assert sorted(json.loads(body)["n"] for _, _, body, _ in broker.messages) == list(range(6))
+    assert unsent_count(inventory_tables) == 0
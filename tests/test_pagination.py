@@ -0,0 +1,84 @@
+import uuid
+import httpx
+import pytest
+
+
+def test_cursor_round_trip():
+    from datetime import datetime
+    from app.repositories.pagination import encode_cursor, decode_cursor
+
+    created_at = datetime(2025, 6, 20, 10, 0, 0, 123456)
+    item_id = uuid.uuid4()
+    assert decode_cursor(encode_cursor(created_at, item_id)) == (created_at, item_id)
+
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.fixture
+def shop_with_items(inventory_tables):
+    from app.db.database import get_session_local
+    from app.models.domain.inventory import InventoryItemCreate
+    from app.repositories.inventory_repository import InventoryRepository
+
+    shop_id = uuid.uuid4()
+    with get_session_local()() as db:
+        repository = InventoryRepository(db)
+        for n in range(25):
+            repository.create(InventoryItemCreate(
+                shop_id=shop_id, name=f"Item {n}", description="Stem",
+                category="Stems", price=1.5, quantity=n,
+            ))
+    return shop_id
+
+
+def test_cursor_pages_cover_listing_in_stable_order(shop_with_items):
+    from app.db.database import get_session_local
+    from app.repositories.inventory_repository import InventoryRepository
+
+    with get_session_local()() as db:
+        repository = InventoryRepository(db)
+        offset_ids = [item.id for item in repository.get_by_shop_id(shop_with_items, 0, 100)]
+
+        cursor_ids, cursor, pages = [], "", 0
+        while True:
+            page = repository.get_page_by_shop_id(shop_with_items, limit=10, cursor=cursor)
+            cursor_ids.extend(item.id for item in page.items)
+            pages += 1
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+
+        assert pages == 3
+        assert cursor_ids == offset_ids
+        assert len(set(cursor_ids)) == 25
+        assert [item.id for item in repository.get_page(limit=100).items] == offset_ids
+
+
+@pytest.mark.asyncio
+async def test_listing_endpoints_offer_both_modes(shop_with_items):
+    from app.main import app
+    from app.db.database import dispose_async_engine
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(f"/inventory/shop/{shop_with_items}", params={"limit": 20})
+            assert isinstance(response.json(), list)
+            assert len(response.json()) == 20
+
+            response = await client.get(f"/inventory/shop/{shop_with_items}", params={"limit": 20, "cursor": ""})
+            first_page = response.json()
+            assert len(first_page["items"]) == 20
+
+            response = await client.get(
+                f"/inventory/shop/{shop_with_items}",
+                params={"limit": 20, "cursor": first_page["next_cursor"]},
+            )
+            assert len(response.json()["items"]) == 5
+            assert response.json()["next_cursor"] is None
+
+            response = await client.get("/inventory/items/", params={"cursor": "garbage"})
+            assert response.status_code == 400
+    finally:
+        await dispose_async_engine()
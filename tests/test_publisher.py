@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+import pika
+from app.messaging.publisher import RabbitMQPublisher
+
+
+class FakeChannel:
+    def __init__(self, broker):
+        self.broker = broker
+        self.is_open = True
+        self._busy = False
+
+    def exchange_declare(self, exchange, exchange_type):
+        pass
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        if self.broker.fail_next:
+            self.broker.fail_next = False
+            self.is_open = False
+            raise pika.exceptions.StreamLostError("connection reset")
+        # pika channels are not thread-safe; overlapping calls would corrupt frames
+        assert not self._busy, "channel used by two threads at once"
+        self._busy = True
+        time.sleep(0.0001)
+        self.broker.published.append((exchange, routing_key, json.loads(body)))
+        self._busy = False
+
+
+class FakeConnection:
+    def __init__(self, broker):
+        self.broker = broker
+        self.is_open = True
+
+    def channel(self):
+        return FakeChannel(self.broker)
+
+    def close(self):
+        self.is_open = False
+
+
+class FakeBroker:
+    def __init__(self):
+        self.connections = 0
+        self.published = []
+        self.fail_next = False
+        self.reachable = True
+
+    def connect(self):
+        if not self.reachable:
+            raise pika.exceptions.AMQPConnectionError("connection refused")
+        self.connections += 1
+        return FakeConnection(self)
+
+
+def test_reconnects_after_a_dropped_connection_and_backs_off_while_unreachable():
+    broker = FakeBroker()
+    now = [0.0]
+    publisher = RabbitMQPublisher(connect=broker.connect, reconnect_seconds=5, clock=lambda: now[0])
+    assert broker.connections == 0
+
+    publisher.publish_event("inventory_events", "inventory.created", {"n": 1})
+    broker.fail_next = True
+    publisher.publish_event("inventory_events", "inventory.created", {"n": 2})
+    assert broker.connections == 2
+    assert [body["n"] for _, _, body in broker.published] == [1, 2]
+
+    publisher.close()
+    broker.reachable = False
+    publisher.publish_event("inventory_events", "inventory.updated", {"n": 3})
+    broker.reachable = True
+    # Within the backoff window nothing tries to connect
+    assert publisher.request_shop_status("shop", "replies") is None
+    assert broker.connections == 2
+
+    now[0] += 5
+    assert publisher.request_shop_status("shop", "replies")
+    assert broker.connections == 3
+    assert broker.published[-1][:2] == ("shop_events", "shop.status.request")
+
+
+def test_threads_share_one_channel_safely():
+    broker = FakeBroker()
+    publisher = RabbitMQPublisher(connect=broker.connect)
+
+    def publish_many(thread):
+        for n in range(100):
+            publisher.publish_event("inventory_events", "inventory.updated", {"thread": thread, "n": n})
+
+    threads = [threading.Thread(target=publish_many, args=(t,)) for t in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert broker.connections == 1 and len(broker.published) == 800
@@ -0,0 +1,122 @@
+import asyncio
+import uuid
+import httpx
+import pytest
+
+
+@pytest.fixture
+def create_item(inventory_tables, new_item):
+    """Store an item with the given quantity and return it"""
+    from app.db.database import get_session_local
+    from app.repositories.inventory_repository import InventoryRepository
+
+    def create_item(quantity, shop_id=None):
+        with get_session_local()() as db:
+            return InventoryRepository(db).create(new_item(shop_id, quantity=quantity))
+    return create_item
+
+
+@pytest.mark.asyncio
+async def test_concurrent_decrements_never_oversell(create_item):
+    from app.db.database import get_async_session_local, dispose_async_engine
+    from app.repositories.async_inventory_repository import AsyncInventoryRepository
+
+    item = create_item(quantity=10)
+
+    async def take_one():
+        async with get_async_session_local()() as db:
+            return await AsyncInventoryRepository(db).adjust_quantity(item.id, -1)
+
+    try:
+        results = await asyncio.gather(*(take_one() for _ in range(25)))
+        async with get_async_session_local()() as db:
+            final = await AsyncInventoryRepository(db).get_by_id(item.id)
+    finally:
+        await dispose_async_engine()
+
+    assert sum(result is not None for result in results) == 10
+    assert final.quantity == 0
+
+
+def test_batch_adjustment_is_all_or_nothing(create_item):
+    from app.db.database import get_session_local
+    from app.models.domain.inventory import QuantityAdjustment
+    from app.repositories.inventory_repository import InventoryRepository
+
+    plenty, scarce = create_item(quantity=10), create_item(quantity=1)
+
+    with get_session_local()() as db:
+        repository = InventoryRepository(db)
+        items, failed = repository.adjust_quantities([
+            QuantityAdjustment(item_id=plenty.id, delta=-4),
+            QuantityAdjustment(item_id=scarce.id, delta=-2),
+        ])
+        assert items == [] and failed == [scarce.id]
+        assert repository.get_by_id(plenty.id).quantity == 10
+
+        items, failed = repository.adjust_quantities([
+            QuantityAdjustment(item_id=plenty.id, delta=-4),
+            QuantityAdjustment(item_id=scarce.id, delta=-1),
+            QuantityAdjustment(item_id=plenty.id, delta=-1),
+        ])
+        assert failed == []
+        assert {item.id: item.quantity for item in items} == {plenty.id: 5, scarce.id: 0}
+
+
+def test_failed_batch_keeps_the_callers_transaction_when_not_committing(inventory_tables, create_item):
+    from sqlalchemy import text
+    from app.db.database import get_session_local
+    from app.messaging.outbox import outbox_message
+    from app.models.domain.inventory import QuantityAdjustment
+    from app.repositories.inventory_repository import InventoryRepository
+
+    plenty, scarce = create_item(quantity=10), create_item(quantity=1)
+
+    with get_session_local()() as db:
+        repository = InventoryRepository(db)
+        repository.add_outbox_messages([outbox_message("inventory_events", "inventory.updated", {"item_id": str(plenty.id)})], commit=False)
+        items, failed = repository.adjust_quantities([
+            QuantityAdjustment(item_id=plenty.id, delta=-4),
+            QuantityAdjustment(item_id=scarce.id, delta=-2),
+        ], commit=False)
+        assert items == [] and failed == [scarce.id]
+        items, failed = repository.adjust_quantities([QuantityAdjustment(item_id=plenty.id, delta=-4)], commit=False)
+        assert failed == [] and items[0].quantity == 6
+        db.commit()
+
+    with inventory_tables.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM inventory_outbox")).scalar() == 1
+        assert connection.execute(text("SELECT quantity FROM inventory_items WHERE id = :id"), {"id": plenty.id}).scalar() == 6
+
+
+@pytest.mark.asyncio
+async def test_patch_quantity_endpoint(create_item):
+    from unittest.mock import MagicMock
+    from app.main import app
+    from app.db.database import dispose_async_engine
+    from app.dependencies.messaging import get_publisher
+
+    app.dependency_overrides[get_publisher] = lambda: MagicMock()
+    item = create_item(quantity=3)
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.patch(f"/inventory/items/{item.id}/quantity", json={"delta": -2})
+            assert response.status_code == 200
+            assert response.json()["quantity"] == 1
+
+            response = await client.patch(f"/inventory/items/{item.id}/quantity", json={"delta": -2})
+            assert response.status_code == 409
+
+            response = await client.patch(f"/inventory/items/{uuid.uuid4()}/quantity", json={"delta": 1})
+            assert response.status_code == 404
+
+            response = await client.patch("/inventory/items/quantity", json={
+                "adjustments": [{"item_id": str(item.id), "delta": 4}],
+            })
+            assert response.status_code == 200
+            assert response.json()["items"][0]["quantity"] == 5
+    finally:
+        app.dependency_overrides.clear()
+        await dispose_async_engine()
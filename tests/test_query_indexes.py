@@ -0,0 +1,39 @@
+import uuid
+from datetime import datetime
+import pytest
+from sqlalchemy import text
+from app.repositories import inventory_queries as queries
+from app.repositories.pagination import encode_cursor
+
+SHOP_ID = uuid.uuid4()
+CURSOR = encode_cursor(datetime(2025, 1, 1), uuid.uuid4())
+
+# Every statement the repositories issue, with the index expected to serve it
+REPOSITORY_QUERIES = [
+    ("get_by_id", queries.select_item_by_id(uuid.uuid4()), "inventory_items_pkey"),
+    ("get_by_shop_id", queries.select_items_by_shop(SHOP_ID, 200, 100), "ix_inventory_items_active_shop_listing"),
+    ("get_page_by_shop_id", queries.select_items_by_shop(SHOP_ID, limit=101, cursor=CURSOR), "ix_inventory_items_active_shop_listing"),
+    ("stream_by_shop_id", queries.select_shop_export(SHOP_ID), "ix_inventory_items_active_shop_listing"),
+    ("get_all", queries.select_active_items(200, 100), "ix_inventory_items_active_listing"),
+    ("get_page", queries.select_active_items(limit=101, cursor=CURSOR), "ix_inventory_items_active_listing"),
+]
+
+
+def explain(connection, stmt) -> str:
+    sql = stmt.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+    return "\n".join(row[0] for row in connection.execute(text(f"EXPLAIN {sql}")))
+
+
+@pytest.mark.parametrize("name,stmt,index_name", REPOSITORY_QUERIES, ids=[q[0] for q in REPOSITORY_QUERIES])
+def test_repository_query_is_index_backed(inventory_tables, name, stmt, index_name):
+    with inventory_tables.connect() as connection:
+        # With sequential scans and sorts priced out, the result no longer depends
+        # on table statistics: any plan that still needs one has no usable index
+        connection.execute(text("SET LOCAL enable_seqscan = off"))
+        connection.execute(text("SET LOCAL enable_sort = off"))
+        plan = explain(connection, stmt)
+
+    assert "Seq Scan" not in plan, plan
+    assert index_name in plan, plan
+    # Keyset and offset listings must come out of the index already ordered
+    assert "Sort" not in plan, plan
@@ -0,0 +1,101 @@
+import uuid
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+
+@pytest.fixture
+def replica_env(inventory_tables, postgres_url, monkeypatch):
+    """Use a second database as the "replica" so routed reads are observable"""
+    from app.db.database import Base, dispose_engine, get_read_engine
+
+    primary_url = make_url(postgres_url).set(drivername="postgresql+psycopg2")
+    replica_db = primary_url.database + "_replica"
+    admin = create_engine(primary_url, isolation_level="AUTOCOMMIT")
+    with admin.connect() as connection:
+        exists = connection.execute(
+            text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": replica_db}
+        ).scalar()
+        if not exists:
+            connection.execute(text(f'CREATE DATABASE "{replica_db}"'))
+    admin.dispose()
+
+    monkeypatch.setenv("POSTGRES_READ_HOST", primary_url.host)
+    monkeypatch.setenv("POSTGRES_READ_DB", replica_db)
+    dispose_engine()
+
+    Base.metadata.create_all(bind=get_read_engine())
+    with get_read_engine().begin() as connection:
+        connection.execute(text("TRUNCATE inventory_items"))
+    yield
+    dispose_engine()
+
+
+def test_read_engine_falls_back_to_primary(postgres_env, monkeypatch):
+    from app.db.database import get_engine, get_read_engine
+
+    monkeypatch.delenv("POSTGRES_READ_HOST", raising=False)
+    assert get_read_engine() is get_engine()
+
+
+def test_stickiness_expires():
+    from app.db.routing import PrimaryStickiness
+
+    stickiness = PrimaryStickiness(sticky_seconds=0.0)
+    stickiness.mark_write("client-a")
+    assert stickiness.is_sticky("client-a") is False
+
+    stickiness = PrimaryStickiness(sticky_seconds=60, max_clients=2)
+    for client in ("a", "b", "c"):
+        stickiness.mark_write(client)
+    assert stickiness.is_sticky("c") is True
+    assert stickiness.is_sticky(None) is False
+
+
+def test_repository_reads_route_to_replica(replica_env):
+    from app.db.database import get_session_local, get_read_session_local
+    from app.models.domain.inventory import InventoryItemCreate
+    from app.repositories.inventory_repository import InventoryRepository
+
+    with get_session_local()() as db, get_read_session_local()() as read_db:
+        repository = InventoryRepository(db, read_db)
+        created = repository.create(InventoryItemCreate(
+            shop_id=uuid.uuid4(), name="Lilies", description="White lilies",
+            category="Stems", price=9.5, quantity=2,
+        ))
+
+        # The replica database never saw the write
+        assert repository.get_by_id(created.id) is None
+        assert repository.get_by_shop_id(created.shop_id) == []
+        assert InventoryRepository(db).get_by_id(created.id).name == "Lilies"
+
+
+def test_recent_writer_reads_from_primary(replica_env):
+    from app.db.database import get_db, get_read_db
+    from app.db.routing import primary_stickiness
+    from app.models.domain.inventory import InventoryItemCreate
+    from app.repositories.inventory_repository import InventoryRepository
+
+    class FakeRequest:
+        def __init__(self, client_id):
+            self.headers = {"x-client-id": client_id}
+            self.client = None
+
+    writer = FakeRequest(f"writer-{uuid.uuid4()}")
+    reader = FakeRequest(f"reader-{uuid.uuid4()}")
+
+    db_dependency = get_db(writer)
+    db = next(db_dependency)
+    created = InventoryRepository(db).create(InventoryItemCreate(
+        shop_id=uuid.uuid4(), name="Orchid", description="Potted orchid",
+        category="Plants", price=30, quantity=1,
+    ))
+    db_dependency.close()
+    assert primary_stickiness.is_sticky(writer.headers["x-client-id"])
+
+    for request, expected in ((writer, "Orchid"), (reader, None)):
+        read_dependency = get_read_db(request)
+        read_db = next(read_dependency)
+        item = InventoryRepository(read_db).get_by_id(created.id)
+        assert (item.name if item else None) == expected
+        read_dependency.close()
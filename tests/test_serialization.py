@@ -0,0 +1,49 @@
+import json
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models.domain.inventory import InventoryItem
+from app.repositories.inventory_queries import construct_domain, to_page
+from app.responses import ORJSONResponse
+
+
+def _row(**overrides):
+    # Columns are timestamp without time zone, so rows carry naive datetimes
+    now = datetime.now()
+    values = dict(
+        id=uuid.uuid4(), shop_id=uuid.uuid4(), name="Lamp", description="Desk lamp", category="home",
+        price=12.5, quantity=3, image_urls=["https://example.com/a.png"],
+        created_at=now, updated_at=now, is_active=True,
+    )
+    values.update(overrides)
+    return SimpleNamespace(_mapping=values, **values)
+
+
+def test_constructed_item_matches_validated_item():
+    row = _row()
+    fast = construct_domain(row)
+    validated = InventoryItem(**row._mapping)
+
+    assert fast == validated
+    assert fast.model_dump() == validated.model_dump()
+    assert fast.model_fields_set == validated.model_fields_set
+
+
+def test_orjson_response_matches_default_encoding():
+    items = [construct_domain(_row()), construct_domain(_row(description="desc", image_urls=[]))]
+
+    body = json.loads(ORJSONResponse(items).body)
+
+    assert body == jsonable_encoder([InventoryItem(**item.model_dump()) for item in items])
+
+
+def test_page_serializes_items_and_cursor():
+    rows = [_row(), _row(), _row()]
+
+    body = json.loads(ORJSONResponse(to_page(rows, 2)).body)
+
+    assert [item["id"] for item in body["items"]] == [str(row.id) for row in rows[:2]]
+    assert body["next_cursor"]
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import time
+import uuid
+import pytest
+from app.messaging.async_publisher import AsyncRabbitMQPublisher, InMemoryBroker
+from app.messaging.shop_status import ShopStatusClient
+
+
+class FakeReplyConsumer:
+    def __init__(self):
+        self.reply_queue = None
+        self.on_reply = None
+        self._closed = asyncio.Event()
+
+    async def connect(self, on_reply):
+        self.on_reply = on_reply
+        self.reply_queue = "amq.gen-test"
+
+    async def wait_closed(self):
+        await self._closed.wait()
+
+    async def close(self):
+        self.reply_queue = None
+        self._closed.set()
+
+
+class ShopServiceBroker(InMemoryBroker):
+    """Answers status requests on the reply consumer after reply_delay; shops in silent never answer"""
+
+    def __init__(self, consumer, active, reply_delay=0.01):
+        super().__init__()
+        self.consumer = consumer
+        self.active = active
+        self.reply_delay = reply_delay
+        self.silent = set()
+
+    async def send(self, exchange, routing_key, body, properties):
+        confirm = await super().send(exchange, routing_key, body, properties)
+        shop_id = json.loads(body)["shop_id"]
+        if routing_key == "shop.status.request" and shop_id not in self.silent:
+            reply = json.dumps({"shop_id": shop_id, "is_active": shop_id in self.active}).encode()
+            asyncio.get_running_loop().call_later(
+                self.reply_delay, self.consumer.on_reply, properties.correlation_id, reply
+            )
+        return confirm
+
+    def requests(self):
+        return [json.loads(body)["shop_id"] for _, routing_key, body, _ in self.messages if routing_key == "shop.status.request"]
+
+
+async def started_client(**kwargs):
+    consumer = FakeReplyConsumer()
+    broker = ShopServiceBroker(consumer, active={"open-shop"})
+    client = ShopStatusClient(AsyncRabbitMQPublisher(broker), consumer, **kwargs)
+    await client.start()
+    await asyncio.sleep(0)
+    return client, broker
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_rpc_then_hit_the_cache():
+    client, broker = await started_client(timeout=1)
+    try:
+        statuses = await asyncio.gather(*(client.is_shop_active("open-shop") for _ in range(20)))
+        assert statuses == [True] * 20
+        assert await client.is_shop_active("closed-shop") is False
+        assert await client.is_shop_active("open-shop") is True
+        assert broker.requests() == ["open-shop", "closed-shop"]
+        assert all(properties.reply_to == "amq.gen-test" for _, _, _, properties in broker.messages)
+
+        # Creation-time requests skip shops already known or already asked for
+        assert client.shops_to_check(["open-shop", "new-shop", "new-shop"]) == ["new-shop"]
+        assert client.shops_to_check(["new-shop"]) == []
+    finally:
+        await client.stop()
+        await client.publisher.close()
+
+
+@pytest.mark.asyncio
+async def test_unanswered_calls_time_out_and_are_briefly_remembered_as_unknown():
+    now = [0.0]
+    client, broker = await started_client(timeout=0.05, unknown_ttl_seconds=10, clock=lambda: now[0])
+    broker.silent.add("slow-shop")
+    try:
+        assert await client.is_shop_active("slow-shop") is None
+        assert client.cached("slow-shop") is None and not client._pending
+
+        # While the shop service is unresponsive, lookups do not wait again
+        started = time.monotonic()
+        assert await client.is_shop_active("slow-shop") is None
+        assert time.monotonic() - started < 0.01 and broker.requests() == ["slow-shop"]
+
+        # Once that passes the next lookup asks again
+        now[0] += 10
+        broker.silent.discard("slow-shop")
+        assert await client.is_shop_active("slow-shop") is False
+        assert broker.requests() == ["slow-shop", "slow-shop"]
+    finally:
+        await client.stop()
+        await client.publisher.close()
+
+
+@pytest.mark.asyncio
+async def test_replies_handled_on_another_thread_resolve_waiting_calls():
+    from app.services.inventory_service import InventoryService
+
+    client, broker = await started_client(timeout=1)
+    broker.silent.add("threaded-shop")
+    service = InventoryService(None, shop_status=client)
+    try:
+        call = asyncio.ensure_future(client.is_shop_active("threaded-shop"))
+        while not broker.messages:
+            await asyncio.sleep(0.005)
+        correlation_id = broker.messages[-1][3].correlation_id
+        await asyncio.to_thread(
+            service.handle_shop_status_response, correlation_id, {"shop_id": "threaded-shop", "is_active": True}
+        )
+        assert await asyncio.wait_for(call, 1) is True
+        assert service.validate_shop_status("threaded-shop")
+    finally:
+        await client.stop()
+        await client.publisher.close()
+
+
+
+@pytest.mark.asyncio
+async def test_replies_go_through_the_service_and_inactive_shops_get_no_new_items():
+    from unittest.mock import patch
+    from app.models.domain.inventory import InventoryItemCreate
+    from app.services.inventory_service import AsyncInventoryService, InventoryService, ShopInactive
+
+    consumer = FakeReplyConsumer()
+    broker = ShopServiceBroker(consumer, active={"open-shop"})
+    client = ShopStatusClient(AsyncRabbitMQPublisher(broker), consumer, timeout=1)
+    replies = InventoryService(None, shop_status=client)
+    closed_shop = uuid.uuid4()
+    try:
+        with patch.object(replies, "handle_shop_status_response", wraps=replies.handle_shop_status_response) as handled:
+            await client.start(on_reply=replies.handle_shop_status_response)
+            await asyncio.sleep(0)
+            service = AsyncInventoryService(None, shop_status=client)
+            assert await service.validate_shop_status("open-shop")
+            rose = InventoryItemCreate(
+                shop_id=closed_shop, name="Rose", description="", category="Stems", price=1.0, quantity=1,
+            )
+            with pytest.raises(ShopInactive):
+                await service.create_item(rose)
+            with pytest.raises(ShopInactive):
+                await service.bulk_create_items([rose])
+        assert [call.args[1]["shop_id"] for call in handled.call_args_list] == ["open-shop", str(closed_shop)]
+        assert client.cached(str(closed_shop)) is False
+    finally:
+        await client.stop()
+        await client.publisher.close()
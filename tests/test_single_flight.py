@@ -0,0 +1,78 @@
+import asyncio
+import uuid
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import event
+from app.services.single_flight import SingleFlight
+
+
+def coalesced(role, kind="item"):
+    return REGISTRY.get_sample_value("inventory_coalesced_reads_total", {"kind": kind, "role": role}) or 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_flight_and_its_failure():
+    flights = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise LookupError("boom")
+
+    results = await asyncio.gather(*(flights.do(("item", 1), load) for _ in range(5)), return_exceptions=True)
+    assert len(calls) == 1
+    assert all(isinstance(result, LookupError) for result in results)
+    assert len(flights) == 0
+
+    # A caller giving up does not cancel the shared call
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    impatient = asyncio.ensure_future(flights.do(("item", 2), slow))
+    await asyncio.sleep(0)
+    impatient.cancel()
+    assert await flights.do(("item", 2), slow) == "done"
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_reads_run_one_query(inventory_tables):
+    from app.db.database import dispose_async_engine, get_async_engine, get_async_session_local, get_session_local
+    from app.models.domain.inventory import InventoryItemCreate
+    from app.repositories.inventory_repository import InventoryRepository
+    from app.services.inventory_service import AsyncInventoryService
+    from app.services.item_cache import ItemCache
+
+    with get_session_local()() as db:
+        item = InventoryRepository(db).create(InventoryItemCreate(
+            shop_id=uuid.uuid4(), name="Fern", description="Green", category="Plants", price=7.0, quantity=4,
+        ))
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    # Caching disabled: only coalescing can keep this to one query
+    cache = ItemCache(max_entries=0)
+    sessions = [get_async_session_local()() for _ in range(20)]
+    leaders, followers = coalesced("leader"), coalesced("follower")
+    event.listen(get_async_engine().sync_engine, "before_cursor_execute", record)
+    try:
+        results = await asyncio.gather(*(
+            AsyncInventoryService(session, cache=cache).get_item(item.id)
+            for session in sessions
+        ))
+        assert len(statements) == 1
+        assert all(result.id == item.id and result.name == "Fern" for result in results)
+        assert (coalesced("leader") - leaders, coalesced("follower") - followers) == (1, 19)
+
+        # Once the flight lands the next read queries again
+        await AsyncInventoryService(sessions[0], cache=cache).get_item(item.id)
+        assert len(statements) == 2
+    finally:
+        event.remove(get_async_engine().sync_engine, "before_cursor_execute", record)
+        for session in sessions:
+            await session.close()
+        await dispose_async_engine()
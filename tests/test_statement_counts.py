@@ -0,0 +1,94 @@
+import uuid
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+
+
+@contextmanager
+def count_statements(engine):
+    """Collect every SQL statement sent to the server (BEGIN/COMMIT go through the driver, not here)"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def test_write_paths_issue_one_statement_each(inventory_tables, new_item):
+    from app.db.database import get_session_local
+    from app.models.domain.inventory import InventoryItemUpdate
+    from app.repositories.inventory_repository import InventoryRepository
+
+    shop_id = uuid.uuid4()
+    with get_session_local()() as db:
+        repository = InventoryRepository(db)
+
+        with count_statements(inventory_tables) as statements:
+            created = repository.create(new_item(shop_id))
+        assert len(statements) == 1 and statements[0].startswith("INSERT")
+        assert created.created_at is not None and created.is_active is True
+
+        with count_statements(inventory_tables) as statements:
+            updated = repository.update(created.id, InventoryItemUpdate(name="Gerbera", quantity=7))
+        assert len(statements) == 1 and statements[0].startswith("UPDATE")
+        assert (updated.name, updated.quantity) == ("Gerbera", 7)
+
+        with count_statements(inventory_tables) as statements:
+            assert repository.delete(created.id) is True
+        assert len(statements) == 1 and statements[0].startswith("UPDATE")
+        assert repository.get_by_id(created.id).is_active is False
+
+        with count_statements(inventory_tables) as statements:
+            assert repository.delete(uuid.uuid4()) is False
+            assert repository.update(uuid.uuid4(), InventoryItemUpdate(quantity=1)) is None
+        assert len(statements) == 2
+
+
+def test_bulk_soft_delete_by_ids_and_by_shop(inventory_tables, new_item):
+    from app.db.database import get_session_local
+    from app.repositories.inventory_repository import InventoryRepository
+
+    shop_a, shop_b = uuid.uuid4(), uuid.uuid4()
+    with get_session_local()() as db:
+        repository = InventoryRepository(db)
+        items_a = repository.bulk_create([new_item(shop_a) for _ in range(5)])
+        items_b = repository.bulk_create([new_item(shop_b) for _ in range(3)])
+
+        with count_statements(inventory_tables) as statements:
+            deleted = repository.delete_many([items_a[0].id, items_b[0].id, uuid.uuid4()])
+        assert len(statements) == 1
+        assert sorted(deleted) == sorted([(items_a[0].id, shop_a), (items_b[0].id, shop_b)])
+
+        # Already inactive items are not reported twice
+        assert repository.delete_many([items_a[0].id]) == []
+
+        with count_statements(inventory_tables) as statements:
+            deleted = repository.delete_by_shop(shop_a)
+        assert len(statements) == 1
+        assert {item_id for item_id, _ in deleted} == {item.id for item in items_a[1:]}
+        assert repository.get_by_shop_id(shop_a) == []
+        assert len(repository.get_by_shop_id(shop_b)) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_write_paths_issue_one_statement_each(inventory_tables, new_item):
+    from app.db.database import get_async_session_local, get_async_engine, dispose_async_engine
+    from app.models.domain.inventory import InventoryItemUpdate
+    from app.repositories.async_inventory_repository import AsyncInventoryRepository
+
+    try:
+        async with get_async_session_local()() as db:
+            repository = AsyncInventoryRepository(db)
+            with count_statements(get_async_engine().sync_engine) as statements:
+                created = await repository.create(new_item(uuid.uuid4()))
+                await repository.update(created.id, InventoryItemUpdate(price=2.0))
+                await repository.delete(created.id)
+    finally:
+        await dispose_async_engine()
+
+    assert [statement.split()[0] for statement in statements] == ["INSERT", "UPDATE", "UPDATE"]